@@ -8,6 +8,9 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 from urllib.parse import unquote  # ← 여기에 추가
 
+from metrics import observe_stage, BYTES_TRANSFERRED, RETRIES
+import transport
+
 # 1) CSV에서 코드↔이름 매핑 생성
 def load_station_map(csv_path: str) -> (dict[str, str], set[str]):
     df = pd.read_csv(csv_path, dtype=str)
@@ -29,6 +32,8 @@ def fetch_asos_data(
     url = 'http://apis.data.go.kr/1360000/AsosHourlyInfoService/getWthrDataList'
     all_records: list[dict] = []
     page_no = 1
+    # 페이지마다 같은 keep-alive 연결 재사용
+    http = transport.session()
     while True:
         params = {
             'serviceKey': service_key,
@@ -45,12 +50,15 @@ def fetch_asos_data(
         }
         for attempt in range(1, max_retries + 1):
             try:
-                resp = requests.get(url, params=params, timeout=10)
-                resp.raise_for_status()
-                data = resp.json()
+                with observe_stage("asos_page", source="asos"):
+                    resp = http.get(url, params=params, timeout=10)
+                    resp.raise_for_status()
+                    data = resp.json()
+                BYTES_TRANSFERRED.labels(source="asos").inc(len(resp.content))
                 break
             except (requests.RequestException, socket.error, ValueError) as e:
                 if attempt < max_retries:
+                    RETRIES.labels(source="asos").inc()
                     time.sleep(1)
                     continue
                 else:
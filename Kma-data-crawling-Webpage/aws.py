@@ -0,0 +1,219 @@
+import io
+import logging
+import os
+import re
+import time
+import socket
+import threading
+import requests
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from metrics import observe_stage, BYTES_TRANSFERRED, RETRIES
+import transport
+
+logger = logging.getLogger(__name__)
+
+# 방재기상관측(AWS) 시간자료 — apihub 고정폭 텍스트
+AWS_URL = "https://apihub.kma.go.kr/api/typ01/url/awsh.php"
+AWS_AUTH_KEY = os.getenv("AWS_AUTH_KEY", "")
+# apihub 호출 제한에 맞춘 초당 요청 수 / 동시 요청 수
+AWS_RATE = float(os.getenv("AWS_RATE", "5"))
+AWS_WORKERS = int(os.getenv("AWS_WORKERS", "8"))
+# stn=0 이면 전체 지점
+ALL_STATIONS = "0"
+
+# 변수별 컬럼 (tm, stn 다음 순서) — 응답의 고정폭 열 순서와 동일
+VARIABLES: Dict[str, List[str]] = {
+    "TA": ["ta", "ta_hmi", "ta_avg", "ta_cnt", "ta_max", "ta_max_hmi", "ta_min", "ta_min_hmi"],
+    "PS": ["ps", "ps_hmi", "ps_avg", "ps_cnt", "ps_max", "ps_max_hmi", "ps_min", "ps_min_hmi"],
+    "HM": ["hm", "hm_hmi", "hm_avg", "hm_cnt", "hm_max", "hm_max_hmi", "hm_min", "hm_min_hmi"],
+    "RN": [
+        "rn_ox", "rn_ox_cnt", "rn_day", "rn_day_hmi", "rn_60m", "rn_60m_hmi",
+        "rn_60m_max", "rn_60m_max_hmi", "rn_60m_cnt", "rn_15m_max", "rn_15m_max_hmi", "rn_15m_cnt",
+    ],
+    "WD": [
+        "wd_10m", "ws_10m", "wind_hmi", "wd_60m_max", "ws_60m_max", "ws_60m_max_hmi",
+        "ws_10m_cnt", "ws_60m_avg", "wd_1m_max", "ws_1m_max", "ws_1m_max_hmi", "ws_1m_cnt",
+        "wd_ins_max", "ws_ins_max", "ws_ins_max_hmi", "ws_ins_cnt",
+    ],
+}
+# 결측 표기 (-99.0, -99.9, -999 …)
+MISSING_THRESHOLD = -90.0
+
+
+
+class AwsFetchError(RuntimeError):
+    """재시도 후에도 받지 못한 시각이 있음 (빈 응답 = 자료 없음과 구분)"""
+
+
+_COMMENT_RE = re.compile(rb"(?m)^#.*(?:\r?\n|$)")
+_TOKEN_RE = re.compile(rb"\S+")
+
+
+class RateLimiter:
+    """스레드 간 공유 토큰 버킷 (rate: 초당 요청 수, burst: 최대 누적 토큰)"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+# 1) 고정폭 텍스트 파싱
+def parse_fixed_width(data: bytes, names: List[str]) -> pd.DataFrame:
+    """
+    awsh.php 응답 → DataFrame.
+    첫 데이터 행의 토큰 끝 위치로 열 경계를 정하고(우측 정렬), 모든 행을 (행 × 폭) 바이트
+    행렬로 만든 뒤 열 단위로 잘라 한 번에 숫자로 변환합니다. 경계가 맞지 않는 응답은
+    공백 구분 파서로 대체합니다.
+    """
+    body = _COMMENT_RE.sub(b"", data).strip(b"\r\n")
+    if not body.strip():
+        return pd.DataFrame(columns=["tm", "stn", *names])
+    lines = body.replace(b"\r", b"").split(b"\n")
+
+    # 열 경계: [이전 토큰 끝, 현재 토큰 끝)
+    ends = [m.end() for m in _TOKEN_RE.finditer(lines[0]) if m.group() != b"="]
+    ncols = min(len(ends), 2 + len(names))
+    ends = ends[:ncols]
+    width = max(len(ln) for ln in lines)
+    mat = np.frombuffer(
+        b"".join(ln.ljust(width) for ln in lines), dtype=np.uint8
+    ).reshape(len(lines), width)
+
+    cols = {}
+    try:
+        start = 0
+        for i, end in enumerate(ends):
+            if end < width and not (mat[:, end] == ord(" ")).all():
+                raise ValueError("열 경계 불일치")
+            field = np.ascontiguousarray(mat[:, start:end])
+            blank = (field == ord(" ")).all(axis=1)
+            values = field.view(f"S{end - start}").ravel()
+            values = np.where(blank, b"nan", values).astype(np.float64)
+            cols[i] = values
+            start = end
+    except ValueError:
+        df = pd.read_csv(
+            io.BytesIO(body), sep=r"\s+", header=None, usecols=range(ncols)
+        )
+        cols = {i: df[i].to_numpy(dtype=np.float64) for i in range(ncols)}
+
+    out_names = ["tm", "stn", *names][:ncols]
+    df = pd.DataFrame({out_names[i]: cols[i] for i in range(ncols)})
+    for c in out_names[2:]:
+        df.loc[df[c] <= MISSING_THRESHOLD, c] = np.nan
+    # 한 응답의 시각 종류는 몇 개뿐이므로 고유값만 변환
+    uniq, inv = np.unique(df["tm"].to_numpy(dtype=np.int64), return_inverse=True)
+    df["tm"] = pd.to_datetime(uniq.astype(str), format="%Y%m%d%H%M")[inv]
+    df["stn"] = df["stn"].astype(np.int64).astype(str)
+    return df
+
+
+# 2) 단일 시각 · 단일 변수 요청
+def fetch_aws_hour(
+    auth_key: str,
+    tm: str,
+    var: str,
+    stn: str = ALL_STATIONS,
+    session: Optional[requests.Session] = None,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 3,
+) -> pd.DataFrame:
+    params = {"tm": tm, "var": var, "stn": stn, "help": 0, "authKey": auth_key}
+    http = session or transport.session()
+    for attempt in range(1, max_retries + 1):
+        if limiter is not None:
+            limiter.wait()
+        try:
+            with observe_stage("aws_fetch", source="aws"):
+                resp = http.get(AWS_URL, params=params)
+                resp.raise_for_status()
+            BYTES_TRANSFERRED.labels(source="aws").inc(len(resp.content))
+            break
+        except (requests.RequestException, socket.error) as e:
+            if attempt < max_retries:
+                RETRIES.labels(source="aws").inc()
+                time.sleep(2 ** (attempt - 1))
+                continue
+            logger.error(f"AWS 요청 실패: tm={tm}, var={var}, stn={stn}, error={e}")
+            raise AwsFetchError(f"AWS 요청 실패 (tm={tm}, var={var}, stn={stn}): {e}") from e
+    with observe_stage("aws_parse", source="aws"):
+        return parse_fixed_width(resp.content, VARIABLES[var])
+
+
+# 3) 기간 · 여러 변수 (동시 요청 + 호출 제한)
+def fetch_aws_data(
+    auth_key: str,
+    start: str,
+    end: str,
+    stn: str = ALL_STATIONS,
+    variables: Optional[List[str]] = None,
+    workers: int = None,
+    rate: float = None,
+) -> pd.DataFrame:
+    """
+    start~end (YYYYMMDD, 포함) 의 매 정시 자료를 받아 (time, station_id) 기준으로 합칩니다.
+    반환 컬럼: time, station_id, <변수별 컬럼…>
+    한 시각이라도 받지 못하면 AwsFetchError (빠진 시각이 있는 결과를 완결된 것으로 저장하지 않도록)
+    """
+    variables = [v.upper() for v in (variables or list(VARIABLES))]
+    for v in variables:
+        if v not in VARIABLES:
+            raise ValueError(f"지원하지 않는 AWS 변수: {v}")
+    t0 = datetime.strptime(start, "%Y%m%d")
+    t1 = datetime.strptime(end, "%Y%m%d") + timedelta(days=1)
+    hours = [
+        (t0 + timedelta(hours=h)).strftime("%Y%m%d%H%M")
+        for h in range(int((t1 - t0).total_seconds() // 3600))
+    ]
+
+    limiter = RateLimiter(rate if rate is not None else AWS_RATE)
+    # apihub 연결 풀은 transport.POOL_SIZES 에서 AWS_WORKERS 이상으로 잡혀 있음
+    session = transport.session()
+
+    frames: Dict[str, List[pd.DataFrame]] = {v: [] for v in variables}
+    pool = ThreadPoolExecutor(max_workers=workers or AWS_WORKERS)
+    try:
+        futures = [
+            (v, pool.submit(fetch_aws_hour, auth_key, tm, v, stn, session, limiter))
+            for v in variables for tm in hours
+        ]
+        for v, fut in futures:
+            df = fut.result()
+            if not df.empty:
+                frames[v].append(df)
+    finally:
+        # 실패하면 남은 요청은 보내지 않음
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    merged = None
+    for v in variables:
+        if not frames[v]:
+            continue
+        df = pd.concat(frames[v], ignore_index=True).drop_duplicates(["tm", "stn"])
+        merged = df if merged is None else merged.merge(df, on=["tm", "stn"], how="outer")
+    if merged is None:
+        return pd.DataFrame()
+    merged = merged.rename(columns={"tm": "time", "stn": "station_id"})
+    return merged.sort_values(["station_id", "time"]).reset_index(drop=True)
@@ -0,0 +1,68 @@
+# bundle.py
+
+import io
+import os
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+# 이미 압축된 형식은 다시 압축하지 않고 그대로(STORED) 넣음
+PRECOMPRESSED_EXTS = {".zip", ".gz", ".zst", ".bz2", ".xz", ".parquet"}
+
+
+class _StreamSink(io.RawIOBase):
+    """
+    ZipFile 출력 대상. seek 불가 스트림이라 zipfile 이 data descriptor 를 사용하고,
+    쓰인 바이트는 drain() 으로 꺼내 바로 응답에 흘려보냅니다.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._size += len(b)
+        return len(b)
+
+    def pending(self) -> int:
+        return self._size
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        self._size = 0
+        return out
+
+
+def iter_zip(files: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    (디스크 경로, ZIP 내부 경로) 목록을 ZIP 스트림으로 변환.
+    디스크/메모리에 아카이브를 만들지 않으며, 버퍼는 CHUNK_SIZE 수준으로 유지됩니다.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for path, arcname in files:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            ext = os.path.splitext(path)[1].lower()
+            zinfo.compress_type = (
+                zipfile.ZIP_STORED if ext in PRECOMPRESSED_EXTS else zipfile.ZIP_DEFLATED
+            )
+            with open(path, "rb") as src, zf.open(zinfo, "w") as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    if sink.pending() >= CHUNK_SIZE:
+                        yield sink.drain()
+            if sink.pending():
+                yield sink.drain()
+    # central directory
+    tail = sink.drain()
+    if tail:
+        yield tail
@@ -0,0 +1,186 @@
+# compression.py
+
+import os
+import zlib
+from typing import List, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli 가 없으면 gzip 만 협상
+    brotli = None
+
+from fileserve import _accepts
+
+# 이보다 작은 응답은 압축하지 않음 (헤더 · CPU 비용이 더 큼)
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# 동적 응답이므로 빠른 품질 (11 은 정적 사전 압축용)
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+# 압축 효과가 있는 형식만 (zip · parquet · 이미지 등 이미 압축된 형식은 제외)
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml", "application/vnd.apache.arrow.stream",
+)
+# 이벤트가 도착하는 즉시 전달돼야 하는 형식 (SSE) — 압축하면 프록시 · 클라이언트가 모아서 받음
+STREAMING_TYPES = ("text/event-stream",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Accept-Encoding → 사용할 인코딩 (br 우선, 없으면 gzip)"""
+    if brotli is not None and _accepts(accept_encoding, "br"):
+        return "br"
+    if _accepts(accept_encoding, "gzip"):
+        return "gzip"
+    return None
+
+
+class _Encoder:
+    """청크 단위 스트리밍 압축 (앱이 보낸 본문 메시지마다 flush → 보낸 만큼은 곧바로 전달)"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + (self._br.finish() if final else self._br.flush())
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    return _Encoder(encoding).chunk(data, final=True)
+
+
+def _header(headers: List[tuple], name: bytes) -> Optional[bytes]:
+    for k, v in headers:
+        if k.lower() == name:
+            return v
+    return None
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli 응답 압축 (순수 ASGI — 본문을 통째로 모으지 않음).
+    다음은 그대로 통과: Content-Encoding 이 이미 있는 응답, Range 응답(fileserve 의 사전 압축본 ·
+    206), Cache-Control: no-transform / no-cache, SSE(text/event-stream), 압축 대상이 아닌 형식,
+    COMPRESS_MIN_SIZE 미만 응답.
+    스트리밍 응답(more_body)은 버퍼링하지 않고 본문 메시지마다 압축기를 flush 합니다.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for k, v in scope["headers"]:
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+                break
+        encoding = negotiate(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def begin(compressed: bool):
+            nonlocal encoder
+            headers = [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"] \
+                if compressed else start["headers"]
+            if compressed:
+                encoder = _Encoder(encoding)
+                headers.append((b"content-encoding", encoding.encode()))
+                vary = _header(headers, b"vary")
+                if vary is None:
+                    headers.append((b"vary", b"Accept-Encoding"))
+                elif b"accept-encoding" not in vary.lower():
+                    headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v)
+                               for k, v in headers]
+                # 다른 표현이므로 강한 ETag 는 약한 ETag 로
+                headers = [(k, b"W/" + v if k.lower() == b"etag" and not v.startswith(b"W/") else v)
+                           for k, v in headers]
+            await send({**start, "headers": headers})
+
+        async def wrapped_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = message["headers"]
+                ctype = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+                length = _header(headers, b"content-length")
+                cache = (_header(headers, b"cache-control") or b"").lower()
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or _header(headers, b"content-encoding") is not None
+                    or _header(headers, b"content-range") is not None
+                    or _header(headers, b"accept-ranges") is not None
+                    or b"no-transform" in cache
+                    or b"no-cache" in cache
+                    or ctype.startswith(STREAMING_TYPES)
+                    or not ctype.startswith(COMPRESSIBLE_TYPES)
+                    or (length is not None and int(length) < self.minimum_size)
+                )
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoder is None:
+                # 한 번에 끝나는 작은 응답만 압축 생략 (스트리밍 응답은 기다리지 않고 바로 압축 시작)
+                if not more and len(body) < self.minimum_size:
+                    await begin(compressed=False)
+                    return await send(message)
+                await begin(compressed=True)
+            out = encoder.chunk(body, final=not more)
+            await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, wrapped_send)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from databases import RegionDatabase
+
+    parser = argparse.ArgumentParser(description="응답 압축 벤치마크 (크기 · 압축 시간)")
+    parser.add_argument("--db", default=os.getenv("DB_PATH", "data/local_codes.db"))
+    parser.add_argument("--csv", nargs="*", default=[], help="비교할 CSV 파일")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from regiontree import RegionTree
+
+    tree = RegionTree(RegionDatabase(args.db).get_available_regions())
+    payloads = {
+        "/api/regions": tree.encoded("regions")[0],
+        "/api/regions/compact": tree.encoded("compact")[0],
+    }
+    for path in args.csv:
+        with open(path, "rb") as f:
+            payloads[os.path.basename(path)] = f.read()
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    print(f"{'payload':<32}{'identity':>12}" + "".join(f"{e:>12}{'ms':>8}" for e in encodings))
+    for name, data in payloads.items():
+        row = f"{name[:31]:<32}{len(data):>12,}"
+        for enc in encodings:
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                out = compress(data, enc)
+            ms = (time.perf_counter() - t0) / args.repeat * 1e3
+            row += f"{len(out):>12,}{ms:>8.2f}"
+        print(row)
@@ -0,0 +1,186 @@
+# fileserve.py
+
+import os
+import gzip
+import shutil
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+import storage
+
+CHUNK_SIZE = 64 * 1024
+
+# (Content-Encoding, 사이블링 확장자) — 앞쪽이 우선
+PRECOMPRESSED = [("zstd", ".zst"), ("gzip", ".gz")]
+
+# 다운로드 후 미리 만들어 둘 압축본 (예: "gzip,zstd"). 비어 있으면 만들지 않음
+PRECOMPRESS_ENCODINGS = [
+    e.strip() for e in os.getenv("PRECOMPRESS_ENCODINGS", "").split(",") if e.strip()
+]
+
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    """Accept-Encoding 에 encoding 이 q>0 으로 포함되어 있는지"""
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != encoding:
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    단일 범위 'bytes=a-b' / 'bytes=a-' / 'bytes=-n' → (start, end) (end 포함).
+    다중 범위나 형식 오류는 None (전체 응답), 만족 불가는 ValueError.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if first == "":
+        if suffix < 0:
+            return None
+        # 'bytes=-0' 이나 빈 파일의 접미 범위는 만족 불가 (RFC 9110 14.1.3)
+        if suffix == 0 or size == 0:
+            raise ValueError("unsatisfiable")
+        return max(size - suffix, 0), size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable")
+    return start, min(end, size - 1)
+
+
+def _iter_range(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request: Request, path: str, filename: Optional[str] = None,
+               media_type: str = "application/octet-stream") -> Response:
+    """
+    정적 파일 응답:
+    - 클라이언트가 받아들이면 미리 압축된 .zst/.gz 사이블링을 Content-Encoding 으로 전송
+    - 강한 ETag / Last-Modified, If-None-Match / If-Modified-Since → 304
+    - Range / If-Range → 206 (단일 범위)
+    """
+    accept = request.headers.get("accept-encoding", "")
+    real, encoding = path, None
+    for enc, ext in PRECOMPRESSED:
+        if _accepts(accept, enc) and os.path.exists(path + ext):
+            real, encoding = path + ext, enc
+            break
+    if encoding is None and not os.path.exists(path):
+        if os.path.exists(path + storage.ZSTD_EXT):
+            # zstd 압축 저장본인데 클라이언트가 zstd 를 못 받음 → 서버에서 풀어 스트리밍
+            return _serve_decompressed(path, filename, media_type)
+        raise HTTPException(status_code=404, detail="File not found")
+
+    st = os.stat(real)
+    etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}' + (f'-{encoding}"' if encoding else '"')
+    last_modified = formatdate(st.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    # 1) 조건부 요청
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip() for t in inm.split(",")]
+        if "*" in tags or etag in tags:
+            return Response(status_code=304, headers=headers)
+    else:
+        ims = request.headers.get("if-modified-since")
+        if ims:
+            try:
+                if int(st.st_mtime) <= parsedate_to_datetime(ims).timestamp():
+                    return Response(status_code=304, headers=headers)
+            except (TypeError, ValueError):
+                pass
+
+    if filename:
+        headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename, safe='')}"
+
+    # 2) Range (If-Range 가 현재 표현과 다르면 전체 전송)
+    rng = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if rng and (if_range is None or if_range.strip() in (etag, last_modified)):
+        try:
+            span = _parse_range(rng, st.st_size)
+        except ValueError:
+            return Response(
+                status_code=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"}
+            )
+        if span is not None:
+            start, end = span
+            length = end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+            headers["Content-Length"] = str(length)
+            if request.method == "HEAD":
+                # HEAD 는 헤더만 (본문 스트리밍 없음)
+                return Response(status_code=206, media_type=media_type, headers=headers)
+            return StreamingResponse(
+                _iter_range(real, start, length), status_code=206,
+                media_type=media_type, headers=headers
+            )
+
+    # 3) 전체
+    return FileResponse(real, media_type=media_type, headers=headers)
+
+
+def _serve_decompressed(path: str, filename: Optional[str], media_type: str) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    if filename:
+        headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename, safe='')}"
+    return StreamingResponse(
+        storage.iter_decompressed(path), media_type=media_type, headers=headers
+    )
+
+
+def precompress(path: str, encodings=None):
+    """path 옆에 .gz / .zst 사이블링 생성 (이미 최신이면 건너뜀)"""
+    for enc in encodings if encodings is not None else PRECOMPRESS_ENCODINGS:
+        ext = dict(PRECOMPRESSED).get(enc)
+        if ext is None:
+            continue
+        tgt = path + ext
+        if os.path.exists(tgt) and os.path.getmtime(tgt) >= os.path.getmtime(path):
+            continue
+        tmp = tgt + ".tmp"
+        with open(path, "rb") as src:
+            if enc == "gzip":
+                with gzip.open(tmp, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            else:
+                import zstandard
+                with open(tmp, "wb") as raw:
+                    zstandard.ZstdCompressor(level=10).copy_stream(src, raw)
+        os.replace(tmp, tgt)
@@ -0,0 +1,261 @@
+# forecast_views.py
+
+import glob
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from metrics import record_cache
+import store
+
+# 예보 추출물에는 같은 유효시각(valid_time)에 대한 여러 발표(issue_time)의 예보가 섞여 있습니다.
+# 자주 쓰는 두 가지 추출을 파티션(설정 · 변수 · 격자 · 발표월)마다 정렬 인덱스로 만들어 둡니다.
+#   - latest: 유효시각마다 가장 최근 발표의 예보 한 개
+#   - lead  : 선행시간 N 시간 예보 (발표시각 + N = 유효시각) 시계열
+# 인덱스는 정렬 배열이므로 구간 · 선행시간 선택은 searchsorted 한 번 (groupby 없음).
+# 파티션 파일의 mtime 과 함께 LRU 로 캐시하고, 재적재로 파일이 바뀌면 다시 만듭니다.
+VIEW_CACHE_PARTITIONS = int(os.getenv("FORECAST_VIEW_CACHE_PARTITIONS", "512"))
+# 적재 직후 바뀐 파티션의 인덱스를 미리 만들지 여부
+VIEW_WARM_ON_INGEST = os.getenv("FORECAST_VIEW_WARM", "1") == "1"
+
+VIEWS = ("latest", "lead")
+COLUMNS = ["region", "variable", "valid_time", "issue_time", "lead", "value"]
+
+
+class PartitionIndex:
+    """
+    파티션 파일 하나의 정렬 인덱스.
+    - latest_*: 유효시각 오름차순, 유효시각마다 최신 발표 한 행
+    - lead_*  : (선행시간, 유효시각) 오름차순 — 선행시간 경계는 searchsorted 로 찾음
+    """
+
+    def __init__(self, path: str):
+        table = pq.read_table(path, columns=["issue_time", "lead", "valid_time", "value"])
+        issue = table.column("issue_time").to_numpy().astype("datetime64[s]")
+        lead = table.column("lead").to_numpy().astype(np.int16)
+        valid = table.column("valid_time").to_numpy().astype("datetime64[s]")
+        value = table.column("value").to_numpy(zero_copy_only=False).astype(np.float32)
+
+        # 1) latest: (유효시각, 발표시각) 정렬 → 유효시각이 바뀌기 직전 행이 최신 발표
+        order = np.lexsort((issue, valid))
+        v = valid[order]
+        last = np.ones(len(v), dtype=bool)
+        last[:-1] = v[1:] != v[:-1]
+        sel = order[last]
+        self.latest_valid = valid[sel]
+        self.latest_issue = issue[sel]
+        self.latest_lead = lead[sel]
+        self.latest_value = value[sel]
+
+        # 2) lead: (선행시간, 유효시각) 정렬 — (발표, 선행) 이 중복 제거 키이므로 행이 유일함
+        order = np.lexsort((valid, lead))
+        self.lead_lead = lead[order]
+        self.lead_valid = valid[order]
+        self.lead_issue = issue[order]
+        self.lead_value = value[order]
+
+    def latest(self, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> Tuple[np.ndarray, ...]:
+        lo, hi = _bounds(self.latest_valid, start, end)
+        return (self.latest_valid[lo:hi], self.latest_issue[lo:hi],
+                self.latest_lead[lo:hi], self.latest_value[lo:hi])
+
+    def at_lead(self, lead: int, start: Optional[np.datetime64],
+                end: Optional[np.datetime64]) -> Tuple[np.ndarray, ...]:
+        l0 = int(np.searchsorted(self.lead_lead, lead, side="left"))
+        l1 = int(np.searchsorted(self.lead_lead, lead, side="right"))
+        lo, hi = _bounds(self.lead_valid[l0:l1], start, end)
+        lo, hi = l0 + lo, l0 + hi
+        return (self.lead_valid[lo:hi], self.lead_issue[lo:hi],
+                self.lead_lead[lo:hi], self.lead_value[lo:hi])
+
+    def leads(self) -> np.ndarray:
+        return np.unique(self.lead_lead)
+
+
+def _bounds(sorted_times: np.ndarray, start, end) -> Tuple[int, int]:
+    """[start, end) 구간의 위치 (end 미포함)"""
+    lo = int(np.searchsorted(sorted_times, start, side="left")) if start is not None else 0
+    hi = int(np.searchsorted(sorted_times, end, side="left")) if end is not None else len(sorted_times)
+    return lo, hi
+
+
+# ── 파티션 인덱스 캐시 ───────────────────────────────────
+_cache: "OrderedDict[str, Tuple[int, PartitionIndex]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _index(path: str) -> Optional[PartitionIndex]:
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _cache_lock:
+        hit = _cache.get(path)
+        if hit is not None and hit[0] == mtime:
+            _cache.move_to_end(path)
+            record_cache("forecast_view", hit=True)
+            return hit[1]
+    record_cache("forecast_view", hit=False)
+    index = PartitionIndex(path)
+    with _cache_lock:
+        _cache[path] = (mtime, index)
+        _cache.move_to_end(path)
+        while len(_cache) > VIEW_CACHE_PARTITIONS:
+            _cache.popitem(last=False)
+    return index
+
+
+def _partitions(config: str, variable: str, region: str,
+                start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+    """발표월 오름차순 파티션 파일 (유효시각 기준 조회이므로 한 달 앞 발표분까지 포함)"""
+    root = os.path.join(
+        store.STORE_DIR, "forecast", f"config={config}", f"variable={variable}", f"region={region}"
+    )
+    m0 = (start - timedelta(days=31)).strftime("%Y%m") if start else None
+    m1 = end.strftime("%Y%m") if end else None
+    out = []
+    for path in sorted(glob.glob(os.path.join(root, "month=*", "data.parquet"))):
+        month = path.split("month=", 1)[1].split(os.sep, 1)[0]
+        if (m0 is None or month >= m0) and (m1 is None or month <= m1):
+            out.append(path)
+    return out
+
+
+def warm(config: str, variable: str, region: str):
+    """적재 직후 호출 — 바뀐 파티션만 인덱스를 다시 만듦 (나머지는 stat 한 번)"""
+    for path in _partitions(config, variable, region, None, None):
+        _index(path)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+# ── 조회 ──────────────────────────────────────────────
+def _np_time(t: Optional[datetime]) -> Optional[np.datetime64]:
+    return np.datetime64(t, "s") if t is not None else None
+
+
+def _frame(parts: List[Tuple[np.ndarray, ...]], region: str, variable: str) -> pd.DataFrame:
+    if parts:
+        valid, issue, lead, value = (np.concatenate(cols) for cols in zip(*parts))
+    else:
+        valid = issue = np.array([], dtype="datetime64[s]")
+        lead, value = np.array([], dtype=np.int16), np.array([], dtype=np.float32)
+    return pd.DataFrame({
+        "region": region, "variable": variable,
+        "valid_time": valid, "issue_time": issue, "lead": lead, "value": value,
+    }, columns=COLUMNS)
+
+
+def latest(config: str, variable: str, region: str,
+           start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+    """유효시각마다 가장 최근 발표의 예보 ([start, end) 유효시각)"""
+    t0, t1 = _np_time(start), _np_time(end)
+    parts = []
+    for path in _partitions(config, variable, region, start, end):
+        index = _index(path)
+        if index is not None:
+            parts.append(index.latest(t0, t1))
+    if len(parts) > 1:
+        # 월 경계의 유효시각은 두 파티션에 걸칠 수 있음 → 합친 뒤 한 번 더 최신 발표만
+        valid, issue, lead, value = (np.concatenate(cols) for cols in zip(*parts))
+        order = np.lexsort((issue, valid))
+        v = valid[order]
+        last = np.ones(len(v), dtype=bool)
+        last[:-1] = v[1:] != v[:-1]
+        sel = order[last]
+        parts = [(valid[sel], issue[sel], lead[sel], value[sel])]
+    return _frame(parts, region, variable)
+
+
+def at_lead(config: str, variable: str, region: str, lead: int,
+            start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+    """선행시간 lead 시간 예보 시계열 ([start, end) 유효시각)"""
+    t0, t1 = _np_time(start), _np_time(end)
+    parts = []
+    for path in _partitions(config, variable, region, start, end):
+        index = _index(path)
+        if index is not None:
+            parts.append(index.at_lead(lead, t0, t1))
+    df = _frame(parts, region, variable)
+    # 파티션은 발표월 순이므로 경계에서만 순서가 뒤섞일 수 있음
+    if len(parts) > 1:
+        df = df.sort_values("valid_time", kind="stable", ignore_index=True)
+    return df
+
+
+def available_leads(config: str, variable: str, region: str) -> List[int]:
+    leads = [
+        index.leads() for index in
+        (_index(p) for p in _partitions(config, variable, region, None, None))
+        if index is not None
+    ]
+    return sorted({int(x) for arr in leads for x in arr})
+
+
+def view(kind: str, config: str, variables: Iterable[str], regions: Iterable[str],
+         lead: Optional[int] = None, start: Optional[datetime] = None,
+         end: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    여러 (격자, 변수) 의 latest / lead 뷰를 하나의 long 프레임으로.
+    열: region, variable, valid_time, issue_time, lead, value
+    """
+    if kind not in VIEWS:
+        raise ValueError(f"kind 는 {' | '.join(VIEWS)} 입니다.")
+    if kind == "lead" and lead is None:
+        raise ValueError("lead 뷰에는 선행시간(lead)이 필요합니다.")
+    frames = [
+        latest(config, v, r, start, end) if kind == "latest"
+        else at_lead(config, v, r, lead, start, end)
+        for r in regions for v in variables
+    ]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="latest / lead 뷰 vs pandas groupby 비교")
+    parser.add_argument("region")
+    parser.add_argument("variable")
+    parser.add_argument("--config", default="단기예보")
+    parser.add_argument("--lead", type=int, default=24)
+    args = parser.parse_args()
+
+    paths = _partitions(args.config, args.variable, args.region, None, None)
+    if not paths:
+        raise SystemExit("저장소에 해당 파티션이 없습니다.")
+    raw = pd.concat([pq.read_table(p).to_pandas() for p in paths], ignore_index=True)
+
+    t0 = time.perf_counter()
+    ref = raw.sort_values("issue_time").groupby("valid_time").tail(1).sort_values("valid_time")
+    t_groupby = time.perf_counter() - t0
+
+    clear_cache()
+    t0 = time.perf_counter()
+    cold = latest(args.config, args.variable, args.region)
+    t_cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    warm_df = latest(args.config, args.variable, args.region)
+    t_warm = time.perf_counter() - t0
+    assert len(ref) == len(cold) == len(warm_df)
+
+    t0 = time.perf_counter()
+    lead_df = at_lead(args.config, args.variable, args.region, args.lead)
+    t_lead = time.perf_counter() - t0
+
+    print(f"행 {len(raw):,} → latest {len(cold):,} / lead+{args.lead} {len(lead_df):,}")
+    print(f"groupby {t_groupby * 1e3:.1f}ms · 인덱스 생성 {t_cold * 1e3:.1f}ms · "
+          f"캐시 조회 {t_warm * 1e3:.1f}ms · lead 조회 {t_lead * 1e3:.1f}ms")
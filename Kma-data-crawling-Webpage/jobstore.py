@@ -0,0 +1,549 @@
+# jobstore.py
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 다운로드 작업 상태를 워커(프로세스) 사이에 공유하는 SQLite(WAL) 저장소.
+# uvicorn --workers N 에서 상태 조회 · 제어 요청이 어느 워커로 가도 같은 작업을 봅니다.
+#   - 상태 전환(시작 · 완료 · 취소 · 오류)은 즉시 기록
+#   - 항목별 진행률 · 파일 목록 · 실패 항목은 메모리에 모았다가 FLUSH_INTERVAL 마다 한 트랜잭션으로 기록
+#     (진행률은 작업이 아직 진행 중일 때만 반영 — 이미 끝나거나 오류로 정리된 작업을 되살리지 않음)
+#   - 다른 워커가 요청한 제어(취소 · 일시정지 · 재개 · 재실행)는 작업을 실행 중인 워커(owner)가
+#     같은 주기로 가져가 처리
+#   - 워커마다 workers 테이블에 하트비트를 남기므로, owner 가 살아 있는지(OWNER_TTL 안에 하트비트)
+#     호스트 · PID 와 무관하게 판단 (컨테이너 재생성 · PID 재사용에도 안전)
+JOBSTORE_PATH = os.getenv("JOBSTORE_PATH", "data/jobs.db")
+FLUSH_INTERVAL = float(os.getenv("JOBSTORE_FLUSH_INTERVAL", "0.5"))
+# 끝난 작업은 이 시간이 지나면 요약 기록(job_history)으로 옮기고, 보존 기간이 지나면 삭제
+ARCHIVE_AFTER = float(os.getenv("JOB_ARCHIVE_AFTER_HOURS", "24")) * 3600
+RETENTION = float(os.getenv("JOB_RETENTION_DAYS", "90")) * 86400
+ARCHIVE_INTERVAL = 3600
+# 하트비트 주기 / 이 시간 동안 하트비트가 없으면 owner 가 죽은 것으로 봄
+HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+OWNER_TTL = float(os.getenv("JOB_OWNER_TTL", "30"))
+# 죽은 owner 의 진행 중 작업을 오류로 돌리는 주기 (살아 있는 워커 아무나 수행)
+ORPHAN_CHECK_INTERVAL = 60
+ORPHAN_ERROR = "작업을 실행하던 서버 워커가 종료되어 작업이 중단되었습니다."
+
+# queued: 크기 제한을 넘어 대량 작업 자리를 기다리는 중 (planner.PLAN_GUARD=queue)
+RUNNING_STATUSES = ("queued", "started", "downloading", "paused")
+# 항목별 소요 시간 · 크기 이력의 지수 이동 평균 가중치 (최근 값 비중)
+ITEM_STATS_ALPHA = 0.2
+
+# 이 프로세스 식별자 (호스트:PID:임의값 — PID 가 재사용되어도 다른 워커로 구분)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# 저장 컬럼 (JSON 으로 저장하는 컬럼은 JSON_COLUMNS)
+COLUMNS = (
+    "task_id", "username", "client_id", "owner", "status", "progress", "total",
+    "current_item", "error", "completed_items", "sched", "start_time", "finished_at",
+    "updated_at", "rev",
+)
+JSON_COLUMNS = ("sched",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    task_id         TEXT PRIMARY KEY,
+    username        TEXT NOT NULL,
+    client_id       TEXT NOT NULL,
+    owner           TEXT NOT NULL,      -- 작업을 실행하는 워커 (WORKER_ID)
+    status          TEXT NOT NULL,
+    progress        INTEGER NOT NULL DEFAULT 0,
+    total           INTEGER NOT NULL DEFAULT 0,
+    current_item    TEXT NOT NULL DEFAULT '',
+    error           TEXT,
+    completed_items INTEGER,
+    sched           TEXT,               -- 스케줄러 상태 JSON (대기 순번 · 예상 시간)
+    control         TEXT,               -- 다른 워커가 요청한 제어 (owner 가 가져가면 NULL)
+    start_time      TEXT NOT NULL,
+    finished_at     REAL,               -- 끝난 시각 (진행 중이면 NULL)
+    updated_at      REAL NOT NULL,
+    rev             INTEGER NOT NULL DEFAULT 0   -- 바뀔 때마다 +1 (이벤트 스트림용)
+);
+CREATE INDEX IF NOT EXISTS jobs_owner_control ON jobs(owner) WHERE control IS NOT NULL;
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL             -- 마지막 하트비트 (time.time())
+);
+CREATE INDEX IF NOT EXISTS jobs_user_start ON jobs(username, start_time);
+-- 끝난 지 오래된 작업의 요약 (진행률 · 항목 목록 없이 한 행)
+CREATE TABLE IF NOT EXISTS job_history (
+    task_id           TEXT PRIMARY KEY,
+    username          TEXT NOT NULL,
+    client_id         TEXT NOT NULL,
+    status            TEXT NOT NULL,
+    progress          INTEGER NOT NULL,
+    total             INTEGER NOT NULL,
+    error             TEXT,
+    file_count        INTEGER NOT NULL,
+    dead_letter_count INTEGER NOT NULL,
+    start_time        TEXT NOT NULL,
+    finished_at       REAL
+);
+CREATE INDEX IF NOT EXISTS job_history_user_start ON job_history(username, start_time);
+CREATE TABLE IF NOT EXISTS job_files (
+    task_id TEXT NOT NULL,
+    path    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_files_task ON job_files(task_id);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    task_id TEXT NOT NULL,
+    entry   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dead_letters_task ON dead_letters(task_id);
+-- 작업이 끝날 때 owner 가 남기는 trace (Chrome trace-event JSON) — 어느 워커에서든 조회
+CREATE TABLE IF NOT EXISTS traces (
+    task_id    TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS item_stats (
+    config_name   TEXT NOT NULL,
+    var_code      TEXT NOT NULL,
+    samples       INTEGER NOT NULL,
+    seconds       REAL NOT NULL,    -- 항목 하나 (준비 POST + ZIP + 압축 해제)
+    bytes_per_day REAL NOT NULL,    -- ZIP 크기 / 구간 일수
+    updated_at    REAL NOT NULL,
+    PRIMARY KEY (config_name, var_code)
+);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str = JOBSTORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 기록 순서 보장 (오래된 진행률이 뒤늦게 상태 전환을 덮어쓰지 않도록 flush 는 한 번에 하나)
+        self._flush_lock = threading.Lock()
+        # 아직 기록하지 않은 진행률 (작업별로 마지막 값만 유지) / 파일 경로
+        self._pending: Dict[str, dict] = {}
+        self._pending_files: List[tuple] = []
+        self._pending_timings: List[tuple] = []
+        self._pending_dead: List[tuple] = []
+        self._handler: Optional[Callable[[str, str], None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        conn = self._conn()
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(jobs)")}
+        if cols and "finished_at" not in cols:
+            conn.execute("ALTER TABLE jobs ADD COLUMN finished_at REAL")
+        conn.executescript(_SCHEMA)
+        self._archived_at = 0.0
+        self._beat_at = 0.0
+        self._orphans_at = 0.0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---- 기록 ----
+    def create(self, task_id: str, username: str, client_id: str, status: str = "started"):
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (task_id, username, client_id, owner, status, start_time, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (task_id, username, client_id, WORKER_ID, status,
+             datetime.now().isoformat(timespec="seconds"), now),
+        )
+
+    def progress(self, task_id: str, **fields):
+        """항목 진행률 — 모아서 기록 (같은 작업은 마지막 값으로 덮어씀)"""
+        with self._lock:
+            self._pending.setdefault(task_id, {}).update(fields)
+
+    def add_file(self, task_id: str, path: str):
+        with self._lock:
+            self._pending_files.append((task_id, path))
+
+    def record_item(self, config_name: str, var_code: str, seconds: float, nbytes: int, days: int):
+        """항목 하나의 소요 시간 · 크기 (planner 추정용) — 진행률과 함께 모아서 기록"""
+        with self._lock:
+            self._pending_timings.append(
+                (config_name, var_code, seconds, nbytes / max(days, 1))
+            )
+
+    def update(self, task_id: str, when_status: Optional[Iterable[str]] = None, **fields) -> bool:
+        """
+        상태 전환 — 모아 둔 진행률과 합쳐 즉시 기록 (나중에 오래된 진행률이 덮어쓰지 않도록).
+        when_status 를 주면 현재 상태가 그중 하나일 때만 기록 (끝난 작업을 덮어쓰지 않도록).
+        기록했으면 True
+        """
+        if "status" in fields:
+            fields["finished_at"] = None if fields["status"] in RUNNING_STATUSES else time.time()
+        with self._flush_lock:
+            with self._lock:
+                fields = {**self._pending.pop(task_id, {}), **fields}
+            self._flush()
+            conn = self._conn()
+            cur = conn.execute(*self._update_sql(task_id, fields, when_status, time.time()))
+            return cur.rowcount > 0
+
+    @staticmethod
+    def _update_sql(task_id: str, fields: dict, when_status: Optional[Iterable[str]], now: float):
+        fields = {k: json.dumps(v) if k in JSON_COLUMNS else v for k, v in fields.items()}
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        sql = f"UPDATE jobs SET {sets}, updated_at = ?, rev = rev + 1 WHERE task_id = ?"
+        params = [*fields.values(), now, task_id]
+        if when_status is not None:
+            when_status = tuple(when_status)
+            sql += f" AND status IN ({','.join('?' * len(when_status))})"
+            params.extend(when_status)
+        return sql, params
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            files, self._pending_files = self._pending_files, []
+            timings, self._pending_timings = self._pending_timings, []
+            dead, self._pending_dead = self._pending_dead, []
+        if not pending and not files and not timings and not dead:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for task_id, fields in pending.items():
+                conn.execute(*self._update_sql(task_id, fields, RUNNING_STATUSES, now))
+            if files:
+                conn.executemany("INSERT INTO job_files VALUES (?, ?)", files)
+            if dead:
+                conn.executemany("INSERT INTO dead_letters VALUES (?, ?)", dead)
+            if files or dead:
+                conn.executemany(
+                    "UPDATE jobs SET rev = rev + 1, updated_at = ? WHERE task_id = ?",
+                    [(now, t) for t in {t for t, _ in files + dead}],
+                )
+            if timings:
+                a = ITEM_STATS_ALPHA
+                conn.executemany(f"""
+                INSERT INTO item_stats VALUES (?, ?, 1, ?, ?, ?)
+                ON CONFLICT (config_name, var_code) DO UPDATE SET
+                    samples       = samples + 1,
+                    seconds       = seconds * {1 - a} + excluded.seconds * {a},
+                    bytes_per_day = bytes_per_day * {1 - a} + excluded.bytes_per_day * {a},
+                    updated_at    = excluded.updated_at""",
+                    [(*t, now) for t in timings],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_dead_letter(self, task_id: str, entry: dict):
+        """실패 항목 — 진행률과 함께 모아서 기록"""
+        with self._lock:
+            self._pending_dead.append((task_id, json.dumps(entry, ensure_ascii=False)))
+
+    def save_trace(self, task_id: str, trace: dict):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO traces VALUES (?, ?, ?)",
+            (task_id, json.dumps(trace, ensure_ascii=False), time.time()),
+        )
+
+    def clear_dead_letters(self, task_id: str) -> int:
+        self.flush()
+        cur = self._conn().execute("DELETE FROM dead_letters WHERE task_id = ?", (task_id,))
+        return cur.rowcount
+
+    # ---- 조회 ----
+    def _row(self, row: sqlite3.Row) -> dict:
+        data = {k: row[k] for k in COLUMNS}
+        for k in JSON_COLUMNS:
+            data[k] = json.loads(data[k]) if data[k] else None
+        data["start_time"] = datetime.fromisoformat(data["start_time"])
+        return data
+
+    def get(self, task_id: str, include_files: bool = False) -> Optional[dict]:
+        """
+        작업 상태 (파일은 개수만, include_files=True 면 목록까지). 없으면 None.
+        요약 기록으로 옮겨진 작업은 archived=True 인 요약만 반환합니다.
+        """
+        with self._lock:
+            dirty = task_id in self._pending or any(
+                t == task_id for t, _ in self._pending_files + self._pending_dead
+            )
+        if dirty:
+            self.flush()
+        conn = self._conn()
+        row = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return self._archived(task_id, include_files)
+        data = self._row(row)
+        data["file_count"] = conn.execute(
+            "SELECT COUNT(*) FROM job_files WHERE task_id = ?", (task_id,)
+        ).fetchone()[0]
+        if include_files:
+            data["files"] = self.files(task_id)
+        data["dead_letters"] = self.dead_letters(task_id)
+        data["archived"] = False
+        return data
+
+    def _archived(self, task_id: str, include_files: bool) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT * FROM job_history WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        data = dict(row)
+        data["start_time"] = datetime.fromisoformat(data["start_time"])
+        data.update(current_item="", dead_letters=[], archived=True)
+        if include_files:
+            data["files"] = self.files(task_id)
+        return data
+
+    def exists(self, task_id: str) -> bool:
+        return self.revision(task_id) is not None or self._conn().execute(
+            "SELECT 1 FROM job_history WHERE task_id = ?", (task_id,)
+        ).fetchone() is not None
+
+    def revision(self, task_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT rev FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def history(self, username: str, limit: int = 20, cursor: Optional[str] = None,
+                status: Optional[str] = None) -> tuple:
+        """
+        사용자 작업 목록 (최근 시작 순, 진행 중 + 요약 기록).
+        cursor 는 이전 페이지 마지막 항목의 "start_time|task_id" — (다음 페이지 목록, 다음 cursor)
+        """
+        sql = ["""
+        SELECT * FROM (
+            SELECT task_id, username, status, progress, total, error, start_time, finished_at,
+                   (SELECT COUNT(*) FROM job_files f WHERE f.task_id = j.task_id) AS file_count,
+                   0 AS archived
+              FROM jobs j WHERE username = :user
+            UNION ALL
+            SELECT task_id, username, status, progress, total, error, start_time, finished_at,
+                   file_count, 1 AS archived
+              FROM job_history WHERE username = :user
+        ) WHERE 1 = 1"""]
+        params = {"user": username, "limit": limit + 1}
+        if status:
+            sql.append("AND status = :status")
+            params["status"] = status
+        if cursor:
+            start, _, task_id = cursor.partition("|")
+            sql.append("AND (start_time, task_id) < (:start, :task_id)")
+            params.update(start=start, task_id=task_id)
+        sql.append("ORDER BY start_time DESC, task_id DESC LIMIT :limit")
+        rows = [dict(r) for r in self._conn().execute(" ".join(sql), params).fetchall()]
+        for r in rows:
+            r["archived"] = bool(r["archived"])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['start_time']}|{rows[-1]['task_id']}"
+        return rows, next_cursor
+
+    def item_stats(self) -> Dict[tuple, dict]:
+        """(config_name, var_code) → {"samples", "seconds", "bytes_per_day"}"""
+        rows = self._conn().execute(
+            "SELECT config_name, var_code, samples, seconds, bytes_per_day FROM item_stats"
+        ).fetchall()
+        return {
+            (r["config_name"], r["var_code"]):
+                {"samples": r["samples"], "seconds": r["seconds"], "bytes_per_day": r["bytes_per_day"]}
+            for r in rows
+        }
+
+    def trace(self, task_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT data FROM traces WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def files(self, task_id: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT path FROM job_files WHERE task_id = ? ORDER BY rowid", (task_id,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def dead_letters(self, task_id: str) -> List[dict]:
+        rows = self._conn().execute(
+            "SELECT entry FROM dead_letters WHERE task_id = ? ORDER BY rowid", (task_id,)
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    # ---- 워커 생존 ----
+    def heartbeat(self):
+        self._conn().execute(
+            "INSERT INTO workers VALUES (?, ?)"
+            " ON CONFLICT (worker_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+            (WORKER_ID, time.time()),
+        )
+        self._beat_at = time.monotonic()
+
+    def owner_alive(self, owner: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM workers WHERE worker_id = ? AND heartbeat >= ?",
+            (owner, time.time() - OWNER_TTL),
+        ).fetchone()
+        return row is not None
+
+    # ---- 워커 간 제어 ----
+    def request_control(self, task_id: str, action: str) -> bool:
+        """
+        owner 워커에게 제어 요청 (다음 flush 주기에 처리됨).
+        owner 가 살아 있지 않으면 요청을 남기지 않고 False
+        """
+        cur = self._conn().execute(
+            "UPDATE jobs SET control = ? WHERE task_id = ? AND owner IN"
+            " (SELECT worker_id FROM workers WHERE heartbeat >= ?)",
+            (action, task_id, time.time() - OWNER_TTL),
+        )
+        return cur.rowcount > 0
+
+    def wait_control(self, task_id: str, action: str, timeout: float) -> bool:
+        """
+        owner 가 요청을 가져갈 때까지 대기 (블로킹). 시간 안에 가져가지 않으면
+        요청을 거둬들이고 False — 나중에 뒤늦게 처리되지 않도록
+        """
+        conn = self._conn()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            row = conn.execute("SELECT control FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None or row[0] != action:
+                return True
+            time.sleep(FLUSH_INTERVAL / 2)
+        cur = conn.execute(
+            "UPDATE jobs SET control = NULL WHERE task_id = ? AND control = ?", (task_id, action)
+        )
+        # 거둬들이기 직전에 가져갔으면 수락된 것
+        return cur.rowcount == 0
+
+    def _take_controls(self) -> List[tuple]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT task_id, control FROM jobs WHERE owner = ? AND control IS NOT NULL",
+                (WORKER_ID,),
+            ).fetchall()
+            if rows:
+                conn.executemany("UPDATE jobs SET control = NULL WHERE task_id = ?",
+                                 [(r[0],) for r in rows])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [(r[0], r[1]) for r in rows]
+
+    def recover_orphans(self) -> int:
+        """
+        하트비트가 끊긴 워커(어느 호스트든)가 실행하던 진행 중 작업 → 오류로 표시.
+        오래된 워커 기록도 정리합니다. 처리한 작업 수를 반환
+        """
+        conn = self._conn()
+        cutoff = time.time() - OWNER_TTL
+        placeholders = ",".join("?" * len(RUNNING_STATUSES))
+        rows = conn.execute(
+            f"SELECT task_id FROM jobs WHERE status IN ({placeholders}) AND owner != ?"
+            " AND owner NOT IN (SELECT worker_id FROM workers WHERE heartbeat >= ?)",
+            (*RUNNING_STATUSES, WORKER_ID, cutoff),
+        ).fetchall()
+        recovered = sum(
+            self.update(task_id, RUNNING_STATUSES, status="error", error=ORPHAN_ERROR)
+            for (task_id,) in rows
+        )
+        conn.execute("DELETE FROM workers WHERE heartbeat < ?", (cutoff,))
+        return recovered
+
+    # ---- 보존 ----
+    def archive(self, archive_after: float = ARCHIVE_AFTER, retention: float = RETENTION) -> int:
+        """
+        끝난 지 archive_after 초가 지난 작업 → job_history 요약 (dead letter · trace · 진행 상태 삭제).
+        retention 초가 지난 요약과 파일 목록은 삭제. 옮긴 작업 수를 반환합니다.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" * len(RUNNING_STATUSES))
+            ids = [r[0] for r in conn.execute(
+                f"SELECT task_id FROM jobs WHERE finished_at < ? AND status NOT IN ({placeholders})",
+                (now - archive_after, *RUNNING_STATUSES),
+            )]
+            for task_id in ids:
+                conn.execute("""
+                INSERT OR REPLACE INTO job_history
+                SELECT task_id, username, client_id, status, progress, total, error,
+                       (SELECT COUNT(*) FROM job_files f WHERE f.task_id = j.task_id),
+                       (SELECT COUNT(*) FROM dead_letters d WHERE d.task_id = j.task_id),
+                       start_time, finished_at
+                  FROM jobs j WHERE task_id = ?""", (task_id,))
+                conn.execute("DELETE FROM dead_letters WHERE task_id = ?", (task_id,))
+                conn.execute("DELETE FROM traces WHERE task_id = ?", (task_id,))
+                conn.execute("DELETE FROM jobs WHERE task_id = ?", (task_id,))
+            expired = [r[0] for r in conn.execute(
+                "SELECT task_id FROM job_history WHERE finished_at < ?", (now - retention,)
+            )]
+            for task_id in expired:
+                conn.execute("DELETE FROM job_files WHERE task_id = ?", (task_id,))
+                conn.execute("DELETE FROM job_history WHERE task_id = ?", (task_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(ids)
+
+    # ---- 백그라운드 기록 스레드 ----
+    def start(self, handler: Callable[[str, str], None]):
+        """handler(task_id, action): 다른 워커가 요청한 제어를 처리 (이 스레드에서 호출됨)"""
+        self._handler = handler
+        self.heartbeat()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="jobstore-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+        # 정상 종료: 다른 워커가 곧바로 이 워커의 작업을 죽은 것으로 보도록
+        self._conn().execute("DELETE FROM workers WHERE worker_id = ?", (WORKER_ID,))
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            try:
+                if time.monotonic() - self._beat_at >= HEARTBEAT_INTERVAL:
+                    self.heartbeat()
+                self.flush()
+                for task_id, action in self._take_controls():
+                    if self._handler is not None:
+                        self._handler(task_id, action)
+                if time.monotonic() - self._archived_at >= ARCHIVE_INTERVAL:
+                    self._archived_at = time.monotonic()
+                    self.archive()
+                if time.monotonic() - self._orphans_at >= ORPHAN_CHECK_INTERVAL:
+                    self._orphans_at = time.monotonic()
+                    self.recover_orphans()
+            except sqlite3.Error as e:
+                logger.error(f"작업 상태 기록 실패: {e}")
+
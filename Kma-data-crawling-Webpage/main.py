@@ -2,11 +2,14 @@ import os
 import json
 import pandas as pd
 import uuid
+import time
+import asyncio
 import threading
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict
-from urllib.parse import unquote
+from typing import Optional
+from urllib.parse import unquote, quote
 import io
 
 from fastapi import (
@@ -14,16 +17,19 @@ from fastapi import (
     Form, BackgroundTasks, Query
 )
 from fastapi.responses import (
-    HTMLResponse, FileResponse, JSONResponse, StreamingResponse
+    HTMLResponse, JSONResponse, StreamingResponse, Response
 )
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordRequestForm
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import cookie_parser
 import uvicorn
 
 # ASOS.py에서 load_station_map과 get_weather_data를 가져옵니다.
 from ASOS import load_station_map, fetch_asos_data
+from aws import (
+    fetch_aws_data, ALL_STATIONS, AWS_AUTH_KEY, VARIABLES as AWS_VARIABLES
+)
 
 # CSV_PATH 정의 (환경변수 우선)
 CSV_PATH = os.getenv("DATA_DIR", "/app/data/asos.csv")
@@ -32,7 +38,9 @@ code2name, station_map, codes = load_station_map(CSV_PATH)
 
 
 # (기존 단기예보용 다운로드 로직과 인증/DB 등은 그대로 유지)
-from weather_downloader import WeatherDownloader, DownloadConfig
+from weather_downloader import (
+    WeatherDownloader, DownloadConfig, frames_to_csv, batches_to_arrow
+)
 from databases import (
     RegionDatabase, init_db,
     create_download_log, get_downloads_by_client,
@@ -42,6 +50,29 @@ from auth import (
     authenticate_user, create_access_token,
     get_current_user, get_password_hash
 )
+from tracing import start_trace, get_trace, NULL_TRACE
+from bundle import iter_zip
+from fileserve import serve_file, precompress, PRECOMPRESS_ENCODINGS
+from compression import CompressionMiddleware
+import storage
+import store
+import parsing
+import rollups
+import forecast_views
+import transport
+from spatial import get_index as get_spatial_index
+from regiontree import get_tree as get_region_tree, cached_json
+from scheduler import scheduler, JobControl
+from resilience import kma_breaker
+from planner import plan as plan_job, PLAN_GUARD, PLAN_LARGE_JOB_SLOTS
+from subscriptions import SubscriptionStore, SyncRunner
+from jobstore import (
+    JobStore, RUNNING_STATUSES, WORKER_ID, ORPHAN_ERROR, FLUSH_INTERVAL as JOB_EVENTS_INTERVAL
+)
+from metrics import (
+    observe_stage, render_latest,
+    JOBS_ACTIVE, JOBS_QUEUED, REQUEST_SECONDS
+)
 
 # ──────────────────────────────────────────────────────────
 # 로깅 설정
@@ -55,56 +86,170 @@ app = FastAPI(title="기상 데이터 다운로더")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# 다운로드 작업 상태 저장소 (워커 간 공유 — 어느 워커든 상태 조회 · 제어 가능)
+job_store = JobStore()
+# 이 워커가 실행하는 작업의 제어 객체 (취소/일시정지/재개) — 재개 시 다시 실행할 설정도 함께 보관
+# (로그인 정보가 들어 있으므로 메모리에만). 끝난 작업은 TTL 이 지나거나 개수 상한을 넘으면 제거
+job_controls: "OrderedDict[str, dict]" = OrderedDict()
+task_lock = threading.Lock()
+JOB_CONTROL_TTL = float(os.getenv("JOB_CONTROL_TTL", "3600"))
+JOB_CONTROL_MAX_FINISHED = int(os.getenv("JOB_CONTROL_MAX_FINISHED", "200"))
+# 다른 워커(owner)가 제어 요청을 가져갈 때까지 기다리는 시간
+JOB_CONTROL_ACCEPT_TIMEOUT = float(os.getenv("JOB_CONTROL_ACCEPT_TIMEOUT", "5"))
+
+# 구독(정기 증분 동기화) 정의 · 워터마크 저장소와 이 워커의 동기화 루프
+subscription_store = SubscriptionStore()
+sync_runner = SyncRunner(subscription_store)
+
+# 크기 제한을 넘는 작업(PLAN_GUARD=queue)은 이 워커에서 PLAN_LARGE_JOB_SLOTS 개씩만 실행
+large_job_slots = asyncio.Semaphore(PLAN_LARGE_JOB_SLOTS)
+
+def _evict_job_controls():
+    """끝난 작업의 제어 객체 정리 (진행 중인 작업은 건드리지 않음). task_lock 을 잡은 채 호출"""
+    now = time.monotonic()
+    finished = [tid for tid, e in job_controls.items() if e.get("finished_at") is not None]
+    for i, tid in enumerate(finished):
+        if len(finished) - i > JOB_CONTROL_MAX_FINISHED \
+                or now - job_controls[tid]["finished_at"] > JOB_CONTROL_TTL:
+            del job_controls[tid]
+
 # DB 초기화
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     init_db()
+    # 다른 워커가 요청한 제어는 기록 스레드에서 받아 이 이벤트 루프에서 처리
+    loop = asyncio.get_running_loop()
+    job_store.recover_orphans()
+    job_store.start(
+        lambda task_id, action: asyncio.run_coroutine_threadsafe(
+            _apply_control(task_id, action), loop
+        )
+    )
+    sync_runner.start()
 
-# 다운로드 작업 상태 저장소
-download_tasks: Dict[str, dict] = {}
-task_lock = threading.Lock()
+@app.on_event("shutdown")
+def on_shutdown():
+    # 동기화 루프 중지 + 남은 진행률 기록 + 공유 연결 풀 · 파싱 프로세스 정리
+    sync_runner.stop()
+    job_store.stop()
+    transport.close()
+    parsing.close_shared_pool()
 
 # 지역 DB (단기예보용)
 DB_PATH = os.getenv("DB_PATH", "data/local_codes.db")
 region_db = RegionDatabase(db_path=DB_PATH)
 
-# 클라이언트 ID 미들웨어
-class ClientIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        cid = request.cookies.get("client_id")
-        if not cid:
-            cid = str(uuid.uuid4())
-            set_cookie = True
-        else:
-            set_cookie = False
-        request.state.client_id = cid
-        response = await call_next(request)
+# 응답 압축 (gzip / br 협상, 이미 압축된 다운로드 · Range 응답은 제외)
+app.add_middleware(CompressionMiddleware)
+
+# 클라이언트 ID 미들웨어 (순수 ASGI: 응답 본문을 감싸지 않고 시작 메시지에 쿠키만 추가)
+CLIENT_ID_MAX_AGE = 60*60*24*365
+
+class ClientIDMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        cookies = {}
+        for k, v in scope["headers"]:
+            if k == b"cookie":
+                cookies = cookie_parser(v.decode("latin-1"))
+                break
+        cid = cookies.get("client_id")
+        set_cookie = not cid
         if set_cookie:
-            response.set_cookie(
-                "client_id", cid,
-                max_age=60*60*24*365,
-                path="/", httponly=False
-            )
-        return response
+            cid = str(uuid.uuid4())
+        # request.state.client_id 로 읽힘
+        scope.setdefault("state", {})["client_id"] = cid
+        if not set_cookie:
+            return await self.app(scope, receive, send)
+
+        cookie = f"client_id={cid}; Max-Age={CLIENT_ID_MAX_AGE}; Path=/; SameSite=lax".encode()
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message["headers"], (b"set-cookie", cookie)]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
 
 app.add_middleware(ClientIDMiddleware)
 
+# 엔드포인트별 응답시간 미들웨어 (라벨은 경로 템플릿 기준 → 카디널리티 제한)
+# 순수 ASGI: 스트리밍 응답은 마지막 청크를 보낸 시점까지 측정
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "other")
+            REQUEST_SECONDS.labels(
+                method=scope["method"], path=path, status=str(status)
+            ).observe(time.perf_counter() - t0)
+
+app.add_middleware(MetricsMiddleware)
+
 # ──────────────────────────────────────────────────────────
 # 홈 페이지
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    # 지역 트리 버전을 심어 두면 첫 요청부터 immutable 캐시를 탐
+    return templates.TemplateResponse("index.html", {
+        "request": request, "regions_version": get_region_tree(region_db).version
+    })
 
 # 단기예보용: 지역 조회
 @app.get("/api/regions", response_class=JSONResponse)
-async def get_regions(search: Optional[str] = Query("", description="검색어")):
+async def get_regions(request: Request, search: Optional[str] = Query("", description="검색어")):
     try:
+        if not search:
+            tree = get_region_tree(region_db)
+            return cached_json(request, tree.encoded("regions"), tree.version)
         regions = region_db.get_available_regions(search_term=search)
         return {"regions": regions}
     except Exception as e:
         logger.error(f"지역 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="지역 조회 중 오류 발생")
 
+# 지역 트리: 전체를 압축 배열로 한 번에 (rows = [level1 번호, level2 번호, level3, code])
+@app.get("/api/regions/compact")
+def get_regions_compact(request: Request):
+    tree = get_region_tree(region_db)
+    return cached_json(request, tree.encoded("compact"), tree.version)
+
+# 지역 트리: 한 단계씩 펼치기 (시도 → 시군구 → 읍면동)
+@app.get("/api/regions/tree")
+def get_region_children(request: Request):
+    tree = get_region_tree(region_db)
+    return cached_json(request, tree.children(), tree.version)
+
+@app.get("/api/regions/tree/{level1}")
+def get_region_children_l1(request: Request, level1: str):
+    tree = get_region_tree(region_db)
+    return cached_json(request, tree.children(level1), tree.version)
+
+@app.get("/api/regions/tree/{level1}/{level2}")
+def get_region_children_l2(request: Request, level1: str, level2: str):
+    tree = get_region_tree(region_db)
+    return cached_json(request, tree.children(level1, level2), tree.version)
+
 @app.get("/api/configs")
 async def get_configs():
     configs = [
@@ -186,6 +331,7 @@ async def start_download(
     variables: str = Form(...),
     start_date: str = Form(...),
     end_date: str = Form(...),
+    trace: bool = Form(False),
 ):
     try:
         region_objs = json.loads(regions)
@@ -199,32 +345,130 @@ async def start_download(
             start_date=datetime.strptime(start_date, "%Y-%m-%d"),
             end_date=  datetime.strptime(end_date, "%Y-%m-%d"),
         )
+        # 항목 계획 → 크기 제한 (reject 면 413, queue 면 대량 작업 자리를 기다림)
+        # (이력 조회는 SQLite 이므로 스레드에서 — 계획 자체는 구간 수에 비례하는 산술 계산)
+        plan = await asyncio.to_thread(lambda: plan_job(cfg, job_store.item_stats()))
+        large = plan["guard"]["exceeded"]
+        if large and PLAN_GUARD == "reject":
+            raise HTTPException(status_code=413, detail={
+                "message": "작업이 너무 큽니다: " + ", ".join(plan["guard"]["reasons"]),
+                "plan": plan,
+            })
+        status = "queued" if large and large_job_slots.locked() else "started"
         tid = str(uuid.uuid4())
+        await asyncio.to_thread(
+            job_store.create, tid, current_user['username'], request.state.client_id, status=status
+        )
         with task_lock:
-            download_tasks[tid] = {
-                "status":"started","progress":0,"total":0,
-                "current_item":"","error":None,
-                "files":[],"start_time":datetime.now(),
+            _evict_job_controls()
+            job_controls[tid] = {
+                "control": JobControl(), "cfg": cfg, "client_id": request.state.client_id,
+                "username": current_user['username'], "trace": trace,
+                "large": large, "item_seconds": plan["item_seconds"],
             }
+        JOBS_QUEUED.inc()
         background_tasks.add_task(
             run_download, tid, cfg,
             client_id=request.state.client_id,
-            username=current_user['username']
+            username=current_user['username'],
+            trace=trace
         )
-        return {"task_id":tid,"status":"started"}
+        return {"task_id": tid, "status": status, "plan": plan}
+    except HTTPException:
+        raise
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"다운로드 시작 실패: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# 작업 계획: 실행 전에 요청 수 · 예상 크기 · 예상 시간 확인 (로그인 정보 불필요)
+@app.post("/api/download/plan", response_class=JSONResponse)
+def plan_download(
+    current_user: dict = Depends(get_current_user),
+    regions: str = Form(...),
+    config_name: str = Form(...),
+    variables: str = Form(...),
+    start_date: str = Form(...),
+    end_date: str = Form(...),
+):
+    try:
+        cfg = DownloadConfig(
+            login_id="",
+            password="",
+            regions=json.loads(regions),
+            config_name=config_name,
+            variables=json.loads(variables),
+            start_date=datetime.strptime(start_date, "%Y-%m-%d"),
+            end_date=  datetime.strptime(end_date, "%Y-%m-%d"),
+        )
+        return plan_job(cfg, job_store.item_stats())
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# 단기예보 결과를 파일로 저장하지 않고 하나의 표로 바로 스트리밍
+@app.post("/api/download/stream")
+def stream_download(
+    current_user: dict = Depends(get_current_user),
+    login_id: str = Form(...),
+    password: str = Form(...),
+    regions: str = Form(...),
+    config_name: str = Form(...),
+    variables: str = Form(...),
+    start_date: str = Form(...),
+    end_date: str = Form(...),
+    format: str = Form("csv", description="csv | arrow"),
+):
+    try:
+        cfg = DownloadConfig(
+            login_id=login_id,
+            password=password,
+            regions=json.loads(regions),
+            config_name=config_name,
+            variables=json.loads(variables),
+            start_date=datetime.strptime(start_date, "%Y-%m-%d"),
+            end_date=  datetime.strptime(end_date, "%Y-%m-%d"),
+        )
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    as_arrow = format == "arrow"
+    # 지역마다 헤더가 다른 KMA 원본 대신 긴 형식 (청크마다 컬럼이 같아야 하나의 표가 됨)
+    frames = WeatherDownloader().iter_shortterm_frames(cfg, as_arrow=as_arrow, normalized=True)
+    body = batches_to_arrow(frames) if as_arrow else frames_to_csv(frames)
+    # 첫 청크를 미리 당겨 로그인/요청 오류는 정상적인 HTTP 오류로 반환
+    try:
+        first = next(body, b"")
+    except Exception as e:
+        logger.error(f"스트리밍 다운로드 실패: {e}")
+        raise HTTPException(status_code=502, detail=f"외부 API 호출 실패: {e}")
+
+    def _chain():
+        yield first
+        yield from body
+
+    ext, media = ("arrows", "application/vnd.apache.arrow.stream") if as_arrow else ("csv", "text/csv")
+    filename = f"{config_name}_{start_date}_{end_date}.{ext}"
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    return StreamingResponse(_chain(), media_type=media, headers=headers)
+
 # 다운로드 상태 조회
+# (저장소 기록이 밀려 있으면 여기서 flush 하므로 동기 함수 — 스레드 풀에서 실행)
 @app.get("/api/status/{task_id}", response_class=JSONResponse)
-async def get_download_status(task_id: str):
-    with task_lock:
-        if task_id not in download_tasks:
-            raise HTTPException(status_code=404, detail="Task not found")
-        data = download_tasks[task_id].copy()
+def get_download_status(task_id: str, include_files: bool = Query(False)):
+    # 파일 목록은 요청할 때만 (기본은 file_count)
+    data = job_store.get(task_id, include_files=include_files)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Task not found")
     elapsed = datetime.now() - data["start_time"]
     data["elapsed_time"] = str(elapsed).split(".")[0]
+    # 대기 순번 / 예상 남은 시간 (진행 중인 작업만 — 이 워커 작업이면 현재 값, 아니면 마지막 기록)
+    stored = data.pop("sched", None)
+    sched = scheduler.status(task_id) or stored
+    if sched and data["status"] in RUNNING_STATUSES:
+        data.update(sched)
+    # KMA 회로 차단기 상태 (open 이면 모든 작업이 retry_after 초 동안 대기)
+    data["upstream"] = kma_breaker.snapshot()
     return data
 
 # 다운로드된 파일 목록 & 개별 다운로드
@@ -235,53 +479,512 @@ async def get_downloaded_files():
     if os.path.exists(dl_dir):
         for r, _, fns in os.walk(dl_dir):
             for fn in fns:
-                if fn.endswith(".csv"):
+                if fn.endswith(".csv") or fn.endswith(".csv.zst"):
                     full = os.path.join(r, fn)
                     st = os.stat(full)
+                    # 압축 저장본도 논리 경로(.csv)로 노출 → download-file 이 투명 처리
+                    logical = storage.logical_path(full)
                     out.append({
-                        "name":fn, "path":os.path.relpath(full, dl_dir),
-                        "size":st.st_size,
+                        "name":os.path.basename(logical), "path":os.path.relpath(logical, dl_dir),
+                        "size":st.st_size, "compressed":full != logical,
                         "modified":datetime.fromtimestamp(st.st_mtime).isoformat()
                     })
     return {"files": sorted(out, key=lambda x: x["modified"], reverse=True)}
 
-@app.get("/api/download-file/{file_path:path}")
-async def download_file(file_path: str):
+@app.api_route("/api/download-file/{file_path:path}", methods=["GET", "HEAD"])
+async def download_file(request: Request, file_path: str):
     real = unquote(file_path)
-    full = os.path.join("downloads", real)
-    if not os.path.exists(full):
+    root = os.path.abspath("downloads")
+    full = os.path.abspath(os.path.join(root, real))
+    if not full.startswith(root + os.sep):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(full, media_type="application/octet-stream", filename=os.path.basename(full))
+    return serve_file(request, full, filename=os.path.basename(full))
+
+# 작업 결과 전체를 ZIP 하나로 스트리밍 (파일별 왕복 대신)
+@app.get("/api/jobs/{task_id}/bundle")
+def download_job_bundle(task_id: str):
+    if not job_store.exists(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    files = [p for p in job_store.files(task_id) if os.path.exists(p)]
+    if not files:
+        raise HTTPException(status_code=404, detail="No files for this task")
+    # ZIP 내부 경로: downloads/<client_id>/ 이하
+    root = os.path.commonpath([os.path.abspath(p) for p in files])
+    while os.path.isfile(root):
+        root = os.path.dirname(root)
+    entries = [(p, os.path.relpath(os.path.abspath(p), os.path.dirname(root))) for p in files]
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=kma_{task_id}.zip"}
+    )
 
 # 백그라운드 작업
-async def run_download(task_id: str, cfg: DownloadConfig, client_id: str, username: str):
+async def run_download(task_id: str, cfg: DownloadConfig, client_id: str, username: str,
+                       trace: bool = False):
+    with task_lock:
+        entry = job_controls[task_id]
+        entry["finished_at"] = None
+        job_controls.move_to_end(task_id)
+    control = entry["control"]
+    control.task = asyncio.current_task()
+    holds_large_slot = False
+    # 대량 작업 자리를 기다리는 동안은 대기(JOBS_QUEUED), 자리를 얻은 뒤부터 실행(JOBS_ACTIVE)
+    active = False
+    tr = NULL_TRACE
     try:
-        dw = WeatherDownloader()
+        if entry.get("large"):
+            # 크기 제한을 넘는 작업: 앞선 대량 작업이 끝날 때까지 대기 (취소 가능)
+            if large_job_slots.locked():
+                await asyncio.to_thread(
+                    job_store.update, task_id, RUNNING_STATUSES,
+                    status="queued", current_item="대량 작업 대기 중",
+                )
+            await large_job_slots.acquire()
+            holds_large_slot = True
+            await asyncio.to_thread(
+                job_store.update, task_id, RUNNING_STATUSES, status="started", current_item=""
+            )
+        JOBS_QUEUED.dec()
+        JOBS_ACTIVE.inc()
+        active = True
+        # 공정 배분 단위는 사용자 (여러 브라우저로 나눠 요청해도 몫은 같음)
+        job = scheduler.register(task_id, username)
+        job.item_estimate = entry.get("item_seconds")
+        tr = start_trace(task_id, requested=trace)
+        dw = WeatherDownloader(trace=tr, job=job, control=control)
+        total = 0
+        # 진행률 · 파일은 모아서 기록 (항목마다 DB 쓰기를 하지 않음)
         def p_cb(cur, tot, item):
-            with task_lock:
-                download_tasks[task_id].update({
-                    "status":"downloading",
-                    "progress":cur,"total":tot,"current_item":item
-                })
+            nonlocal total
+            total = tot
+            job_store.progress(
+                task_id, status="downloading", progress=cur, total=tot, current_item=item,
+                sched=scheduler.status(task_id),
+            )
         def f_cb(path):
-            with task_lock:
-                download_tasks[task_id]["files"].append(path)
-        await dw.download(cfg, p_cb, f_cb, client_id)
-        with task_lock:
-            download_tasks[task_id].update({
-                "status":"completed",
-                "progress":download_tasks[task_id]["total"],
-                "current_item":"완료"
-            })
+            job_store.add_file(task_id, path)
+        def d_cb(entry):
+            job_store.add_dead_letter(task_id, entry)
+        await dw.download(cfg, p_cb, f_cb, client_id, dead_letter_callback=d_cb,
+                          item_callback=job_store.record_item)
+        await asyncio.to_thread(job_store.flush)
+        files = await asyncio.to_thread(job_store.files, task_id)
+        if PRECOMPRESS_ENCODINGS:
+            # 재전송 비용 절감용 .gz/.zst 사이블링 (serve_file 이 자동 선택)
+            for p in files:
+                if not p.endswith(storage.ZSTD_EXT):
+                    await asyncio.to_thread(precompress, p)
+        await asyncio.to_thread(
+            job_store.update, task_id, RUNNING_STATUSES,
+            status="completed", progress=total, current_item="완료",
+        )
         user = get_user_by_username(username)
-        for p in download_tasks[task_id]["files"]:
+        for p in files:
             create_download_log(client_id, os.path.basename(p), "success")
+    except asyncio.CancelledError:
+        if not control.cancelled:
+            raise
+        # 우리가 요청한 취소이므로 삼키고 작업(요청 태스크)은 정상 종료
+        asyncio.current_task().uncancel()
+        # 사용자 취소: 받은 파일은 그대로 두고 /resume 으로 남은 항목부터 재개 가능
+        logger.info(f"다운로드 취소 ({task_id}): {len(control.completed)}개 항목 완료")
+        await asyncio.to_thread(
+            job_store.update, task_id, RUNNING_STATUSES + ("cancelled",),
+            status="cancelled", current_item="취소됨", completed_items=len(control.completed),
+        )
     except Exception as e:
         logger.error(f"다운로드 오류 ({task_id}): {e}")
+        await asyncio.to_thread(
+            job_store.update, task_id, RUNNING_STATUSES, status="error", error=str(e)
+        )
+    finally:
+        control.task = None
+        if holds_large_slot:
+            large_job_slots.release()
+        scheduler.unregister(task_id)
+        if active:
+            JOBS_ACTIVE.dec()
+        else:
+            JOBS_QUEUED.dec()
+        if tr.enabled:
+            # 다른 워커에서도 /trace 를 조회할 수 있도록 저장소에 남김
+            try:
+                await asyncio.to_thread(job_store.save_trace, task_id, tr.to_chrome())
+            except Exception as e:
+                logger.warning(f"trace 저장 실패 ({task_id}): {e}")
         with task_lock:
-            download_tasks[task_id].update({
-                "status":"error","error":str(e)
-            })
+            entry["finished_at"] = time.monotonic()
+            _evict_job_controls()
+
+
+# 작업 제어: 취소 / 일시정지 / 재개
+# 작업을 실행하는 워커(owner)가 아니면 저장소에 요청을 남기고, owner 가 다음 기록 주기에 처리
+def _job_entry(task_id: str, current_user: dict) -> dict:
+    data = job_store.get(task_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if data["username"] != current_user["username"]:
+        raise HTTPException(status_code=403, detail="다른 사용자의 작업입니다.")
+    return data
+
+async def _apply_control(task_id: str, action: str):
+    """owner 워커의 이벤트 루프에서 실행"""
+    with task_lock:
+        entry = job_controls.get(task_id)
+    if entry is None:
+        if action in ("restart", "requeue"):
+            # 재개 요청이 왔지만 설정(로그인 정보)이 이미 정리됨 (실패 항목 목록은 그대로 둠)
+            await asyncio.to_thread(
+                job_store.update, task_id, status="error", error=EXPIRED_JOB_DETAIL
+            )
+        return
+    control = entry["control"]
+    if action == "cancel":
+        control.cancel()
+    elif action == "pause":
+        # 진행 중인 항목은 마저 받고, 다음 항목부터 멈춤
+        control.pause()
+        await asyncio.to_thread(
+            job_store.update, task_id, ("started", "downloading"), status="paused"
+        )
+    elif action == "resume":
+        control.resume()
+        await asyncio.to_thread(
+            job_store.update, task_id, ("paused",), status="downloading"
+        )
+    elif action in ("restart", "requeue") and control.task is None:
+        # 취소/오류로 끝난 작업: 끝난 항목은 건너뛰고 남은 항목부터 다시 실행
+        if action == "requeue":
+            # 실패 항목 재시도: 다시 실행할 수 있을 때만 목록을 비움
+            # (받은 항목은 completed 에 있으므로 다시 돌리면 실패 항목만 요청됨)
+            await asyncio.to_thread(job_store.clear_dead_letters, task_id)
+        await asyncio.to_thread(job_store.update, task_id, status="started", error=None)
+        control.reset()
+        JOBS_QUEUED.inc()
+        asyncio.create_task(run_download(
+            task_id, entry["cfg"],
+            client_id=entry["client_id"], username=entry["username"], trace=entry["trace"]
+        ))
+
+async def _control(task_id: str, action: str):
+    """
+    owner 가 제어를 받아들인 뒤에만 반환 (상태 전환은 그 다음).
+    owner 가 죽었으면 작업을 오류로 정리하고 410, 살아 있지만 응답이 없으면 409
+    """
+    with task_lock:
+        local = task_id in job_controls
+    if local:
+        await _apply_control(task_id, action)
+        return
+    if not await asyncio.to_thread(job_store.request_control, task_id, action):
+        await asyncio.to_thread(job_store.recover_orphans)
+        raise HTTPException(status_code=410, detail=ORPHAN_ERROR)
+    if not await asyncio.to_thread(
+        job_store.wait_control, task_id, action, JOB_CONTROL_ACCEPT_TIMEOUT
+    ):
+        raise HTTPException(
+            status_code=409, detail="작업을 실행 중인 워커가 응답하지 않습니다. 잠시 후 다시 시도해 주세요."
+        )
+
+EXPIRED_JOB_DETAIL = "작업 설정이 만료되어 다시 실행할 수 없습니다. 새로 요청해 주세요."
+
+def _check_restartable(task_id: str, data: dict):
+    """
+    다시 실행하려면 owner 워커가 살아 있고 설정이 남아 있어야 함
+    (설정은 owner 의 메모리에만 있으므로 owner 가 죽었으면 다시 실행할 수 없음)
+    """
+    if data["archived"]:
+        raise HTTPException(status_code=410, detail=EXPIRED_JOB_DETAIL)
+    if data["owner"] == WORKER_ID:
+        with task_lock:
+            local = task_id in job_controls
+        if not local:
+            raise HTTPException(status_code=410, detail=EXPIRED_JOB_DETAIL)
+    elif not job_store.owner_alive(data["owner"]):
+        raise HTTPException(status_code=410, detail=EXPIRED_JOB_DETAIL)
+
+# 내 작업 목록 (최근 시작 순, cursor 페이지네이션)
+@app.get("/api/jobs", response_class=JSONResponse)
+def list_jobs(
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    status: Optional[str] = Query(None),
+):
+    jobs, next_cursor = job_store.history(current_user["username"], limit, cursor, status)
+    return {"jobs": jobs, "next_cursor": next_cursor}
+
+@app.post("/api/jobs/{task_id}/cancel", response_class=JSONResponse)
+async def cancel_job(task_id: str, current_user: dict = Depends(get_current_user)):
+    status = (await asyncio.to_thread(_job_entry, task_id, current_user))["status"]
+    if status not in RUNNING_STATUSES:
+        raise HTTPException(status_code=409, detail=f"취소할 수 없는 상태입니다: {status}")
+    await _control(task_id, "cancel")
+    # 그 사이 완료 · 오류로 끝났으면 덮어쓰지 않음
+    if not await asyncio.to_thread(
+        job_store.update, task_id, RUNNING_STATUSES, status="cancelled"
+    ):
+        status = (await asyncio.to_thread(_job_entry, task_id, current_user))["status"]
+        if status != "cancelled":
+            raise HTTPException(status_code=409, detail=f"이미 끝난 작업입니다: {status}")
+    return {"task_id": task_id, "status": "cancelled"}
+
+@app.post("/api/jobs/{task_id}/pause", response_class=JSONResponse)
+async def pause_job(task_id: str, current_user: dict = Depends(get_current_user)):
+    status = (await asyncio.to_thread(_job_entry, task_id, current_user))["status"]
+    if status not in ("started", "downloading"):
+        raise HTTPException(status_code=409, detail=f"일시정지할 수 없는 상태입니다: {status}")
+    await _control(task_id, "pause")
+    return {"task_id": task_id, "status": "paused"}
+
+@app.post("/api/jobs/{task_id}/resume", response_class=JSONResponse)
+async def resume_job(task_id: str, current_user: dict = Depends(get_current_user)):
+    data = await asyncio.to_thread(_job_entry, task_id, current_user)
+    status = data["status"]
+    if status == "paused":
+        await _control(task_id, "resume")
+        return {"task_id": task_id, "status": "downloading"}
+    if status not in ("cancelled", "error"):
+        raise HTTPException(status_code=409, detail=f"재개할 수 없는 상태입니다: {status}")
+    await asyncio.to_thread(_check_restartable, task_id, data)
+    await _control(task_id, "restart")
+    return {"task_id": task_id, "status": "started"}
+
+@app.post("/api/jobs/{task_id}/dead-letters/requeue", response_class=JSONResponse)
+async def requeue_dead_letters(task_id: str, current_user: dict = Depends(get_current_user)):
+    data = await asyncio.to_thread(_job_entry, task_id, current_user)
+    status = data["status"]
+    if status in RUNNING_STATUSES:
+        raise HTTPException(status_code=409, detail=f"작업이 아직 진행 중입니다: {status}")
+    requeued = len(data["dead_letters"])
+    if not requeued:
+        raise HTTPException(status_code=409, detail="재시도할 실패 항목이 없습니다.")
+    await asyncio.to_thread(_check_restartable, task_id, data)
+    # 실패 항목 목록은 owner 가 재실행을 받아들일 때 비움 (거절되면 그대로 남음)
+    await _control(task_id, "requeue")
+    return {"task_id": task_id, "status": "started", "requeued": requeued}
+
+# 작업 상태 변경 스트림 (Server-Sent Events) — 저장소 rev 가 바뀔 때마다 상태 전송
+@app.get("/api/jobs/{task_id}/events")
+async def job_events(request: Request, task_id: str):
+    if await asyncio.to_thread(job_store.revision, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def stream():
+        last = None
+        while not await request.is_disconnected():
+            rev = await asyncio.to_thread(job_store.revision, task_id)
+            if rev != last:
+                last = rev
+                data = await asyncio.to_thread(get_download_status, task_id, False)
+                yield f"data: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+                if data["status"] not in RUNNING_STATUSES:
+                    return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+# 작업 trace 내보내기 (Chrome trace-event JSON → chrome://tracing, Perfetto 에서 열기)
+# 진행 중인 작업은 owner 워커의 메모리에서, 끝난 작업은 저장소에서 (어느 워커든)
+@app.get("/api/jobs/{task_id}/trace", response_class=JSONResponse)
+def get_job_trace(task_id: str):
+    tr = get_trace(task_id)
+    data = tr.to_chrome() if tr is not None else job_store.trace(task_id)
+    if data is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Trace not found (trace 미기록 · 만료, 또는 다른 워커에서 진행 중 — 작업이 끝나면 조회 가능)",
+        )
+    return JSONResponse(
+        data,
+        headers={"Content-Disposition": f"attachment; filename=trace_{task_id}.json"}
+    )
+
+# Prometheus 스크레이프 엔드포인트
+@app.get("/metrics")
+def metrics_endpoint():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+# 로컬 저장소 조회 (ASOS/AWS 관측 · 예보)
+@app.get("/api/query")
+def api_query(
+    source: str = Query(..., description="asos | aws | forecast"),
+    keys: Optional[str] = Query(None, description="관측소 코드 또는 격자(nx_ny), 쉼표 구분"),
+    variables: Optional[str] = Query(None, description="관측 컬럼 또는 예보 변수 코드, 쉼표 구분"),
+    start: Optional[str] = Query(None, description="시작 시각 (YYYYMMDD 또는 YYYYMMDDHH)"),
+    end: Optional[str] = Query(None, description="종료 시각 (미포함)"),
+    columns: Optional[str] = Query(None, description="반환할 컬럼, 쉼표 구분"),
+    config: Optional[str] = Query(None, description="예보 설정 (단기예보 등)"),
+    format: str = Query("csv", description="csv | ndjson"),
+):
+    if source not in store.PARTITIONS:
+        raise HTTPException(400, detail=f"지원하지 않는 source: {source}")
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(400, detail="format 은 csv 또는 ndjson 입니다.")
+
+    def _split(v):
+        return [x.strip() for x in v.split(",") if x.strip()] if v else None
+
+    def _time(v):
+        if not v:
+            return None
+        try:
+            return datetime.strptime(v, "%Y%m%d%H" if len(v) == 10 else "%Y%m%d")
+        except ValueError:
+            raise HTTPException(400, detail="start/end 는 YYYYMMDD 또는 YYYYMMDDHH 형식입니다.")
+
+    try:
+        scanner = store.scan(
+            source, keys=_split(keys), variables=_split(variables),
+            start=_time(start), end=_time(end), columns=_split(columns), config=config,
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(404, detail=str(e))
+
+    if format == "csv":
+        return StreamingResponse(store.iter_csv(scanner), media_type="text/csv")
+    return StreamingResponse(store.iter_ndjson(scanner), media_type="application/x-ndjson")
+
+# 일/월/임의 기간 집계 (저장소 원자료로부터 증분 집계된 결과)
+@app.get("/api/rollups")
+def api_rollups(
+    source: str = Query(..., description="asos | aws | forecast(초단기실황)"),
+    keys: str = Query(..., description="관측소 코드 또는 격자(nx_ny), 쉼표 구분"),
+    freq: str = Query("day", description="day | month | pandas offset (7D, W, QS, 3h …)"),
+    columns: Optional[str] = Query(None, description="집계할 컬럼/변수, 쉼표 구분"),
+    start: Optional[str] = Query(None, description="시작 날짜 (YYYYMMDD)"),
+    end: Optional[str] = Query(None, description="종료 날짜 (YYYYMMDD, 포함)"),
+    stats: str = Query("min,max,mean,sum", description="min,max,mean,sum,count 중 선택"),
+    format: str = Query("json", description="json | csv"),
+):
+    if source not in store.PARTITIONS:
+        raise HTTPException(400, detail=f"지원하지 않는 source: {source}")
+    stat_list = [x.strip() for x in stats.split(",") if x.strip()]
+    if not stat_list or any(x not in rollups.STATS for x in stat_list):
+        raise HTTPException(400, detail=f"stats 는 {','.join(rollups.STATS)} 중에서 선택합니다.")
+    key_list = [station_map.get(k.strip(), k.strip()) for k in keys.split(",") if k.strip()]
+    col_list = [x.strip() for x in columns.split(",") if x.strip()] if columns else None
+    try:
+        df = rollups.query(source, key_list, freq, col_list, start, end, stat_list)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+
+    if format == "csv":
+        return Response(df.to_csv(index=False), media_type="text/csv")
+    return JSONResponse({
+        "source": source,
+        "freq": freq,
+        "columns": list(df.columns),
+        "rows": json.loads(df.to_json(orient="values")),
+    })
+
+# 예보 뷰: 유효시각별 최신 발표(latest) / 선행시간 N 시간 예보(lead) — 파티션별 정렬 인덱스 캐시
+@app.get("/api/forecast/views/{kind}")
+def api_forecast_view(
+    kind: str,
+    regions: str = Query(..., description="격자(nx_ny), 쉼표 구분"),
+    variables: str = Query(..., description="예보 변수 코드, 쉼표 구분"),
+    config: str = Query("단기예보", description="예보 설정"),
+    lead: Optional[int] = Query(None, ge=0, description="선행시간(시간) — kind=lead 에 필요"),
+    start: Optional[str] = Query(None, description="유효시각 시작 (YYYYMMDD 또는 YYYYMMDDHH)"),
+    end: Optional[str] = Query(None, description="유효시각 종료 (미포함)"),
+    format: str = Query("json", description="json | csv | ndjson"),
+):
+    if format not in ("json", "csv", "ndjson"):
+        raise HTTPException(400, detail="format 은 json, csv, ndjson 중 하나입니다.")
+
+    def _time(v):
+        if not v:
+            return None
+        try:
+            return datetime.strptime(v, "%Y%m%d%H" if len(v) == 10 else "%Y%m%d")
+        except ValueError:
+            raise HTTPException(400, detail="start/end 는 YYYYMMDD 또는 YYYYMMDDHH 형식입니다.")
+
+    region_list = [x.strip() for x in regions.split(",") if x.strip()]
+    var_list = [x.strip() for x in variables.split(",") if x.strip()]
+    try:
+        df = forecast_views.view(kind, config, var_list, region_list, lead, _time(start), _time(end))
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+
+    if format == "csv":
+        return Response(df.to_csv(index=False), media_type="text/csv")
+    if format == "ndjson":
+        body = df.to_json(orient="records", lines=True, date_format="iso", force_ascii=False) if len(df) else ""
+        return Response(body, media_type="application/x-ndjson")
+    return JSONResponse({
+        "kind": kind,
+        "config": config,
+        "lead": lead,
+        "columns": list(df.columns),
+        "rows": json.loads(df.to_json(orient="values", date_format="iso")),
+    })
+
+# 격자별로 저장소에 있는 선행시간 목록 (lead 뷰 선택용)
+@app.get("/api/forecast/leads")
+def api_forecast_leads(
+    region: str = Query(..., description="격자(nx_ny)"),
+    variable: str = Query(..., description="예보 변수 코드"),
+    config: str = Query("단기예보"),
+):
+    return {"region": region, "variable": variable, "config": config,
+            "leads": forecast_views.available_leads(config, variable, region)}
+
+# ──────────────────────────────────────────────────────────
+# 공간 질의 (지역 격자 ↔ 관측소)
+def _resolve_point(region: Optional[str], lat: Optional[float], lon: Optional[float]):
+    index = get_spatial_index(region_db)
+    if region:
+        try:
+            return index.region_latlon(region)
+        except KeyError:
+            raise HTTPException(404, detail=f"지역 코드를 찾을 수 없습니다: {region}")
+    if lat is None or lon is None:
+        raise HTTPException(400, detail="region 또는 lat/lon 이 필요합니다.")
+    return lat, lon
+
+
+@app.get("/api/spatial/nearest-stations", response_class=JSONResponse)
+def api_nearest_stations(
+    region: Optional[str] = Query(None, description="지역 코드 (nx_ny)"),
+    lat: Optional[float] = Query(None),
+    lon: Optional[float] = Query(None),
+    n: int = Query(5, ge=1, le=100),
+    source: Optional[str] = Query(None, description="asos | aws (생략 시 전체)"),
+):
+    lat, lon = _resolve_point(region, lat, lon)
+    stations = get_spatial_index(region_db).nearest_stations(lat, lon, n, source)
+    for st in stations:
+        if st["source"] == "asos":
+            st["name"] = code2name.get(st["code"])
+    return {"lat": lat, "lon": lon, "stations": stations}
+
+
+@app.get("/api/spatial/regions-within", response_class=JSONResponse)
+def api_regions_within(
+    region: Optional[str] = Query(None, description="지역 코드 (nx_ny)"),
+    lat: Optional[float] = Query(None),
+    lon: Optional[float] = Query(None),
+    radius_km: float = Query(..., gt=0, le=500),
+):
+    lat, lon = _resolve_point(region, lat, lon)
+    return {"lat": lat, "lon": lon,
+            "regions": get_spatial_index(region_db).regions_within(lat, lon, radius_km)}
+
+
+@app.get("/api/spatial/regions-bbox", response_class=JSONResponse)
+def api_regions_bbox(
+    min_lat: float = Query(...), min_lon: float = Query(...),
+    max_lat: float = Query(...), max_lon: float = Query(...),
+):
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(400, detail="min 값이 max 값보다 큽니다.")
+    return {"regions": get_spatial_index(region_db).regions_in_bbox(min_lat, min_lon, max_lat, max_lon)}
 
 # ASOS 관측소 목록
 @app.get("/api/asos/stations", response_class=JSONResponse)
@@ -296,6 +999,7 @@ SERVICE_KEY = "iCNxo2r0TdZnnV63/ItO+QrOUqJakXCxx/m20BsCp53DGZzJMDd1/7jOGLYQE+Sn+
 # ASOS 다운로드
 @app.get("/api/download/asos", response_class=StreamingResponse)
 def api_download_asos(
+    background_tasks: BackgroundTasks,
     start_date:  str = Query(..., alias="start", description="시작 날짜 (YYYYMMDD)"),
     end_date:    str = Query(..., alias="end",   description="종료 날짜 (YYYYMMDD)"),
     region_key:  str = Query(..., alias="stnIds",description="지역 이름 또는 관측소 코드"),
@@ -315,9 +1019,13 @@ def api_download_asos(
     if not key:
         raise HTTPException(500, detail="SERVICE_KEY가 설정되지 않았습니다.")
 
-    # 3) 데이터 조회
+    # 3) 데이터 조회 (로컬 저장소에 있는 날짜는 재사용, 없는 구간만 API 호출)
+    station_id = station_map.get(region_key, region_key)
     try:
-        df = fetch_asos_data(key, start_date, end_date, region_key)
+        df = store.cached_observations(
+            "asos", station_id, start_date, end_date,
+            lambda s, e: fetch_asos_data(key, s, e, station_id)
+        )
     except ValueError as e:
         logger.error(f"Invalid parameter: {e}")
         raise HTTPException(400, detail=str(e))
@@ -327,15 +1035,132 @@ def api_download_asos(
 
     if df.empty:
         raise HTTPException(404, detail="해당 조건의 데이터가 없습니다.")
+    # 새로 적재된 월은 응답 후 집계 갱신
+    background_tasks.add_task(rollups.refresh, "asos", station_id)
 
     # 4) CSV 스트림
     buf = io.StringIO()
-    df.to_csv(buf, index=False)
+    with observe_stage("csv_serialize", source="asos"):
+        df.to_csv(buf, index=False)
     buf.seek(0)
 
     filename = f"ASOS_{region_key}_{start_date}_{end_date}.csv"
     headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(buf, media_type="text/csv", headers=headers)# 애플리케이션 실행
+    return StreamingResponse(buf, media_type="text/csv", headers=headers)
+
+
+# AWS(방재기상관측) 다운로드
+@app.get("/api/download/aws", response_class=StreamingResponse)
+def api_download_aws(
+    background_tasks: BackgroundTasks,
+    start_date: str = Query(..., alias="start", description="시작 날짜 (YYYYMMDD)"),
+    end_date:   str = Query(..., alias="end",   description="종료 날짜 (YYYYMMDD)"),
+    stn:        str = Query(ALL_STATIONS, description="지점 코드 (0: 전체)"),
+    variables:  str = Query("TA,RN,WD,HM,PS", alias="vars", description="TA,RN,WD,HM,PS 중 선택"),
+    auth_key:   str = Query(None, alias="auth_key", description="apihub 인증키 (선택)"),
+):
+    logger.info(f"AWS download request - start={start_date}, end={end_date}, stn={stn}, vars={variables}")
+
+    # 1) 파라미터 검증
+    for d in (start_date, end_date):
+        try:
+            datetime.strptime(d, "%Y%m%d")
+        except ValueError:
+            raise HTTPException(400, detail="start/end 파라미터가 YYYYMMDD 형식이 아닙니다.")
+    var_list = sorted({v.strip().upper() for v in variables.split(",") if v.strip()})
+    if not var_list or any(v not in AWS_VARIABLES for v in var_list):
+        raise HTTPException(400, detail=f"vars 는 {','.join(AWS_VARIABLES)} 중에서 선택합니다.")
+
+    key = auth_key or AWS_AUTH_KEY
+    if not key:
+        raise HTTPException(500, detail="AWS_AUTH_KEY가 설정되지 않았습니다.")
+
+    # 2) 데이터 조회 (저장소에 있는 날짜는 재사용 — 변수별로 범위 기록, 파티션은 열 단위 병합)
+    try:
+        df = store.cached_observations(
+            "aws", stn, start_date, end_date,
+            lambda s, e: fetch_aws_data(key, s, e, stn, var_list),
+            coverage_keys=[f"{stn}:{v}" for v in var_list],
+        )
+    except Exception as e:
+        logger.error(f"Error fetching AWS data: {e}")
+        raise HTTPException(502, detail=f"외부 API 호출 실패: {e}")
+
+    if df.empty:
+        raise HTTPException(404, detail="해당 조건의 데이터가 없습니다.")
+    # 같은 파티션에 다른 요청이 받아 둔 변수도 있으므로 요청한 변수의 컬럼만
+    columns = [c for v in var_list for c in AWS_VARIABLES[v] if c in df.columns]
+    df = df[["time", "station_id", *columns]]
+    for station in df["station_id"].unique():
+        background_tasks.add_task(rollups.refresh, "aws", station)
+
+    # 3) CSV 스트림
+    buf = io.StringIO()
+    with observe_stage("csv_serialize", source="aws"):
+        df.to_csv(buf, index=False)
+    buf.seek(0)
+
+    filename = f"AWS_{stn}_{start_date}_{end_date}.csv"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    return StreamingResponse(buf, media_type="text/csv", headers=headers)
+
+# ──────────────────────────────────────────────────────────
+# 구독: 지정한 격자 · 관측소를 주기적으로 워터마크 이후만 받아 최신 상태로 유지
+
+def _own_subscription(sub_id: int, current_user: dict) -> dict:
+    sub = subscription_store.get(sub_id)
+    if sub is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    if sub["username"] != current_user["username"]:
+        raise HTTPException(status_code=403, detail="다른 사용자의 구독입니다.")
+    return sub
+
+@app.post("/api/subscriptions", response_class=JSONResponse)
+def create_subscription(
+    current_user: dict = Depends(get_current_user),
+    name: str = Form(...),
+    source: str = Form(..., description="forecast | asos | aws"),
+    keys: str = Form(..., description="예보: 지역 객체 JSON 배열 / 관측: 관측소 코드(또는 이름) JSON 배열"),
+    variables: str = Form("[]", description="예보: 변수 객체 JSON 배열 / AWS: 변수 코드 JSON 배열"),
+    config_name: str = Form(""),
+    interval_minutes: float = Form(60),
+    backfill_from: Optional[str] = Form(None, description="이 날짜 이후 자료부터 (YYYY-MM-DD)"),
+):
+    try:
+        key_list = json.loads(keys)
+        if source == "asos":
+            key_list = [station_map.get(str(k), str(k)) for k in key_list]
+        sub_id = subscription_store.create(
+            current_user["username"], name, source, key_list, json.loads(variables),
+            interval_minutes * 60, config_name=config_name,
+            backfill_from=datetime.strptime(backfill_from, "%Y-%m-%d") if backfill_from else None,
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return subscription_store.get(sub_id)
+
+# 내 구독 목록 + 구독별 신선도 요약
+@app.get("/api/subscriptions", response_class=JSONResponse)
+def list_subscriptions(current_user: dict = Depends(get_current_user)):
+    return {"subscriptions": subscription_store.by_user(current_user["username"])}
+
+# 구독 상세: 대상(지점 × 변수)별 워터마크 · 신선도 · 마지막 오류
+@app.get("/api/subscriptions/{sub_id}", response_class=JSONResponse)
+def get_subscription(sub_id: int, current_user: dict = Depends(get_current_user)):
+    return _own_subscription(sub_id, current_user)
+
+@app.post("/api/subscriptions/{sub_id}/sync", response_class=JSONResponse)
+def sync_subscription_now(sub_id: int, current_user: dict = Depends(get_current_user)):
+    _own_subscription(sub_id, current_user)
+    return {"id": sub_id, "scheduled_targets": subscription_store.trigger(sub_id)}
+
+@app.delete("/api/subscriptions/{sub_id}", response_class=JSONResponse)
+def delete_subscription(sub_id: int, current_user: dict = Depends(get_current_user)):
+    _own_subscription(sub_id, current_user)
+    subscription_store.delete(sub_id)
+    return {"id": sub_id, "deleted": True}
+
+# 애플리케이션 실행
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,108 @@
+# metrics.py
+
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    Counter, Gauge, Histogram,
+    CONTENT_TYPE_LATEST, generate_latest
+)
+
+# --- 단계별 소요시간 ---
+# stage: login / prepare / zip_download / extract / asos_page / csv_serialize
+STAGE_SECONDS = Histogram(
+    "kma_stage_seconds",
+    "다운로드 파이프라인 단계별 소요시간(초)",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+# --- 업스트림 트래픽 / 실패 ---
+BYTES_TRANSFERRED = Counter(
+    "kma_bytes_transferred_total",
+    "업스트림에서 받은 바이트 수",
+    ["source"],
+)
+RETRIES = Counter(
+    "kma_retries_total",
+    "업스트림 요청 재시도 횟수",
+    ["source"],
+)
+UPSTREAM_ERRORS = Counter(
+    "kma_upstream_errors_total",
+    "업스트림 요청 실패 횟수",
+    ["source", "stage"],
+)
+EMPTY_ZIPS = Counter(
+    "kma_empty_zip_total",
+    "파일이 하나도 없는 ZIP 응답 수",
+)
+DEAD_LETTERS = Counter(
+    "kma_dead_letter_items_total",
+    "재시도를 모두 소진해 실패 목록으로 간 항목 수",
+)
+# 0: closed(정상) / 1: half-open(시험 요청) / 2: open(전체 대기)
+CIRCUIT_STATE = Gauge(
+    "kma_circuit_state",
+    "업스트림 회로 차단기 상태",
+    ["source"],
+)
+COALESCED_REQUESTS = Counter(
+    "kma_coalesced_requests_total",
+    "진행 중인 동일 요청에 합류해 업스트림 호출을 생략한 횟수",
+)
+
+# --- 작업 큐 ---
+JOBS_ACTIVE = Gauge("kma_jobs_active", "실행 중인 다운로드 작업 수")
+JOBS_QUEUED = Gauge("kma_jobs_queued", "시작 대기 중인 다운로드 작업 수")
+
+# --- 구독 동기화 ---
+# result: ok / empty / error / skipped
+SYNC_RUNS = Counter(
+    "kma_sync_runs_total",
+    "구독 대상(소스 · 지점 · 변수) 증분 동기화 실행 수",
+    ["source", "result"],
+)
+SYNC_ROWS = Counter(
+    "kma_sync_rows_total",
+    "구독 동기화로 저장소에 적재한 행 수",
+    ["source"],
+)
+
+# --- 캐시 ---
+# result: hit / miss  →  적중률 = hit / (hit + miss)
+CACHE_REQUESTS = Counter(
+    "kma_cache_requests_total",
+    "캐시 조회 결과",
+    ["cache", "result"],
+)
+
+# --- API ---
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "엔드포인트별 응답 시간(초)",
+    ["method", "path", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+@contextmanager
+def observe_stage(stage: str, source: str = "kma"):
+    """with 블록의 소요시간을 stage 히스토그램에 기록 (예외 시 에러 카운터 증가)"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(source=source, stage=stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - t0)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render_latest():
+    """(본문, content-type) 반환 — /metrics 엔드포인트용"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,227 @@
+# parsing.py
+
+import os
+import re
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+import storage
+
+# KMA 동네예보 CSV 형식 (EUC-KR)
+#   " day,hour,forecast,value location:60_127 Start : 20220101"
+#   " 1,200,+4,-3.0"
+#   ...
+#   " Start : 20220201"        ← 달이 바뀔 때마다 구분 행
+# 초단기실황은 forecast 컬럼이 없음 (day,hour,value)
+_START_RE = re.compile(r"Start\s*:\s*(\d{6,8})")
+_LOCATION_RE = re.compile(r"location\s*:\s*([0-9_]+)")
+_NUMBER_RE = re.compile(rb"[-+]?\d+(?:\.\d+)?")
+
+FORECAST_SCHEMA = pa.schema([
+    ("region", pa.dictionary(pa.int32(), pa.string())),
+    ("issue_time", pa.timestamp("s")),
+    ("lead", pa.int16()),
+    ("valid_time", pa.timestamp("s")),
+    ("value", pa.float32()),
+])
+
+# 공유 파싱 프로세스 수 (0 이면 풀 없이 호출한 스레드에서 파싱)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+# 저장소 적재 시 ZIP 의 압축 해제 크기가 이 이상일 때만 풀 사용 (작은 ZIP 은 전달 비용이 더 큼)
+PARSE_POOL_MIN_BYTES = int(os.getenv("PARSE_POOL_MIN_BYTES", str(4 << 20)))
+
+
+def _month_start(yyyymm: str) -> np.datetime64:
+    return np.datetime64(f"{yyyymm[:4]}-{yyyymm[4:6]}-01T00:00", "s")
+
+
+def parse_forecast_csv(data: bytes) -> pa.RecordBatch:
+    """
+    KMA 예보/실황 CSV 한 개 → FORECAST_SCHEMA RecordBatch.
+    구분 행(Start : …)으로 나뉜 구간마다 숫자를 정규식으로 한 번에 뽑아 reshape 하므로
+    행 단위 파이썬 루프가 없습니다.
+    """
+    text = data.decode("euc-kr", errors="replace")
+    header = text.split("\n", 1)[0]
+    ncols = len(header.split("location")[0].strip().strip(",").split(","))
+    loc = _LOCATION_RE.search(header)
+    region = loc.group(1) if loc else ""
+
+    # [머리말, 월1, 본문1, 월2, 본문2, ...]
+    parts = _START_RE.split(text)
+    issue, lead, value = [], [], []
+    for yyyymm, body in zip(parts[1::2], parts[2::2]):
+        nums = np.array(_NUMBER_RE.findall(body.encode("ascii", "ignore")), dtype=np.float64)
+        if nums.size < ncols:
+            continue
+        rows = nums[: nums.size - nums.size % ncols].reshape(-1, ncols)
+        day, hhmm = rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64)
+        t = (
+            _month_start(yyyymm)
+            + (day - 1) * np.timedelta64(1, "D")
+            + (hhmm // 100) * np.timedelta64(1, "h")
+            + (hhmm % 100) * np.timedelta64(1, "m")
+        )
+        issue.append(t)
+        lead.append(rows[:, 2].astype(np.int16) if ncols >= 4 else np.zeros(len(rows), np.int16))
+        value.append(rows[:, -1].astype(np.float32))
+
+    if issue:
+        issue_t = np.concatenate(issue)
+        lead_h = np.concatenate(lead)
+        values = np.concatenate(value)
+    else:
+        issue_t = np.array([], dtype="datetime64[s]")
+        lead_h = np.array([], dtype=np.int16)
+        values = np.array([], dtype=np.float32)
+    valid_t = issue_t + lead_h.astype(np.int64) * np.timedelta64(1, "h")
+    n = len(values)
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.DictionaryArray.from_arrays(
+                pa.array(np.zeros(n, dtype=np.int32)), pa.array([region])
+            ),
+            pa.array(issue_t.astype("datetime64[s]")),
+            pa.array(lead_h),
+            pa.array(valid_t.astype("datetime64[s]")),
+            pa.array(values),
+        ],
+        schema=FORECAST_SCHEMA,
+    )
+
+
+# ---- 워커 프로세스 쪽: 결과를 Arrow IPC 바이트로 넘김 (객체 pickle 없음) ----
+def _to_ipc(batch: pa.RecordBatch) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _from_ipc(buf: bytes) -> pa.RecordBatch:
+    reader = pa.ipc.open_stream(pa.py_buffer(buf))
+    batches = list(reader)
+    if not batches:
+        return pa.RecordBatch.from_pylist([], schema=reader.schema)
+    return batches[0]
+
+
+def _parse_forecast_file(path: str) -> bytes:
+    return _to_ipc(parse_forecast_csv(storage.read_bytes(path)))
+
+
+def _parse_forecast_member(member: Tuple[str, bytes]) -> bytes:
+    return _to_ipc(parse_forecast_csv(member[1]))
+
+
+class ParsePool:
+    """
+    KMA 파일 파싱을 프로세스 풀로 분산 (CPU 수만큼 동시에 파싱).
+    제출 창(window)을 워커 수의 2배로 제한해 입력 · 결과가 메모리에 쌓이지 않게 합니다.
+    서버 프로세스(스레드 사용 중)에서도 안전하도록 fork 대신 spawn 으로 워커를 띄웁니다.
+
+        with ParsePool() as pool:
+            for path, batch in pool.parse_forecast_files(paths):
+                ...
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, fn, inputs: Iterable,
+             key=lambda item: item) -> Iterator[Tuple[object, pa.RecordBatch]]:
+        """완료 순서대로 (key(입력), RecordBatch) 반환"""
+        pending = {}
+        inputs = iter(inputs)
+        window = self.workers * 2
+        while True:
+            while len(pending) < window:
+                try:
+                    item = next(inputs)
+                except StopIteration:
+                    break
+                pending[self._executor.submit(fn, item)] = key(item)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield pending.pop(fut), _from_ipc(fut.result())
+
+    def parse_forecast_files(self, paths: Iterable[str]):
+        """CSV 경로(.csv / .csv.zst) → (경로, RecordBatch)"""
+        return self._run(_parse_forecast_file, paths)
+
+    def parse_forecast_members(self, members: Iterable[Tuple[str, bytes]]):
+        """ZIP 에서 꺼낸 (파일명, 바이트) → (파일명, RecordBatch)"""
+        return self._run(_parse_forecast_member, members, key=lambda m: m[0])
+
+
+_shared_pool: Optional[ParsePool] = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> Optional[ParsePool]:
+    """프로세스 공용 ParsePool (처음 쓸 때 생성). PARSE_WORKERS=0 이면 None"""
+    global _shared_pool
+    if PARSE_WORKERS <= 0:
+        return None
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ParsePool(PARSE_WORKERS)
+        return _shared_pool
+
+
+def close_shared_pool():
+    global _shared_pool
+    with _shared_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.close()
+
+
+def collect_forecast_files(root: str) -> Iterator[str]:
+    """root 아래의 KMA CSV(.csv / .csv.zst) 경로"""
+    for r, _, fns in os.walk(root):
+        for fn in fns:
+            if fn.endswith(".csv") or fn.endswith(".csv.zst"):
+                yield os.path.join(r, fn)
+
+
+if __name__ == "__main__":
+    import argparse
+    import pyarrow.parquet as pq
+
+    parser = argparse.ArgumentParser(description="KMA CSV 병렬 파싱 → Parquet 병합")
+    parser.add_argument("root", help="CSV 가 있는 디렉터리 (예: downloads/<client_id>)")
+    parser.add_argument("output", help="출력 Parquet 경로")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    args = parser.parse_args()
+
+    writer = None
+    n_rows = 0
+    with ParsePool(args.workers) as pool:
+        for _, batch in pool.parse_forecast_files(collect_forecast_files(args.root)):
+            if writer is None:
+                writer = pq.ParquetWriter(args.output, batch.schema, compression="zstd")
+            writer.write_batch(batch)
+            n_rows += batch.num_rows
+    if writer is not None:
+        writer.close()
+    print(f"병합 완료: {n_rows}행 → {args.output}")
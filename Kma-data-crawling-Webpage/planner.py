@@ -0,0 +1,122 @@
+# planner.py
+
+import os
+from itertools import islice
+from typing import Dict, Iterator, List
+
+from scheduler import scheduler, INITIAL_ITEM_SECONDS
+from weather_downloader import (
+    DownloadConfig, FORECAST_CONFIGS, generate_intervals, interval_days
+)
+
+# 다운로드 작업을 실행하기 전에 항목 계획(지역 × 구간 × 변수)의
+# 요청 수 · 예상 크기 · 예상 시간을 계산합니다. 시간 · 크기는 지난 작업에서 기록한
+# (설정, 변수)별 이력(jobstore.item_stats)을 쓰고, 이력이 없으면 기본값을 씁니다.
+# 항목을 하나씩 펼치지 않고 구간 목록만 만들어 곱셈으로 계산하므로
+# 전국 × 여러 해 작업도 요청 처리 중에 바로 계획할 수 있습니다.
+
+# 이력이 없을 때 항목 크기 추정치 (ZIP 바이트 / 구간 일수)
+DEFAULT_BYTES_PER_DAY = float(os.getenv("PLAN_DEFAULT_BYTES_PER_DAY", "4096"))
+# 로그인 한 번 (get_cookie 의 대기 포함) / 항목마다 자리 안에서 쉬는 시간
+LOGIN_SECONDS = 3.0
+ITEM_PAUSE_SECONDS = 0.5
+# 준비 POST + downloadZip
+REQUESTS_PER_ITEM = 2
+
+# 크기 제한: 넘으면 PLAN_GUARD 에 따라 거부(reject) 또는 대기열(queue) — off 면 제한 없음
+PLAN_MAX_ITEMS = int(os.getenv("PLAN_MAX_ITEMS", "5000"))
+PLAN_MAX_BYTES = int(os.getenv("PLAN_MAX_BYTES", str(2 * 1024 ** 3)))
+PLAN_GUARD = os.getenv("PLAN_GUARD", "queue")
+# 제한을 넘는 작업은 워커마다 이 수만큼만 동시에 실행 (나머지는 queued 로 대기)
+PLAN_LARGE_JOB_SLOTS = int(os.getenv("PLAN_LARGE_JOB_SLOTS", "1"))
+# 응답에 싣는 항목 미리보기 수
+PLAN_PREVIEW_ITEMS = 20
+
+def _intervals(config: DownloadConfig) -> List[tuple]:
+    cfg = FORECAST_CONFIGS.get(config.config_name)
+    if cfg is None:
+        raise ValueError(f"알 수 없는 예보 유형: {config.config_name}")
+    if config.end_date < config.start_date:
+        raise ValueError("종료일이 시작일보다 빠릅니다.")
+    return generate_intervals(config.start_date, config.end_date, cfg["mode"])
+
+
+def expand(config: DownloadConfig) -> Iterator[tuple]:
+    """(region, start, end, variable) 항목 — WeatherDownloader.download 와 같은 순서 (지연 생성)"""
+    intervals = _intervals(config)
+    return (
+        (region, start, end, variable)
+        for region in config.regions
+        for start, end in intervals
+        for variable in config.variables
+    )
+
+
+def plan(config: DownloadConfig, item_stats: Dict[tuple, dict]) -> Dict:
+    """
+    항목 계획 요약.
+    - requests: KMA 요청 수 (로그인 + 항목마다 REQUESTS_PER_ITEM)
+    - expected_bytes: ZIP 크기 합 추정
+    - estimated_seconds: 다른 작업이 없을 때 / with_load: 지금 진행 중인 작업과 자리를 나눌 때
+    - guard: 크기 제한 초과 여부와 처리 방식 (reject | queue)
+    """
+    intervals = _intervals(config)
+    regions = len(config.regions)
+    # 변수 하나의 항목 수 = 지역 수 × 구간 수, 크기는 구간 일수 합에 비례
+    var_items = regions * len(intervals)
+    var_days = regions * sum(interval_days(start, end) for start, end in intervals)
+    fallback = scheduler.item_seconds if scheduler.item_seconds != INITIAL_ITEM_SECONDS else None
+    total_bytes = 0.0
+    total_seconds = 0.0
+    per_var: Dict[str, Dict] = {}
+    for variable in config.variables:
+        code = variable["code"]
+        stats = item_stats.get((config.config_name, code))
+        seconds = stats["seconds"] if stats else (fallback or INITIAL_ITEM_SECONDS)
+        nbytes = (stats["bytes_per_day"] if stats else DEFAULT_BYTES_PER_DAY) * var_days
+        total_bytes += nbytes
+        total_seconds += (seconds + ITEM_PAUSE_SECONDS) * var_items
+        v = per_var.setdefault(code, {
+            "code": code, "name": variable["name"], "items": 0, "expected_bytes": 0.0,
+            "history_samples": stats["samples"] if stats else 0,
+        })
+        v["items"] += var_items
+        v["expected_bytes"] += nbytes
+
+    n = var_items * len(config.variables)
+    # 한 작업은 항목을 하나씩 처리 — 진행 중인 사용자가 많으면 자리를 나눠 씀
+    clients = {j.client for j in scheduler.jobs.values()}
+    share = min(scheduler.slots / (len(clients) + 1), 1.0)
+    exceeded = [
+        reason for reason, over in (
+            (f"항목 수 {n:,} > {PLAN_MAX_ITEMS:,}", n > PLAN_MAX_ITEMS),
+            (f"예상 크기 {total_bytes / 1024 ** 2:,.0f}MB > {PLAN_MAX_BYTES / 1024 ** 2:,.0f}MB",
+             total_bytes > PLAN_MAX_BYTES),
+        ) if over
+    ]
+    return {
+        "items": n,
+        "regions": regions,
+        "intervals": len(intervals),
+        "requests": 1 + n * REQUESTS_PER_ITEM if n else 0,
+        "expected_bytes": int(total_bytes),
+        "estimated_seconds": round(LOGIN_SECONDS + total_seconds, 1) if n else 0.0,
+        "estimated_seconds_with_load": round(LOGIN_SECONDS + total_seconds / share, 1) if n else 0.0,
+        "item_seconds": round(total_seconds / n, 2) if n else None,
+        "active_jobs": len(scheduler.jobs),
+        "variables": [
+            {**v, "expected_bytes": int(v["expected_bytes"])} for v in per_var.values()
+        ],
+        "preview": [
+            {"region": r.get("code"), "level3": r.get("level3"), "from": s, "to": e,
+             "variable": v["code"]}
+            for r, s, e, v in islice(expand(config), PLAN_PREVIEW_ITEMS)
+        ],
+        "guard": {
+            "mode": PLAN_GUARD,
+            "max_items": PLAN_MAX_ITEMS,
+            "max_bytes": PLAN_MAX_BYTES,
+            "exceeded": bool(exceeded) and PLAN_GUARD != "off",
+            "reasons": exceeded,
+        },
+    }
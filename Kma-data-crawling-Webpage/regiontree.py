@@ -0,0 +1,124 @@
+# regiontree.py
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+# 지역(동네예보 격자) 목록은 배포 사이에 바뀌지 않으므로 한 번 만들어 둔 응답 바이트를
+# 그대로 돌려주고, 강한 ETag 로 재검증합니다. ?v=<버전> 이 붙은 요청은 내용이 고정이므로
+# 1년 immutable 로 캐시합니다.
+REGION_CACHE_MAX_AGE = int(os.getenv("REGION_CACHE_MAX_AGE", "86400"))
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class RegionTree:
+    """
+    Level1 → Level2 → Level3(code) 계층.
+    - compact: {"version", "level1": [...], "level2": [...], "rows": [[i1, i2, level3, code], ...]}
+      (level1/level2 이름은 한 번만 싣고 행은 인덱스로 참조)
+    - children(path): 한 단계씩 펼치기 — [[이름, 자식 수], ...] / 마지막 단계는 [[level3, code], ...]
+    """
+
+    def __init__(self, regions: List[Dict]):
+        self.regions = regions
+        self._lock = threading.Lock()
+        level1: List[str] = []
+        level2: List[str] = []
+        pos1: Dict[str, int] = {}
+        pos2: Dict[str, int] = {}
+        rows = []
+        self.tree: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        for r in regions:
+            l1, l2 = r["level1"], r["level2"]
+            if l1 not in pos1:
+                pos1[l1] = len(level1)
+                level1.append(l1)
+            if l2 not in pos2:
+                pos2[l2] = len(level2)
+                level2.append(l2)
+            rows.append([pos1[l1], pos2[l2], r["level3"], r["code"]])
+            self.tree.setdefault(l1, {}).setdefault(l2, []).append((r["level3"], r["code"]))
+
+        body = _dumps({"level1": level1, "level2": level2, "rows": rows})
+        self.version = hashlib.sha256(body).hexdigest()[:12]
+        self._cache: Dict[str, Tuple[bytes, str]] = {}
+        self._store("compact", _dumps(
+            {"version": self.version, "level1": level1, "level2": level2, "rows": rows}
+        ))
+        self._store("regions", _dumps({"regions": regions}))
+
+    def _store(self, key: str, body: bytes) -> Tuple[bytes, str]:
+        entry = (body, _etag(body))
+        self._cache[key] = entry
+        return entry
+
+    def encoded(self, key: str) -> Tuple[bytes, str]:
+        return self._cache[key]
+
+    def children(self, level1: Optional[str] = None, level2: Optional[str] = None) -> Tuple[bytes, str]:
+        key = f"children/{level1 or ''}/{level2 or ''}"
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                return hit
+            if level1 is None:
+                items = [[name, len(sub)] for name, sub in self.tree.items()]
+            elif level1 not in self.tree:
+                raise HTTPException(status_code=404, detail=f"알 수 없는 지역: {level1}")
+            elif level2 is None:
+                items = [[name, len(sub)] for name, sub in self.tree[level1].items()]
+            elif level2 not in self.tree[level1]:
+                raise HTTPException(status_code=404, detail=f"알 수 없는 지역: {level1} / {level2}")
+            else:
+                items = [list(leaf) for leaf in self.tree[level1][level2]]
+            path = [p for p in (level1, level2) if p is not None]
+            return self._store(key, _dumps({"version": self.version, "path": path, "items": items}))
+
+
+def cached_json(request: Request, entry: Tuple[bytes, str], version: str) -> Response:
+    """미리 만든 JSON 바이트 응답 (If-None-Match → 304)"""
+    body, etag = entry
+    if request.query_params.get("v") == version:
+        cache = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache = f"public, max-age={REGION_CACHE_MAX_AGE}, stale-while-revalidate={REGION_CACHE_MAX_AGE}"
+    headers = {"ETag": etag, "Cache-Control": cache}
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        # 약한 비교 (압축 미들웨어가 W/ 를 붙여 보냄)
+        tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+        if "*" in tags or etag in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+_tree: Optional[RegionTree] = None
+_tree_mtime: Optional[int] = None
+_tree_lock = threading.Lock()
+
+
+def get_tree(region_db) -> RegionTree:
+    """DB 파일이 바뀌었을 때만 다시 만듦 (평소에는 stat 한 번)"""
+    global _tree, _tree_mtime
+    try:
+        mtime = os.stat(region_db.db_path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    with _tree_lock:
+        if _tree is None or mtime != _tree_mtime:
+            _tree = RegionTree(region_db.get_available_regions())
+            _tree_mtime = mtime
+        return _tree
@@ -0,0 +1,109 @@
+# resilience.py
+
+import asyncio
+import os
+import random
+import time
+from typing import Iterator
+
+from metrics import CIRCUIT_STATE
+
+# 항목당 최대 시도 횟수와 지수 백오프 (full jitter)
+ITEM_MAX_ATTEMPTS = int(os.getenv("KMA_ITEM_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE = float(os.getenv("KMA_BACKOFF_BASE", "2"))
+BACKOFF_CAP = float(os.getenv("KMA_BACKOFF_CAP", "60"))
+
+# 회로 차단기: 연속 실패 N 번이면 모든 작업을 cooldown 동안 멈춤 (연속 open 시 2배, 최대 max)
+BREAKER_THRESHOLD = int(os.getenv("KMA_BREAKER_THRESHOLD", "8"))
+BREAKER_COOLDOWN = float(os.getenv("KMA_BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("KMA_BREAKER_MAX_COOLDOWN", "600"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def backoff_delays(attempts: int = ITEM_MAX_ATTEMPTS, base: float = BACKOFF_BASE,
+                   cap: float = BACKOFF_CAP) -> Iterator[float]:
+    """재시도 사이 대기 시간: uniform(0, min(cap, base * 2^n))"""
+    for n in range(attempts - 1):
+        yield random.uniform(0, min(cap, base * (2 ** n)))
+
+
+class CircuitBreaker:
+    """
+    업스트림 전체 장애 시 모든 작업을 함께 멈추는 차단기 (이벤트 루프 단위).
+    closed → (연속 실패 threshold) → open → (cooldown) → half_open: 시험 요청 1건
+    → 성공이면 closed, 실패면 cooldown 을 늘려 다시 open.
+    """
+
+    def __init__(self, source: str, threshold: int = BREAKER_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN, max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.source = source
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_busy = False
+        self._set(CLOSED)
+
+    def _set(self, state: str):
+        self.state = state
+        CIRCUIT_STATE.labels(source=self.source).set(_STATE_VALUE[state])
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    async def acquire(self) -> bool:
+        """요청 전에 호출 — 차단 중이면 풀릴 때까지 대기. 시험 요청이면 True"""
+        while True:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN:
+                wait = self.retry_after()
+                if wait > 0:
+                    await asyncio.sleep(min(wait, 1.0))
+                    continue
+                self._set(HALF_OPEN)
+            # half_open: 한 건만 시험 요청
+            if not self._probe_busy:
+                self._probe_busy = True
+                return True
+            await asyncio.sleep(0.5)
+
+    def abandon(self):
+        """시험 요청이 결과 없이 끝남 (작업 취소 등) → 다른 요청이 시험하도록"""
+        self._probe_busy = False
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_busy = False
+        if self.state != CLOSED:
+            self.cooldown = self.base_cooldown
+            self._set(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self._probe_busy = False
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.threshold:
+            self._open()
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self._set(OPEN)
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after": round(self.retry_after(), 1) if self.state == OPEN else 0,
+        }
+
+
+# KMA(data.kma.go.kr) 전체가 공유
+kma_breaker = CircuitBreaker("kma")
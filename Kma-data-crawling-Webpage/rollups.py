@@ -0,0 +1,267 @@
+# rollups.py
+
+import glob
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import store
+
+# 저장소(store.py) 원자료로부터 만든 일/월 집계 (관측소·격자별)
+#   daily  : (source, key, col, day)   → min, max, sum, count
+#   monthly: (source, key, col, month) → 일 집계에서 SQL 로 재집계
+# sum/count 를 함께 두므로 평균과 임의 기간(7D, W, QS …) 재집계가 정확합니다.
+ROLLUP_DB = os.path.join(store.STORE_DIR, "rollups.db")
+
+# 예보 중 실측에 해당하는 초단기실황만 격자별 집계 대상
+NOWCAST_CONFIG = "초단기실황"
+STATS = ("min", "max", "mean", "sum", "count")
+
+_refresh_lock = threading.Lock()
+
+
+def _conn() -> sqlite3.Connection:
+    os.makedirs(store.STORE_DIR, exist_ok=True)
+    conn = sqlite3.connect(ROLLUP_DB, timeout=30)
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS daily (
+        source TEXT NOT NULL, key TEXT NOT NULL, col TEXT NOT NULL, day TEXT NOT NULL,
+        min REAL, max REAL, sum REAL, count INTEGER NOT NULL,
+        PRIMARY KEY (source, key, col, day)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS monthly (
+        source TEXT NOT NULL, key TEXT NOT NULL, col TEXT NOT NULL, month TEXT NOT NULL,
+        min REAL, max REAL, sum REAL, count INTEGER NOT NULL,
+        PRIMARY KEY (source, key, col, month)
+    ) WITHOUT ROWID;
+    -- 원자료 파티션 파일별로 마지막 집계 시점의 mtime (워터마크)
+    CREATE TABLE IF NOT EXISTS watermark (
+        path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def _partition_files(source: str, key: str) -> List[str]:
+    if source == "forecast":
+        pattern = os.path.join(
+            store.STORE_DIR, "forecast", f"config={NOWCAST_CONFIG}", "variable=*",
+            f"region={key}", "month=*", "data.parquet",
+        )
+    else:
+        pattern = os.path.join(store.STORE_DIR, source, f"stn={key}", "month=*", "data.parquet")
+    return sorted(glob.glob(pattern))
+
+
+def _wide_frame(source: str, path: str) -> pd.DataFrame:
+    """파티션 파일 → (time 인덱스, 숫자 컬럼들) 형태"""
+    df = pq.read_table(path).to_pandas()
+    if source == "forecast":
+        variable = path.split("variable=", 1)[1].split(os.sep, 1)[0]
+        return pd.DataFrame({variable: df["value"].to_numpy()}, index=df["valid_time"])
+    df = df.set_index("time")
+    cols = [
+        c for c in df.columns
+        if pd.api.types.is_numeric_dtype(df[c]) and not c.endswith(("Qcflg", "_hmi", "_cnt"))
+    ]
+    return df[cols]
+
+
+def _daily(wide: pd.DataFrame) -> pd.DataFrame:
+    """시간별 wide 프레임 → 일 집계 long 프레임 (col, day, min, max, sum, count)"""
+    day = wide.index.floor("D").strftime("%Y%m%d")
+    long = wide.groupby(day).agg(["min", "max", "sum", "count"]).stack(level=0)
+    long.index.names = ["day", "col"]
+    long = long.reset_index()
+    long = long[long["count"] > 0]
+    return long[["col", "day", "min", "max", "sum", "count"]]
+
+
+def refresh(source: str, key: str) -> int:
+    """
+    (source, key) 의 원자료 파티션 중 워터마크 이후 바뀐 것만 다시 집계.
+    바뀐 파티션(월) 수를 반환합니다.
+    """
+    files = _partition_files(source, key)
+    if not files:
+        return 0
+    with _refresh_lock:
+        conn = _conn()
+        try:
+            marks = dict(conn.execute(
+                f"SELECT path, mtime_ns FROM watermark WHERE path IN ({','.join('?' * len(files))})",
+                files,
+            ).fetchall())
+            n = 0
+            for path in files:
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                if marks.get(path) == mtime:
+                    continue
+                month = path.split("month=", 1)[1].split(os.sep, 1)[0]
+                daily = _daily(_wide_frame(source, path))
+                cols = sorted(set(daily["col"]))
+                with conn:
+                    if cols:
+                        marks_q = ",".join("?" * len(cols))
+                        conn.execute(
+                            f"DELETE FROM daily WHERE source = ? AND key = ? AND col IN ({marks_q})"
+                            " AND day LIKE ?",
+                            [source, key, *cols, f"{month}%"],
+                        )
+                        conn.executemany(
+                            "INSERT INTO daily VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            [
+                                (source, key, c, d, _num(mn), _num(mx), _num(s), int(cnt))
+                                for c, d, mn, mx, s, cnt in daily.itertuples(index=False)
+                            ],
+                        )
+                        conn.execute(
+                            f"DELETE FROM monthly WHERE source = ? AND key = ? AND col IN ({marks_q})"
+                            " AND month = ?",
+                            [source, key, *cols, month],
+                        )
+                        conn.execute(
+                            f"""INSERT INTO monthly
+                            SELECT source, key, col, substr(day, 1, 6),
+                                   MIN(min), MAX(max), SUM(sum), SUM(count)
+                            FROM daily
+                            WHERE source = ? AND key = ? AND col IN ({marks_q}) AND day LIKE ?
+                            GROUP BY source, key, col, substr(day, 1, 6)""",
+                            [source, key, *cols, f"{month}%"],
+                        )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO watermark VALUES (?, ?)", (path, mtime)
+                    )
+                n += 1
+            return n
+        finally:
+            conn.close()
+
+
+def _num(v) -> Optional[float]:
+    return None if v is None or np.isnan(v) else float(v)
+
+
+def _select(table: str, unit: str, source: str, keys: List[str],
+            columns: Optional[List[str]], start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    sql = [f"SELECT key, col, {unit} AS period, min, max, sum, count FROM {table} WHERE source = ?"]
+    params: list = [source]
+    sql.append(f"AND key IN ({','.join('?' * len(keys))})")
+    params += keys
+    if columns:
+        sql.append(f"AND col IN ({','.join('?' * len(columns))})")
+        params += columns
+    if start:
+        sql.append(f"AND {unit} >= ?")
+        params.append(start[: 8 if unit == "day" else 6])
+    if end:
+        sql.append(f"AND {unit} <= ?")
+        params.append(end[: 8 if unit == "day" else 6])
+    conn = _conn()
+    try:
+        return pd.read_sql_query(" ".join(sql) + f" ORDER BY key, col, {unit}", conn, params=params)
+    finally:
+        conn.close()
+
+
+def _finish(df: pd.DataFrame, stats: Iterable[str]) -> pd.DataFrame:
+    df["mean"] = df["sum"] / df["count"].where(df["count"] > 0)
+    return df[["key", "col", "period", *stats]]
+
+
+def _resample_daily(df: pd.DataFrame, offset) -> pd.DataFrame:
+    """일 집계 → 임의 기간(하루 이상) 재집계"""
+    df = df.assign(period=pd.to_datetime(df["period"], format="%Y%m%d"))
+    out = (
+        df.set_index("period")
+        .groupby(["key", "col"])
+        .resample(offset)
+        .agg({"min": "min", "max": "max", "sum": "sum", "count": "sum"})
+        .reset_index()
+    )
+    out = out[out["count"] > 0]
+    out["period"] = out["period"].dt.strftime("%Y%m%d")
+    return out
+
+
+def _resample_raw(source: str, keys: List[str], columns: Optional[List[str]],
+                  start: Optional[str], end: Optional[str], offset) -> pd.DataFrame:
+    """하루 미만 기간(예: 3h)은 원자료에서 바로 집계"""
+    t0 = datetime.strptime(start[:8], "%Y%m%d") if start else None
+    t1 = datetime.strptime(end[:8], "%Y%m%d") + timedelta(days=1) if end else None
+    frames = []
+    for key in keys:
+        for path in _partition_files(source, key):
+            wide = _wide_frame(source, path)
+            if t0 is not None:
+                wide = wide[wide.index >= t0]
+            if t1 is not None:
+                wide = wide[wide.index < t1]
+            if columns:
+                wide = wide[[c for c in wide.columns if c in columns]]
+            if wide.empty or wide.columns.empty:
+                continue
+            agg = wide.resample(offset).agg(["min", "max", "sum", "count"]).stack(level=0)
+            agg.index.names = ["period", "col"]
+            agg = agg.reset_index()
+            agg["key"] = key
+            frames.append(agg[agg["count"] > 0])
+    if not frames:
+        return pd.DataFrame(columns=["key", "col", "period", "min", "max", "sum", "count"])
+    out = pd.concat(frames, ignore_index=True)
+    out["period"] = out["period"].dt.strftime("%Y%m%d%H%M")
+    return out.sort_values(["key", "col", "period"])
+
+
+def query(source: str, keys: List[str], freq: str = "day",
+          columns: Optional[List[str]] = None, start: Optional[str] = None,
+          end: Optional[str] = None, stats: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    집계 조회. freq: "day" | "month" | pandas offset ("7D", "W", "QS", "3h" …).
+    start/end 는 YYYYMMDD (end 포함). 조회 전에 바뀐 파티션만 증분 집계합니다.
+    """
+    stats = list(stats or ("min", "max", "mean", "sum"))
+    for key in keys:
+        refresh(source, key)
+
+    if freq == "month":
+        return _finish(_select("monthly", "month", source, keys, columns, start, end), stats)
+    daily = _select("daily", "day", source, keys, columns, start, end)
+    if freq == "day":
+        return _finish(daily, stats)
+
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Tick) and offset.nanos < pd.Timedelta(days=1).value:
+        return _finish(_resample_raw(source, keys, columns, start, end, offset), stats)
+    if isinstance(offset, pd.offsets.Tick) and offset.nanos % pd.Timedelta(days=1).value:
+        raise ValueError("하루 이상 기간은 일 단위의 배수여야 합니다.")
+    return _finish(_resample_daily(daily, offset), stats)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="저장소 원자료 → 일/월 집계 갱신")
+    parser.add_argument("source", choices=["asos", "aws", "forecast"])
+    parser.add_argument("keys", nargs="*", help="관측소 코드 / 격자 (생략 시 전체)")
+    args = parser.parse_args()
+
+    keys = args.keys
+    if not keys:
+        field = "region" if args.source == "forecast" else "stn"
+        keys = sorted({
+            p.split(f"{field}=", 1)[1].split(os.sep, 1)[0]
+            for p in glob.glob(os.path.join(store.STORE_DIR, args.source, "**", "data.parquet"),
+                               recursive=True)
+        })
+    for k in keys:
+        print(f"{k}: {refresh(args.source, k)}개 파티션 갱신")
@@ -0,0 +1,257 @@
+# scheduler.py
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Set
+
+# KMA 에 동시에 보낼 항목(준비 POST + ZIP) 수 — 모든 작업이 나눠 씀
+SCHED_SLOTS = int(os.getenv("SCHED_SLOTS", "2"))
+# 항목 수가 이 이하인 작업은 대화형(interactive) — 대량(bulk) 작업보다 먼저 배정
+SMALL_JOB_ITEMS = int(os.getenv("SCHED_SMALL_JOB_ITEMS", "50"))
+# 대화형 작업이 계속 있어도 bulk 가 굶지 않도록 N 번에 한 번은 bulk 에 배정
+BULK_EVERY = int(os.getenv("SCHED_BULK_EVERY", "5"))
+# 클라이언트(사용자)별 가중치 "alice:2,bob:0.5" — 없으면 1
+CLIENT_WEIGHTS = {
+    k.strip(): float(v)
+    for k, _, v in (p.partition(":") for p in os.getenv("SCHED_CLIENT_WEIGHTS", "").split(","))
+    if k.strip() and v
+}
+# 항목 처리 시간 초기 추정치(초) — 이후 EWMA 로 갱신
+INITIAL_ITEM_SECONDS = 5.0
+# 이만큼 항목을 처리한 작업은 추정치 대신 실제 처리 속도로 남은 시간 계산
+LIVE_ETA_MIN_ITEMS = int(os.getenv("SCHED_LIVE_ETA_MIN_ITEMS", "3"))
+
+INTERACTIVE, BULK = "interactive", "bulk"
+
+
+class Job:
+    """스케줄러에 등록된 작업 하나 (WeatherDownloader 가 항목마다 slot() 을 잡음)"""
+
+    def __init__(self, scheduler: "FairScheduler", job_id: str, client: str, weight: float):
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.client = client
+        self.weight = weight
+        self.total = 0
+        self.done = 0
+        self.klass = INTERACTIVE
+        self.seq = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # 항목당 예상 시간(초, planner 이력) / 첫 항목 배정 시각
+        self.item_estimate: Optional[float] = None
+        self.started: Optional[float] = None
+
+    def set_total(self, total: int):
+        self.total = total
+        self.klass = INTERACTIVE if total <= SMALL_JOB_ITEMS else BULK
+
+    @asynccontextmanager
+    async def slot(self):
+        """항목 하나를 처리할 권한 — 공정 순서대로 배정될 때까지 대기"""
+        await self.scheduler._acquire(self)
+        started = time.monotonic()
+        if self.started is None:
+            self.started = started
+        try:
+            yield
+        finally:
+            self.done += 1
+            self.scheduler._release(time.monotonic() - started)
+
+
+class FairScheduler:
+    """
+    항목 단위 가중 공정 큐잉.
+    - 클래스: interactive 가 bulk 보다 우선 (BULK_EVERY 로 기아 방지)
+    - 같은 클래스 안에서는 클라이언트별 가상 시간(받은 항목 수 / 가중치)이 가장 작은 쪽
+    - 같은 클라이언트 안에서는 먼저 등록된 작업부터
+    모든 메서드는 이벤트 루프 스레드에서만 호출됩니다.
+    """
+
+    def __init__(self, slots: int = SCHED_SLOTS):
+        self.slots = slots
+        self.busy = 0
+        self.jobs: Dict[str, Job] = {}
+        self.vtime: Dict[str, float] = {}
+        self.vclock = 0.0
+        self.item_seconds = INITIAL_ITEM_SECONDS
+        self._seq = 0
+        self._since_bulk = 0
+
+    # ---- 등록 ----
+    def register(self, job_id: str, client: str, weight: Optional[float] = None) -> Job:
+        w = weight if weight is not None else CLIENT_WEIGHTS.get(client, 1.0)
+        job = Job(self, job_id, client, max(w, 0.01))
+        self._seq += 1
+        job.seq = self._seq
+        self.jobs[job_id] = job
+        # 새로 들어온 클라이언트는 현재 가상 시각부터 시작 (쉬던 동안의 몫을 쌓아두지 않음)
+        self.vtime[client] = max(self.vtime.get(client, 0.0), self.vclock)
+        return job
+
+    def unregister(self, job_id: str):
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return
+        for fut in job.waiters:
+            if not fut.done():
+                fut.cancel()
+        if not any(j.client == job.client for j in self.jobs.values()):
+            self.vtime.pop(job.client, None)
+        self._dispatch()
+
+    # ---- 배정 ----
+    async def _acquire(self, job: Job):
+        fut = asyncio.get_running_loop().create_future()
+        job.waiters.append(fut)
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 배정 직후 취소됨 → 자리 반납
+                self._release(None)
+            else:
+                try:
+                    job.waiters.remove(fut)
+                except ValueError:
+                    pass
+            raise
+
+    def _release(self, elapsed: Optional[float]):
+        self.busy -= 1
+        if elapsed is not None:
+            self.item_seconds = 0.8 * self.item_seconds + 0.2 * elapsed
+        # 반납한 작업이 다음 항목을 바로 요청할 수 있도록 한 박자 늦게 배정
+        # (그렇지 않으면 순차 작업은 반납 시점에 항상 대기열에 없어 순서가 무시됨)
+        asyncio.get_running_loop().call_soon(self._dispatch)
+
+    def _order_key(self, job: Job):
+        return (self.vtime.get(job.client, 0.0), job.seq)
+
+    def _pick(self) -> Optional[Job]:
+        waiting = [j for j in self.jobs.values() if j.waiters]
+        if not waiting:
+            return None
+        inter = [j for j in waiting if j.klass == INTERACTIVE]
+        bulk = [j for j in waiting if j.klass == BULK]
+        if inter and not (bulk and self._since_bulk >= BULK_EVERY - 1):
+            self._since_bulk += 1
+            return min(inter, key=self._order_key)
+        self._since_bulk = 0
+        return min(bulk or inter, key=self._order_key)
+
+    def _dispatch(self):
+        while self.busy < self.slots:
+            job = self._pick()
+            if job is None:
+                return
+            fut = job.waiters.popleft()
+            if fut.done():
+                continue
+            self.busy += 1
+            self.vclock = self.vtime.get(job.client, 0.0)
+            self.vtime[job.client] = self.vclock + 1.0 / job.weight
+            fut.set_result(None)
+
+    # ---- 상태 ----
+    def _ordered(self):
+        """현재 배정 순서 추정 (클래스 → 가상 시간 → 등록 순)"""
+        return sorted(
+            self.jobs.values(),
+            key=lambda j: (j.klass != INTERACTIVE, *self._order_key(j)),
+        )
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """
+        대기 순번과 남은 시간 추정치 (초).
+        항목을 LIVE_ETA_MIN_ITEMS 개 이상 처리했으면 이 작업의 실제 속도(대기 · 재시도 포함),
+        아니면 항목당 예상 시간(planner 이력, 없으면 EWMA)과 배정 몫으로 계산
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        ordered = self._ordered()
+        position = ordered.index(job)
+        # 같은 클래스에서 받는 몫 = 내 가중치 / 활성 클라이언트 가중치 합
+        peers: Dict[str, float] = {}
+        for j in self.jobs.values():
+            if j.klass == job.klass:
+                peers[j.client] = max(peers.get(j.client, 0.0), j.weight)
+        share = job.weight / sum(peers.values())
+        if job.klass == BULK and any(j.klass == INTERACTIVE for j in self.jobs.values()):
+            share /= BULK_EVERY
+        # 같은 클라이언트의 먼저 온 작업이 끝나야 내 차례
+        ahead = sum(
+            max(j.total - j.done, 0) for j in self.jobs.values()
+            if j.client == job.client and j.seq < job.seq
+        )
+        remaining = max(job.total - job.done, 0) + ahead
+        if job.started is not None and job.done >= LIVE_ETA_MIN_ITEMS:
+            per_item = (time.monotonic() - job.started) / job.done
+            source = "observed"
+        else:
+            # 한 작업은 항목을 하나씩 처리하므로 몫이 자리 하나를 넘지 않음
+            per_item = (job.item_estimate or self.item_seconds) / min(self.slots * share, 1.0)
+            source = "estimate"
+        return {
+            "class": job.klass,
+            "queue_position": position,
+            "active_jobs": len(self.jobs),
+            "eta_seconds": round(remaining * per_item, 1),
+            "eta_source": source,
+        }
+
+
+class JobControl:
+    """
+    작업 취소 / 일시정지 / 재개 상태.
+    - checkpoint(): 항목 시작 전에 호출 — 일시정지 중이면 자리를 잡지 않은 채 대기
+    - abort: 스레드에서 받는 중인 ZIP 전송을 끊기 위한 플래그
+    - completed: 끝난 항목 키 — 취소 후 재개 시 건너뜀
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self.abort = threading.Event()
+        self.completed: Set[tuple] = set()
+        self.task: Optional[asyncio.Task] = None
+        self._running = asyncio.Event()
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        """새 항목 배정 중단 + 진행 중 전송 중단"""
+        self.cancelled = True
+        self.abort.set()
+        self._running.set()
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    def reset(self):
+        """취소된 작업을 남은 항목부터 다시 실행하기 전 초기화"""
+        self.cancelled = False
+        self.abort.clear()
+        self._running.set()
+        self.task = None
+
+    async def checkpoint(self):
+        await self._running.wait()
+        if self.cancelled:
+            raise asyncio.CancelledError()
+
+
+scheduler = FairScheduler()
@@ -0,0 +1,230 @@
+# spatial.py
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+import transport
+
+# 기상청 동네예보 격자 (Lambert Conformal Conic) 상수
+RE = 6371.00877   # 지구 반경 (km)
+GRID = 5.0        # 격자 간격 (km)
+SLAT1 = 30.0      # 표준 위도 1
+SLAT2 = 60.0      # 표준 위도 2
+OLON = 126.0      # 기준점 경도
+OLAT = 38.0       # 기준점 위도
+XO = 43           # 기준점 X 격자
+YO = 136          # 기준점 Y 격자
+
+EARTH_RADIUS_KM = 6371.0
+
+# 관측소 좌표 (code, source, lat, lon) — 없으면 apihub stn_inf.php 로 받아 저장
+STATION_COORDS_PATH = os.getenv("STATION_COORDS_PATH", "data/station_coords.csv")
+STN_INF_URL = "https://apihub.kma.go.kr/api/typ01/url/stn_inf.php"
+# stn_inf.php 의 inf 값 → 저장소 source 이름
+STATION_SOURCES = {"SFC": "asos", "AWS": "aws"}
+
+# STN_ID LON LAT ... (고정폭, 앞 세 열만 사용)
+_STN_LINE_RE = re.compile(r"(?m)^\s*(\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)")
+
+
+def _lcc_params():
+    degrad = np.pi / 180.0
+    re_ = RE / GRID
+    slat1, slat2 = SLAT1 * degrad, SLAT2 * degrad
+    olon, olat = OLON * degrad, OLAT * degrad
+    sn = np.log(np.cos(slat1) / np.cos(slat2)) / np.log(
+        np.tan(np.pi * 0.25 + slat2 * 0.5) / np.tan(np.pi * 0.25 + slat1 * 0.5)
+    )
+    sf = np.tan(np.pi * 0.25 + slat1 * 0.5) ** sn * np.cos(slat1) / sn
+    ro = re_ * sf / np.tan(np.pi * 0.25 + olat * 0.5) ** sn
+    return degrad, re_, olon, sn, sf, ro
+
+
+def latlon_to_grid(lat, lon):
+    """위경도 → 격자 (nx, ny). 배열 입력 가능"""
+    degrad, re_, olon, sn, sf, ro = _lcc_params()
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ra = re_ * sf / np.tan(np.pi * 0.25 + lat * degrad * 0.5) ** sn
+    theta = lon * degrad - olon
+    theta = np.where(theta > np.pi, theta - 2 * np.pi, theta)
+    theta = np.where(theta < -np.pi, theta + 2 * np.pi, theta)
+    theta *= sn
+    nx = np.floor(ra * np.sin(theta) + XO + 0.5).astype(np.int64)
+    ny = np.floor(ro - ra * np.cos(theta) + YO + 0.5).astype(np.int64)
+    return nx, ny
+
+
+def grid_to_latlon(nx, ny):
+    """격자 (nx, ny) → 격자 중심 위경도. 배열 입력 가능"""
+    degrad, re_, olon, sn, sf, ro = _lcc_params()
+    xn = np.asarray(nx, dtype=np.float64) - XO
+    yn = ro - (np.asarray(ny, dtype=np.float64) - YO)
+    ra = np.sign(sn) * np.sqrt(xn * xn + yn * yn)
+    alat = 2.0 * np.arctan((re_ * sf / ra) ** (1.0 / sn)) - np.pi * 0.5
+    theta = np.arctan2(xn, yn)
+    alon = theta / sn + olon
+    return alat / degrad, alon / degrad
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    """위경도 → 단위 구 위의 3차원 좌표 (유클리드 현 거리 = 대원 거리의 단조함수)"""
+    la, lo = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)])
+
+
+def _chord(radius_km: float) -> float:
+    return 2.0 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+def _km(chord) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+# 1) 관측소 좌표
+def fetch_station_coords(auth_key: str) -> pd.DataFrame:
+    """apihub stn_inf.php (SFC/AWS) → code, source, lat, lon"""
+    frames = []
+    for inf, source in STATION_SOURCES.items():
+        resp = transport.session().get(
+            STN_INF_URL, params={"inf": inf, "help": 0, "authKey": auth_key}
+        )
+        resp.raise_for_status()
+        rows = _STN_LINE_RE.findall(resp.content.decode("euc-kr", errors="replace"))
+        df = pd.DataFrame(rows, columns=["code", "lon", "lat"])
+        df["source"] = source
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True).drop_duplicates(["source", "code"])
+    df[["lat", "lon"]] = df[["lat", "lon"]].astype(np.float64)
+    return df[["code", "source", "lat", "lon"]]
+
+
+def load_station_coords(path: str = STATION_COORDS_PATH) -> pd.DataFrame:
+    if os.path.exists(path):
+        return pd.read_csv(path, dtype={"code": str, "source": str})
+    auth_key = os.getenv("AWS_AUTH_KEY", "")
+    if not auth_key:
+        return pd.DataFrame(columns=["code", "source", "lat", "lon"])
+    df = fetch_station_coords(auth_key)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df.to_csv(path, index=False)
+    return df
+
+
+# 2) 공간 인덱스
+class SpatialIndex:
+    """
+    지역(동네예보 격자) · 관측소 좌표와 KD-tree.
+    모든 질의는 단위 구 좌표 위에서 수행되므로 거리는 대원 거리(km)입니다.
+    """
+
+    def __init__(self, regions: List[Dict], stations: pd.DataFrame):
+        self.regions = regions
+        nx = np.array([int(r["code"].split("_")[0]) for r in regions], dtype=np.int64)
+        ny = np.array([int(r["code"].split("_")[1]) for r in regions], dtype=np.int64)
+        self.region_lat, self.region_lon = grid_to_latlon(nx, ny)
+        self.region_pos = {r["code"]: i for i, r in enumerate(regions)}
+        self.region_tree = cKDTree(_unit_vectors(self.region_lat, self.region_lon))
+        # bbox 질의용: 위도 정렬 순서
+        self._lat_order = np.argsort(self.region_lat)
+        self._lat_sorted = self.region_lat[self._lat_order]
+
+        self.stations = stations.reset_index(drop=True)
+        self._station_records = [
+            {"code": str(r["code"]), "source": r["source"],
+             "lat": float(r["lat"]), "lon": float(r["lon"])}
+            for r in self.stations.to_dict("records")
+        ]
+        self.station_trees: Dict[Optional[str], cKDTree] = {}
+        self._station_rows: Dict[Optional[str], np.ndarray] = {}
+        if len(self.stations):
+            groups = {None: np.arange(len(self.stations))}
+            for source, idx in self.stations.groupby("source").indices.items():
+                groups[source] = idx
+            for source, idx in groups.items():
+                sub = self.stations.iloc[idx]
+                self.station_trees[source] = cKDTree(
+                    _unit_vectors(sub["lat"].to_numpy(), sub["lon"].to_numpy())
+                )
+                self._station_rows[source] = idx
+
+    def region_latlon(self, code: str):
+        i = self.region_pos.get(code)
+        if i is None:
+            raise KeyError(code)
+        return float(self.region_lat[i]), float(self.region_lon[i])
+
+    def _region(self, i: int, dist_km: Optional[float] = None) -> Dict:
+        r = dict(self.regions[i])
+        r["lat"] = round(float(self.region_lat[i]), 6)
+        r["lon"] = round(float(self.region_lon[i]), 6)
+        if dist_km is not None:
+            r["distance_km"] = round(float(dist_km), 3)
+        return r
+
+    def nearest_stations(self, lat: float, lon: float, n: int = 5,
+                         source: Optional[str] = None) -> List[Dict]:
+        tree = self.station_trees.get(source)
+        if tree is None or n <= 0:
+            return []
+        k = min(n, tree.n)
+        chord, idx = tree.query(_unit_vectors([lat], [lon])[0], k=k)
+        chord, idx = np.atleast_1d(chord), np.atleast_1d(idx)
+        rows = self._station_rows[source][idx]
+        return [
+            {**self._station_records[row], "distance_km": round(float(d), 3)}
+            for row, d in zip(rows, _km(chord))
+        ]
+
+    def regions_within(self, lat: float, lon: float, radius_km: float) -> List[Dict]:
+        center = _unit_vectors([lat], [lon])[0]
+        idx = np.asarray(self.region_tree.query_ball_point(center, _chord(radius_km)), dtype=np.int64)
+        if not len(idx):
+            return []
+        dist = _km(np.linalg.norm(self.region_tree.data[idx] - center, axis=1))
+        order = np.argsort(dist)
+        return [self._region(int(i), d) for i, d in zip(idx[order], dist[order])]
+
+    def regions_in_bbox(self, min_lat: float, min_lon: float,
+                        max_lat: float, max_lon: float) -> List[Dict]:
+        lo = np.searchsorted(self._lat_sorted, min_lat, side="left")
+        hi = np.searchsorted(self._lat_sorted, max_lat, side="right")
+        cand = self._lat_order[lo:hi]
+        lon = self.region_lon[cand]
+        cand = cand[(lon >= min_lon) & (lon <= max_lon)]
+        return [self._region(int(i)) for i in np.sort(cand)]
+
+
+_index: Optional[SpatialIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index(region_db) -> SpatialIndex:
+    """프로세스당 한 번 만들어 재사용 (regions 1.6k, 관측소 수백 개 규모)"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SpatialIndex(
+                region_db.get_available_regions(), load_station_coords()
+            )
+        return _index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="관측소 좌표 받아 저장 (stn_inf.php)")
+    parser.add_argument("--auth-key", default=os.getenv("AWS_AUTH_KEY", ""))
+    parser.add_argument("--output", default=STATION_COORDS_PATH)
+    args = parser.parse_args()
+
+    df = fetch_station_coords(args.auth_key)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    df.to_csv(args.output, index=False)
+    print(f"{len(df)}개 관측소 좌표 저장 → {args.output}")
@@ -1,9 +1,11 @@
-// static/script.js (v5)
+// static/script.js (v8)
 
 let allRegions = [];
 let selectedRegions = [];
 let configsList = [];
 let currentTaskId = null;
+// 예상 시간이 이보다 길면 시작 전에 확인 (초)
+const PLAN_CONFIRM_SECONDS = 600;
 
 window.addEventListener('DOMContentLoaded', () => {
   loadRegions();
@@ -64,7 +66,32 @@ function bindLogin() {
 // 단기예보 폼 바인딩
 function bindDownloadForm() {
   document.getElementById('region-search').addEventListener('input', debounce(onSearch, 300));
+  document.getElementById('region-list').addEventListener('scroll', onRegionScroll, { passive: true });
   document.getElementById('download-form').addEventListener('submit', onSubmit);
+  document.getElementById('pause-download').addEventListener('click', onPauseToggle);
+  document.getElementById('cancel-download').addEventListener('click', () => controlJob('cancel'));
+}
+
+// 작업 제어 (cancel / pause / resume)
+async function controlJob(action) {
+  if (!currentTaskId) return;
+  const token = localStorage.getItem('token');
+  const res = await fetch(`/api/jobs/${currentTaskId}/${action}`, {
+    method: 'POST',
+    headers: { 'Authorization': `Bearer ${token}` }
+  });
+  const json = await res.json();
+  if (!res.ok) return alert(json.detail || '요청 실패');
+  return json.status;
+}
+
+async function onPauseToggle() {
+  const btn = document.getElementById('pause-download');
+  const paused = btn.dataset.paused === '1';
+  const status = await controlJob(paused ? 'resume' : 'pause');
+  if (!status) return;
+  btn.dataset.paused = status === 'paused' ? '1' : '';
+  btn.textContent = status === 'paused' ? '재개' : '일시정지';
 }
 
 // 파일 새로고침 바인딩
@@ -80,13 +107,16 @@ function setupDateDefaults() {
   document.getElementById('end_date').value   = today.toISOString().split('T')[0];
 }
 
-// 지역 목록 로드
+// 지역 목록 로드 (압축 배열 → 객체, 버전이 붙은 URL 은 브라우저 캐시에서 바로 응답)
 async function loadRegions() {
   try {
-    const res = await fetch('/api/regions');
-    const { regions } = await res.json();
-    allRegions = regions;
-    renderRegionList(regions);
+    const version = document.body.dataset.regionsVersion;
+    const res = await fetch('/api/regions/compact' + (version ? `?v=${version}` : ''));
+    const { level1, level2, rows } = await res.json();
+    allRegions = rows.map(([i1, i2, level3, code]) => ({
+      level1: level1[i1], level2: level2[i2], level3, code
+    }));
+    renderRegionList(allRegions);
   } catch (e) {
     console.error('지역 목록 로드 실패:', e);
   }
@@ -242,21 +272,51 @@ function onSearch(e) {
   renderRegionList(filtered);
 }
 
-// 지역 리스트 렌더링
+// 지역 리스트 렌더링 (가상 스크롤: 보이는 행 + 여유분만 DOM 에 둠)
+const REGION_ROW_HEIGHT = 40;
+const REGION_OVERSCAN = 8;
+let regionRows = [];
+let regionDrawPending = false;
+
 function renderRegionList(list) {
   const cont = document.getElementById('region-list');
-  cont.innerHTML = '';
+  regionRows = list;
+  cont.scrollTop = 0;
   if (!list.length) {
     cont.innerHTML = '<p style="padding:10px">검색 결과가 없습니다.</p>';
     return;
   }
-  list.forEach(r => {
+  cont.innerHTML = '<div class="region-spacer"></div>';
+  cont.firstChild.style.height = `${list.length * REGION_ROW_HEIGHT}px`;
+  drawVisibleRegions();
+}
+
+function drawVisibleRegions() {
+  regionDrawPending = false;
+  const cont = document.getElementById('region-list');
+  const spacer = cont.querySelector('.region-spacer');
+  if (!spacer) return;
+  const height = cont.clientHeight || 300;
+  const first = Math.max(0, Math.floor(cont.scrollTop / REGION_ROW_HEIGHT) - REGION_OVERSCAN);
+  const last = Math.min(regionRows.length,
+    Math.ceil((cont.scrollTop + height) / REGION_ROW_HEIGHT) + REGION_OVERSCAN);
+  const frag = document.createDocumentFragment();
+  for (let i = first; i < last; i++) {
+    const r = regionRows[i];
     const d = document.createElement('div');
     d.className = 'region-item';
+    d.style.top = `${i * REGION_ROW_HEIGHT}px`;
     d.textContent = `${r.level1} / ${r.level2} / ${r.level3}`;
     d.onclick = () => selectRegion(r);
-    cont.appendChild(d);
-  });
+    frag.appendChild(d);
+  }
+  spacer.replaceChildren(frag);
+}
+
+function onRegionScroll() {
+  if (regionDrawPending) return;
+  regionDrawPending = true;
+  requestAnimationFrame(drawVisibleRegions);
 }
 
 // 지역 선택
@@ -322,13 +382,37 @@ async function onSubmit(e) {
   if (!token) return alert('먼저 로그인해 주세요!');
 
   try {
+    // 실행 전 작업 계획 확인 (큰 작업은 요청 수 · 크기 · 예상 시간을 보여주고 확인)
+    const planForm = new FormData();
+    ['regions', 'config_name', 'variables', 'start_date', 'end_date'].forEach(k => planForm.set(k, form.get(k)));
+    const planRes = await fetch('/api/download/plan', {
+      method: 'POST',
+      headers: { 'Authorization': `Bearer ${token}` },
+      body: planForm
+    });
+    const plan = await planRes.json();
+    if (!planRes.ok) throw new Error(plan.detail || '작업 계획 실패');
+    if (plan.guard.exceeded || plan.estimated_seconds > PLAN_CONFIRM_SECONDS) {
+      const lines = [
+        `항목 ${plan.items.toLocaleString()}개 · 요청 ${plan.requests.toLocaleString()}회`,
+        `예상 크기 ${formatFileSize(plan.expected_bytes)} · 예상 시간 ${Math.ceil(plan.estimated_seconds_with_load / 60)}분`,
+      ];
+      if (plan.guard.exceeded) {
+        lines.push(plan.guard.mode === 'reject'
+          ? `크기 제한을 넘어 실행할 수 없습니다 (${plan.guard.reasons.join(', ')})`
+          : `크기 제한을 넘어 대기열에서 차례대로 실행됩니다 (${plan.guard.reasons.join(', ')})`);
+      }
+      if (plan.guard.exceeded && plan.guard.mode === 'reject') return alert(lines.join('\n'));
+      if (!confirm(lines.join('\n') + '\n\n다운로드를 시작할까요?')) return;
+    }
+
     const res = await fetch('/api/download', {
       method: 'POST',
       headers: { 'Authorization': `Bearer ${token}` },
       body: form
     });
     const json = await res.json();
-    if (!res.ok) throw new Error(json.detail || '다운로드 요청 실패');
+    if (!res.ok) throw new Error((json.detail && json.detail.message) || json.detail || '다운로드 요청 실패');
     currentTaskId = json.task_id;
     showProgress();
     pollStatus();
@@ -356,10 +440,23 @@ function pollStatus() {
       const pct = status.total ? ((status.progress / status.total) * 100).toFixed(1) : 0;
       document.getElementById('progress-fill').style.width    = pct + '%';
       document.getElementById('progress-text').textContent    = `${status.progress}/${status.total} (${pct}%)`;
-      document.getElementById('progress-details').textContent = `현재: ${status.current_item}`;
-      if (status.status === 'completed' || status.status === 'error') {
+      const eta = status.eta_seconds != null ? ` · 예상 ${Math.ceil(status.eta_seconds / 60)}분` : '';
+      // KMA 장애로 회로가 열려 있으면 모든 작업이 잠시 대기
+      const upstream = status.upstream && status.upstream.state === 'open'
+        ? ` · 기상청 응답 오류로 ${Math.ceil(status.upstream.retry_after)}초 대기` : '';
+      const current = status.status === 'queued' ? '대량 작업 대기 중' : status.current_item;
+      document.getElementById('progress-details').textContent = `현재: ${current}${eta}${upstream}`;
+      if (['completed', 'error', 'cancelled'].includes(status.status)) {
         clearInterval(interval);
-        if (status.status === 'completed') showToast('다운로드가 완료되었습니다!');
+        if (status.status === 'completed') {
+          showToast('다운로드가 완료되었습니다!');
+          showBundleLink(currentTaskId);
+          showDeadLetters(currentTaskId, status.dead_letters);
+        }
+        else if (status.status === 'cancelled') {
+          showToast('다운로드가 취소되었습니다. 받은 파일은 유지됩니다.');
+          showBundleLink(currentTaskId);
+        }
         else alert('다운ロード 중 오류: ' + status.error);
         hideProgress();
       }
@@ -371,6 +468,55 @@ function pollStatus() {
   }, 1000);
 }
 
+// 작업 결과 전체 ZIP 링크 (파일마다 요청하지 않고 한 번에)
+function showBundleLink(taskId) {
+  let a = document.getElementById('bundle-link');
+  if (!a) {
+    a = document.createElement('a');
+    a.id = 'bundle-link';
+    a.className = 'btn-secondary';
+    document.getElementById('progress-container').after(a);
+  }
+  a.href = `/api/jobs/${taskId}/bundle`;
+  a.innerHTML = '<i class="fas fa-file-archive"></i> 전체 결과 ZIP 다운로드';
+}
+
+// 재시도를 모두 소진한 항목 목록 + 다시 받기 버튼
+function showDeadLetters(taskId, items) {
+  let box = document.getElementById('dead-letters');
+  if (!items || !items.length) {
+    if (box) box.remove();
+    return;
+  }
+  if (!box) {
+    box = document.createElement('div');
+    box.id = 'dead-letters';
+    document.getElementById('progress-container').after(box);
+  }
+  // item · reason 에는 서버 예외 문구가 그대로 들어 있으므로 HTML 로 해석하지 않음
+  box.innerHTML = `<p>실패한 항목 ${items.length}개</p><ul></ul>`
+    + '<button class="btn-secondary">실패 항목 다시 받기</button>';
+  const list = box.querySelector('ul');
+  for (const d of items) {
+    const li = document.createElement('li');
+    li.textContent = `${d.item} — ${d.reason} (${d.attempts}회 시도)`;
+    list.appendChild(li);
+  }
+  box.querySelector('button').addEventListener('click', async () => {
+    const token = localStorage.getItem('token');
+    const res = await fetch(`/api/jobs/${taskId}/dead-letters/requeue`, {
+      method: 'POST',
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+    const json = await res.json();
+    if (!res.ok) return alert(json.detail || '요청 실패');
+    box.remove();
+    currentTaskId = taskId;
+    showProgress();
+    pollStatus();
+  });
+}
+
 // 파일 목록 로드
 async function loadFiles() {
   const container = document.getElementById('files-list');
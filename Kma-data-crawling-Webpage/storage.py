@@ -0,0 +1,74 @@
+# storage.py
+
+import io
+import os
+from typing import BinaryIO, Iterator
+
+import pandas as pd
+
+# 다운로드한 CSV 저장 방식: "" (무압축) / "zstd" (<파일>.zst 로 저장)
+STORE_COMPRESSION = os.getenv("STORE_COMPRESSION", "").lower()
+ZSTD_LEVEL = int(os.getenv("STORE_ZSTD_LEVEL", "9"))
+ZSTD_EXT = ".zst"
+CHUNK_SIZE = 64 * 1024
+
+
+def write_bytes(path: str, data: bytes, compression: str = None) -> str:
+    """
+    data 를 path 에 저장하고 실제로 쓴 경로를 반환.
+    압축 저장이면 path + '.zst' 에 기록합니다 (임시파일 → rename 으로 원자적 교체).
+    """
+    compression = STORE_COMPRESSION if compression is None else compression
+    if compression == "zstd":
+        import zstandard
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        path = path + ZSTD_EXT
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def resolve(path: str) -> str:
+    """논리 경로(…/x.csv)에 대해 디스크에 있는 실제 파일 경로 (없으면 FileNotFoundError)"""
+    if os.path.exists(path):
+        return path
+    if os.path.exists(path + ZSTD_EXT):
+        return path + ZSTD_EXT
+    raise FileNotFoundError(path)
+
+
+def logical_path(path: str) -> str:
+    """저장 경로 → 논리 경로 (.zst 제거)"""
+    return path[:-len(ZSTD_EXT)] if path.endswith(ZSTD_EXT) else path
+
+
+def open_read(path: str) -> BinaryIO:
+    """압축 여부와 관계없이 원본 바이트를 읽는 파일 객체"""
+    real = resolve(path)
+    if real.endswith(ZSTD_EXT):
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(real, "rb"), closefd=True)
+    return open(real, "rb")
+
+
+def read_bytes(path: str) -> bytes:
+    with open_read(path) as f:
+        return f.read()
+
+
+def read_csv(path: str, encoding: str = "euc-kr", **kwargs) -> pd.DataFrame:
+    """KMA CSV 읽기 (.zst 자동 해제)"""
+    with open_read(path) as f:
+        return pd.read_csv(io.TextIOWrapper(f, encoding=encoding), **kwargs)
+
+
+def iter_decompressed(path: str) -> Iterator[bytes]:
+    """서버 측 투명 해제용 청크 스트림"""
+    with open_read(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,368 @@
+# store.py
+
+import contextlib
+import fcntl
+import io
+import os
+import sqlite3
+import threading
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from metrics import record_cache
+import parsing
+from parsing import parse_forecast_csv
+
+# 로컬 컬럼 저장소 (Hive 파티션 Parquet)
+#   store/asos/stn=108/month=202307/data.parquet
+#   store/forecast/config=단기예보/variable=TMP/region=60_127/month=202307/data.parquet
+STORE_DIR = os.getenv("STORE_DIR", "store")
+# 다운로드한 예보 CSV 를 저장소에도 적재할지 여부
+STORE_INGEST = os.getenv("STORE_INGEST", "1") == "1"
+
+PARTITIONS = {
+    "asos": pa.schema([("stn", pa.string()), ("month", pa.int32())]),
+    "aws": pa.schema([("stn", pa.string()), ("month", pa.int32())]),
+    "forecast": pa.schema([
+        ("config", pa.string()), ("variable", pa.string()),
+        ("region", pa.string()), ("month", pa.int32()),
+    ]),
+}
+# 소스별 시간 컬럼과 중복 판정 키
+TIME_COLUMN = {"asos": "time", "aws": "time", "forecast": "valid_time"}
+DEDUP_KEYS = {"asos": ["station_id", "time"], "aws": ["station_id", "time"], "forecast": ["issue_time", "lead"]}
+# 열 단위로 병합할 소스: 변수별로 따로 받은 관측값이 같은 파티션 파일을 나눠 쓰므로
+# 새 행이 기존 행을 통째로 덮지 않고, 새 값이 있는 칸만 덮어씀 (예보는 행 단위 교체)
+COLUMN_MERGE = {"asos", "aws"}
+# 문자열로 유지할 관측 컬럼 (clfmAbbrCd: ASOS 운형 약어, region_key: ASOS.select_data 가 붙이는 지역키)
+ASOS_TEXT_COLUMNS = {"station_id", "station_name", "clfmAbbrCd", "region_key"}
+# 관측소 전체를 뜻하는 키 (KMA API 의 stn=0 관례)
+ALL_STATIONS = "0"
+
+_partition_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_guard:
+        return _partition_locks.setdefault(path, threading.Lock())
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """
+    파티션 파일 잠금 — 같은 프로세스의 스레드는 threading.Lock, 다른 워커(프로세스)는 flock.
+    잠금 파일은 '.' 으로 시작해 데이터셋 스캔에서 제외됨
+    """
+    lock_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".lock")
+    with _lock_for(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _partition_dir(source: str, **keys) -> str:
+    parts = [f"{name}={keys[name]}" for name in PARTITIONS[source].names]
+    return os.path.join(STORE_DIR, source, *parts)
+
+
+def _frame(table: pa.Table) -> pd.DataFrame:
+    """Parquet 는 초 단위 timestamp 를 ms 로 저장하므로 병합 전에 단위를 맞춤"""
+    df = table.to_pandas()
+    for c in df.select_dtypes("datetime").columns:
+        df[c] = df[c].astype("datetime64[s]")
+    return df
+
+
+def _merge_write(path: str, table: pa.Table, dedup_keys: List[str], time_col: str,
+                 columnwise: bool = False):
+    """
+    파티션 파일에 병합 기록 (같은 키는 새 값 우선) — 기록자별 임시파일 → rename.
+    columnwise=True 면 같은 키의 행을 열 단위로 합침: 새 값이 NaN 인 칸과
+    새 데이터에 없는 열은 기존 값을 유지합니다.
+    """
+    with _file_lock(path):
+        df = _frame(table).drop_duplicates(subset=dedup_keys, keep="last")
+        if os.path.exists(path):
+            old = _frame(pq.read_table(path)).drop_duplicates(subset=dedup_keys, keep="last")
+            if columnwise:
+                columns = list(old.columns) + [c for c in df.columns if c not in old.columns]
+                df = (
+                    df.set_index(dedup_keys)
+                    .combine_first(old.set_index(dedup_keys))
+                    .reset_index()[columns]
+                )
+            else:
+                df = pd.concat([old, df], ignore_index=True)
+                df = df.drop_duplicates(subset=dedup_keys, keep="last")
+        df = df.sort_values(time_col)
+        tmp = os.path.join(
+            os.path.dirname(path),
+            f".{os.path.basename(path)}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp",
+        )
+        try:
+            pq.write_table(
+                pa.Table.from_pandas(df, preserve_index=False), tmp, compression="zstd"
+            )
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+# ── 적재 ──────────────────────────────────────────────
+def _numeric_or_text(col: pd.Series) -> pd.Series:
+    """숫자로 읽히는 컬럼만 float32 (빈 문자열은 NaN), 숫자가 아닌 값이 하나라도 있으면 문자열 유지"""
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype("float32")
+    num = pd.to_numeric(col, errors="coerce")
+    blank = col.isna() | (col.astype(str).str.strip() == "")
+    if (num.isna() & ~blank).any():
+        return col.astype(str).where(~col.isna(), None)
+    return num.astype("float32")
+
+
+def write_observations(source: str, df: pd.DataFrame, station_col: str = "station_id"):
+    """ASOS/AWS 관측 DataFrame 을 (관측소, 월) 파티션으로 나눠 기록"""
+    if df.empty:
+        return
+    df = df.copy()
+    for c in df.columns:
+        if c in ASOS_TEXT_COLUMNS or c == station_col:
+            df[c] = df[c].astype(str).where(~df[c].isna(), None)
+        elif c != "time":
+            df[c] = _numeric_or_text(df[c])
+    df["time"] = pd.to_datetime(df["time"]).astype("datetime64[s]")
+    month = df["time"].dt.year * 100 + df["time"].dt.month
+    for (stn, m), part in df.groupby([df[station_col], month]):
+        path = os.path.join(_partition_dir(source, stn=stn, month=int(m)), "data.parquet")
+        _merge_write(
+            path, pa.Table.from_pandas(part, preserve_index=False),
+            DEDUP_KEYS[source], TIME_COLUMN[source], columnwise=source in COLUMN_MERGE
+        )
+
+
+def write_forecast(batch: pa.RecordBatch, config: str, variable: str, region: str):
+    """parsing.parse_forecast_csv 결과를 (설정, 변수, 격자, 월) 파티션으로 기록"""
+    if batch.num_rows == 0:
+        return
+    df = batch.to_pandas()
+    df["region"] = df["region"].astype(str)
+    month = df["issue_time"].dt.year * 100 + df["issue_time"].dt.month
+    for m, part in df.groupby(month):
+        path = os.path.join(
+            _partition_dir("forecast", config=config, variable=variable,
+                           region=region, month=int(m)),
+            "data.parquet",
+        )
+        _merge_write(
+            path, pa.Table.from_pandas(part.drop(columns=["region"]), preserve_index=False),
+            DEDUP_KEYS["forecast"], TIME_COLUMN["forecast"]
+        )
+
+
+def ingest_forecast_zip(data, config: str, variable: str, region: str,
+                        pool: Optional[parsing.ParsePool] = None) -> int:
+    """
+    downloadZip.do 응답 ZIP (바이트 또는 파일 경로) 을 파싱해 저장소에 적재, 적재 행 수 반환.
+    pool 을 주거나 압축 해제 크기가 PARSE_POOL_MIN_BYTES 이상이면 파일별 파싱을 프로세스 풀에서 수행
+    """
+    n = 0
+    with zipfile.ZipFile(io.BytesIO(data) if isinstance(data, bytes) else data) as z:
+        infos = z.infolist()
+        if pool is None and sum(i.file_size for i in infos) >= parsing.PARSE_POOL_MIN_BYTES:
+            pool = parsing.shared_pool()
+        if pool is None:
+            batches = ((i.filename, parse_forecast_csv(z.read(i))) for i in infos)
+        else:
+            batches = pool.parse_forecast_members((i.filename, z.read(i)) for i in infos)
+        for _, batch in batches:
+            write_forecast(batch, config, variable, region)
+            n += batch.num_rows
+    return n
+
+
+# ── 캐시 범위 (어떤 날짜를 이미 받아두었는지) ─────────────
+_COVERAGE_DB = os.path.join(STORE_DIR, "coverage.db")
+
+
+def _coverage_conn() -> sqlite3.Connection:
+    os.makedirs(STORE_DIR, exist_ok=True)
+    conn = sqlite3.connect(_COVERAGE_DB, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS coverage (
+        source TEXT NOT NULL,
+        key    TEXT NOT NULL,
+        day    TEXT NOT NULL,
+        PRIMARY KEY (source, key, day)
+    ) WITHOUT ROWID""")
+    return conn
+
+
+def _days(start: str, end: str) -> List[str]:
+    d0 = datetime.strptime(start, "%Y%m%d")
+    d1 = datetime.strptime(end, "%Y%m%d")
+    return [(d0 + timedelta(days=i)).strftime("%Y%m%d") for i in range((d1 - d0).days + 1)]
+
+
+def missing_days(source: str, key: str, start: str, end: str) -> List[str]:
+    """[start, end] 중 아직 저장소에 없는 날짜 (YYYYMMDD)"""
+    conn = _coverage_conn()
+    try:
+        have = {
+            r[0] for r in conn.execute(
+                "SELECT day FROM coverage WHERE source = ? AND key = ? AND day BETWEEN ? AND ?",
+                (source, key, start, end),
+            )
+        }
+    finally:
+        conn.close()
+    return [d for d in _days(start, end) if d not in have]
+
+
+def mark_covered(source: str, key: str, start: str, end: str,
+                 days: Optional[Iterable[str]] = None):
+    """
+    완결된 날짜만 기록 (오늘 이후는 데이터가 더 들어올 수 있으므로 제외).
+    days 를 주면 [start, end] 중 그 날짜만 기록합니다 (present_days 참고)
+    """
+    today = datetime.now().strftime("%Y%m%d")
+    wanted = None if days is None else set(days)
+    days = [d for d in _days(start, end) if d < today and (wanted is None or d in wanted)]
+    conn = _coverage_conn()
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO coverage VALUES (?, ?, ?)",
+            [(source, key, d) for d in days],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def present_days(df: pd.DataFrame) -> set:
+    """받은 데이터에 실제로 있는 날짜 (YYYYMMDD) — 일부 시각이 빠진 응답을 범위 전체로 기록하지 않도록"""
+    if df.empty:
+        return set()
+    return set(pd.to_datetime(df["time"]).dt.strftime("%Y%m%d").unique())
+
+
+def cached_observations(source: str, key: str, start: str, end: str, fetch,
+                        coverage_keys: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    저장소를 캐시로 사용: 모든 날짜가 있으면 로컬에서 읽고(hit),
+    아니면 fetch(start, end) 로 받아 적재한 뒤 로컬에서 읽습니다(miss).
+    key 가 ALL_STATIONS("0") 이면 전체 관측소를 조회하며, coverage_keys 로
+    변수별 등 더 잘게 캐시 범위를 기록할 수 있습니다 (하나라도 빠진 날짜가 있으면 miss).
+    """
+    coverage_keys = coverage_keys or [key]
+    missing = sorted({d for k in coverage_keys for d in missing_days(source, k, start, end)})
+    record_cache(source, hit=not missing)
+    if missing:
+        df = fetch(missing[0], missing[-1])
+        # 응답에 실제로 있는 날짜만 기록 (빠진 날짜는 실패와 구분할 수 없으므로 다음에 다시 시도)
+        if not df.empty:
+            write_observations(source, df)
+            days = present_days(df)
+            for k in coverage_keys:
+                mark_covered(source, k, missing[0], missing[-1], days=days)
+    t0 = datetime.strptime(start, "%Y%m%d")
+    t1 = datetime.strptime(end, "%Y%m%d") + timedelta(days=1)
+    try:
+        keys = None if key == ALL_STATIONS else [key]
+        table = scan(source, keys=keys, start=t0, end=t1).to_table()
+    except FileNotFoundError:
+        return pd.DataFrame()
+    return table.to_pandas().drop(columns=["stn", "month"], errors="ignore")
+
+
+# ── 조회 ──────────────────────────────────────────────
+def dataset(source: str) -> ds.Dataset:
+    root = os.path.join(STORE_DIR, source)
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"저장소에 {source} 데이터가 없습니다.")
+    return ds.dataset(
+        root, format="parquet",
+        partitioning=ds.partitioning(PARTITIONS[source], flavor="hive"),
+    )
+
+
+def scan(
+    source: str,
+    keys: Optional[Iterable[str]] = None,
+    variables: Optional[Iterable[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[List[str]] = None,
+    config: Optional[str] = None,
+) -> ds.Scanner:
+    """
+    파티션 가지치기(관측소/격자·월·변수) + 조건 푸시다운 스캐너.
+    end 는 배타적(미포함) 경계입니다.
+    """
+    dset = dataset(source)
+    key_field = "region" if source == "forecast" else "stn"
+    time_col = TIME_COLUMN[source]
+    expr = None
+
+    def _and(e):
+        nonlocal expr
+        expr = e if expr is None else expr & e
+
+    if keys:
+        _and(ds.field(key_field).isin(list(keys)))
+    if source == "forecast":
+        if variables:
+            _and(ds.field("variable").isin(list(variables)))
+        if config:
+            _and(ds.field("config") == config)
+    if start is not None:
+        # 예보는 발표월 파티션이므로 유효시각 기준 조회 시 한 달 앞까지 포함
+        m0 = start - timedelta(days=31) if source == "forecast" else start
+        _and(ds.field("month") >= m0.year * 100 + m0.month)
+        _and(ds.field(time_col) >= pa.scalar(start, pa.timestamp("s")))
+    if end is not None:
+        _and(ds.field("month") <= end.year * 100 + end.month)
+        _and(ds.field(time_col) < pa.scalar(end, pa.timestamp("s")))
+
+    if columns is None and source != "forecast" and variables:
+        columns = ["time", "stn"] + [v for v in variables if v not in ("time", "stn")]
+    if columns is not None:
+        columns = [c for c in columns if c in dset.schema.names]
+    return dset.scanner(columns=columns, filter=expr, batch_size=64 * 1024)
+
+
+def iter_csv(scanner: ds.Scanner) -> Iterator[bytes]:
+    """스캐너 배치를 CSV 바이트로 (헤더는 첫 배치만)"""
+    first = True
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        buf = io.BytesIO()
+        pacsv.write_csv(
+            pa.Table.from_batches([batch]), buf,
+            write_options=pacsv.WriteOptions(include_header=first),
+        )
+        first = False
+        yield buf.getvalue()
+
+
+def iter_ndjson(scanner: ds.Scanner) -> Iterator[bytes]:
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        df = batch.to_pandas()
+        yield df.to_json(orient="records", lines=True, date_format="iso", force_ascii=False).encode("utf-8")
@@ -0,0 +1,576 @@
+# subscriptions.py
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from aws import fetch_aws_data, AWS_AUTH_KEY, VARIABLES as AWS_VARIABLES
+from ASOS import fetch_asos_data
+from jobstore import WORKER_ID
+from metrics import SYNC_RUNS, SYNC_ROWS
+from resilience import kma_breaker
+from scheduler import scheduler
+from weather_downloader import (
+    WeatherDownloader, ItemFailed, SessionExpired, SpooledZip, FORECAST_CONFIGS
+)
+import forecast_views
+import rollups
+import store
+
+logger = logging.getLogger(__name__)
+
+# 구독: "이 격자 · 관측소들을 계속 최신으로" — 정의는 DB 에 두고, 워커 안의 동기화 루프가
+# (소스, 설정, 지점, 변수) 대상마다 워터마크(받은 마지막 완결일) 이후만 받아 저장소에 적재합니다.
+#   - 같은 대상을 여러 구독이 공유해도 워터마크는 하나 (겹치는 구간을 다시 받지 않음)
+#   - AWS 는 변수들이 관측소 파티션 파일 하나를 나눠 쓰므로 관측소마다 대상 하나
+#     (구독한 변수 전체를 한 번에 받고 워터마크도 하나)
+#   - 대상마다 주기 안에서 고르게 흩어진 시각에 실행 + 틱마다 SYNC_BATCH 개만 순서대로 처리
+#   - 여러 워커가 같은 DB 를 보므로 대상은 임대(lease)로 한 워커만 가져감
+SUBSCRIPTIONS_PATH = os.getenv("SUBSCRIPTIONS_PATH", "data/subscriptions.db")
+SOURCES = ("forecast", "asos", "aws")
+
+SYNC_TICK = float(os.getenv("SYNC_TICK_SECONDS", "15"))
+SYNC_BATCH = int(os.getenv("SYNC_BATCH", "4"))
+SYNC_LEASE = float(os.getenv("SYNC_LEASE_SECONDS", "900"))
+SYNC_MIN_INTERVAL = float(os.getenv("SYNC_MIN_INTERVAL_MINUTES", "15")) * 60
+# 한 번에 받는 최대 일수 — 밀린 대상은 다음 틱에 이어서 (긴 백필이 한꺼번에 몰리지 않도록)
+SYNC_MAX_DAYS = int(os.getenv("SYNC_MAX_DAYS_PER_RUN", "31"))
+SYNC_CATCHUP_DELAY = 60.0
+SYNC_DEFAULT_BACKFILL_DAYS = int(os.getenv("SYNC_DEFAULT_BACKFILL_DAYS", "7"))
+# 실패 시 재시도 간격 (지수 증가, 주기를 넘지 않음)
+SYNC_RETRY_BASE = 120.0
+# 공정 스케줄러에서 동기화가 차지하는 몫 (사용자 작업보다 낮게)
+SYNC_CLIENT = "subscriptions"
+SYNC_WEIGHT = float(os.getenv("SYNC_WEIGHT", "0.5"))
+
+# 예보 동기화용 KMA 계정 (구독에는 비밀번호를 저장하지 않음)
+SYNC_KMA_LOGIN_ID = os.getenv("SYNC_KMA_LOGIN_ID", "")
+SYNC_KMA_PASSWORD = os.getenv("SYNC_KMA_PASSWORD", "")
+
+# 신선도 상태 (뒤로 갈수록 나쁨)
+FRESHNESS_STATES = ("fresh", "catching_up", "stale", "failing")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    username    TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    config_name TEXT NOT NULL,
+    keys        TEXT NOT NULL,      -- JSON
+    variables   TEXT NOT NULL,      -- JSON
+    interval_s  REAL NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS subscriptions_user ON subscriptions(username);
+CREATE TABLE IF NOT EXISTS sync_targets (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    source       TEXT NOT NULL,
+    config_name  TEXT NOT NULL,
+    key          TEXT NOT NULL,     -- 격자 코드 / 관측소 코드
+    variable     TEXT NOT NULL,     -- 변수 코드 (ASOS · AWS 는 "*")
+    spec         TEXT NOT NULL,     -- 요청에 필요한 원본 (예보: 지역 · 변수 dict, AWS: 변수 목록, JSON)
+    watermark    TEXT NOT NULL,     -- YYYYMMDD: 이 날짜까지 완결
+    interval_s   REAL NOT NULL,     -- 공유하는 구독 중 가장 짧은 주기
+    next_run     REAL NOT NULL,
+    lease_owner  TEXT,
+    lease_until  REAL,
+    last_attempt REAL,
+    last_success REAL,
+    last_error   TEXT,
+    failures     INTEGER NOT NULL DEFAULT 0,
+    rows_synced  INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (source, config_name, key, variable)
+);
+CREATE INDEX IF NOT EXISTS sync_targets_due ON sync_targets(next_run);
+CREATE TABLE IF NOT EXISTS subscription_targets (
+    subscription_id INTEGER NOT NULL,
+    target_id       INTEGER NOT NULL,
+    PRIMARY KEY (subscription_id, target_id)
+) WITHOUT ROWID;
+"""
+
+TARGET_COLUMNS = (
+    "id", "source", "config_name", "key", "variable", "watermark", "interval_s", "next_run",
+    "last_attempt", "last_success", "last_error", "failures", "rows_synced",
+)
+
+
+def _day(d: datetime) -> str:
+    return d.strftime("%Y%m%d")
+
+
+def _parse_day(s: str) -> datetime:
+    return datetime.strptime(s, "%Y%m%d")
+
+
+def _spread(target_key: str, interval_s: float) -> float:
+    """대상마다 고정된 주기 내 오프셋 (같은 시각에 몰리지 않도록)"""
+    return (zlib.crc32(target_key.encode()) % 1000) / 1000 * interval_s
+
+
+def freshness(target: dict, now: Optional[float] = None) -> dict:
+    """
+    대상 하나의 신선도.
+    - behind_days: 어제(완결된 마지막 날)보다 워터마크가 며칠 뒤처졌는지
+    - lag_hours: 워터마크 이후 지난 시간
+    - state: fresh | catching_up(밀렸지만 최근 성공) | stale | failing(최근 실패)
+    """
+    now = now if now is not None else time.time()
+    wm = _parse_day(target["watermark"])
+    expected = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0) \
+        - timedelta(days=1)
+    behind = max((expected - wm).days, 0)
+    if behind == 0:
+        state = "fresh"
+    elif target["failures"] and target["last_error"]:
+        state = "failing"
+    elif target["last_success"] and now - target["last_success"] < 2 * target["interval_s"]:
+        state = "catching_up"
+    else:
+        state = "stale"
+    return {
+        "state": state,
+        "behind_days": behind,
+        "lag_hours": round((now - (wm + timedelta(days=1)).timestamp()) / 3600, 1),
+    }
+
+
+def _summary(targets: List[dict]) -> dict:
+    states = {s: 0 for s in FRESHNESS_STATES}
+    for t in targets:
+        states[t["freshness"]["state"]] += 1
+    worst = max((t["freshness"]["state"] for t in targets),
+                key=FRESHNESS_STATES.index, default="fresh")
+    successes = [t["last_success"] for t in targets if t["last_success"]]
+    return {
+        "state": worst,
+        "targets": len(targets),
+        "states": states,
+        "oldest_watermark": min((t["watermark"] for t in targets), default=None),
+        "max_lag_hours": max((t["freshness"]["lag_hours"] for t in targets), default=None),
+        "last_success": max(successes) if successes else None,
+        "next_run": min((t["next_run"] for t in targets), default=None),
+    }
+
+
+class SubscriptionStore:
+    def __init__(self, path: str = SUBSCRIPTIONS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---- 구독 정의 ----
+    def create(self, username: str, name: str, source: str, keys: list, variables: list,
+               interval_s: float, config_name: str = "", backfill_from: Optional[datetime] = None) -> int:
+        """
+        구독 생성 + 대상(예보: 격자 × 변수, 관측: 관측소) 등록.
+        keys: 예보는 지역 dict({level3, code, ...}), 관측은 관측소 코드 / variables: 예보는 변수 dict,
+        AWS 는 변수 코드, ASOS 는 무시(전체 컬럼). backfill_from 이후 자료부터 받습니다.
+        이미 다른 구독이 받고 있는 대상은 그 워터마크를 그대로 씁니다.
+        """
+        if source not in SOURCES:
+            raise ValueError(f"source 는 {' | '.join(SOURCES)} 입니다.")
+        if not keys:
+            raise ValueError("구독할 지역/관측소가 없습니다.")
+        if interval_s < SYNC_MIN_INTERVAL:
+            raise ValueError(f"주기는 {SYNC_MIN_INTERVAL / 60:.0f}분 이상이어야 합니다.")
+        if source == "forecast":
+            if config_name not in FORECAST_CONFIGS:
+                raise ValueError(f"알 수 없는 예보 유형: {config_name}")
+            if not variables:
+                raise ValueError("구독할 변수가 없습니다.")
+            targets = [(r["code"], v["code"], {"region": r, "variable": v})
+                       for r in keys for v in variables]
+        elif source == "aws":
+            variables = sorted({v.upper() for v in variables} or AWS_VARIABLES)
+            bad = [v for v in variables if v not in AWS_VARIABLES]
+            if bad:
+                raise ValueError(f"지원하지 않는 AWS 변수: {','.join(bad)}")
+            config_name = ""
+            targets = [(str(k), "*", {"variables": variables}) for k in keys]
+        else:
+            config_name, variables = "", ["*"]
+            targets = [(str(k), "*", {}) for k in keys]
+
+        now = time.time()
+        start = backfill_from or datetime.now() - timedelta(days=SYNC_DEFAULT_BACKFILL_DAYS)
+        watermark = _day(start - timedelta(days=1))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            sub_id = conn.execute(
+                "INSERT INTO subscriptions (username, name, source, config_name, keys, variables,"
+                " interval_s, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (username, name, source, config_name, json.dumps(keys, ensure_ascii=False),
+                 json.dumps(variables, ensure_ascii=False), interval_s, now),
+            ).lastrowid
+            for key, variable, spec in targets:
+                tkey = f"{source}/{config_name}/{key}/{variable}"
+                conn.execute(
+                    "INSERT INTO sync_targets (source, config_name, key, variable, spec, watermark,"
+                    " interval_s, next_run) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (source, config_name, key, variable) DO UPDATE SET"
+                    " interval_s = MIN(interval_s, excluded.interval_s)",
+                    (source, config_name, key, variable, json.dumps(spec, ensure_ascii=False),
+                     watermark, interval_s, now + _spread(tkey, min(interval_s, SYNC_MIN_INTERVAL))),
+                )
+                target_id = conn.execute(
+                    "SELECT id FROM sync_targets WHERE source = ? AND config_name = ? AND key = ?"
+                    " AND variable = ?", (source, config_name, key, variable),
+                ).fetchone()[0]
+                if source == "aws":
+                    _merge_aws_variables(conn, target_id, variables, watermark)
+                conn.execute("INSERT OR IGNORE INTO subscription_targets VALUES (?, ?)",
+                             (sub_id, target_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return sub_id
+
+    def delete(self, sub_id: int):
+        """구독 삭제 — 다른 구독이 쓰지 않는 대상(과 워터마크)도 함께 삭제"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            affected = [r[0] for r in conn.execute(
+                "SELECT target_id FROM subscription_targets WHERE subscription_id = ?", (sub_id,)
+            )]
+            conn.execute("DELETE FROM subscription_targets WHERE subscription_id = ?", (sub_id,))
+            conn.execute("DELETE FROM subscriptions WHERE id = ?", (sub_id,))
+            conn.execute(
+                "DELETE FROM sync_targets WHERE id NOT IN (SELECT target_id FROM subscription_targets)"
+            )
+            # 남은 AWS 대상은 남은 구독이 원하는 변수만 받도록
+            for target_id in affected:
+                wanted = set()
+                for (variables,) in conn.execute(
+                    "SELECT s.variables FROM subscriptions s"
+                    " JOIN subscription_targets st ON st.subscription_id = s.id"
+                    " WHERE st.target_id = ? AND s.source = 'aws'", (target_id,),
+                ):
+                    wanted |= set(json.loads(variables))
+                if wanted:
+                    conn.execute("UPDATE sync_targets SET spec = ? WHERE id = ?",
+                                 (json.dumps({"variables": sorted(wanted)}), target_id))
+            # 남은 대상의 주기는 남은 구독 중 가장 짧은 주기로
+            conn.execute("""
+            UPDATE sync_targets SET interval_s = (
+                SELECT MIN(s.interval_s) FROM subscriptions s
+                  JOIN subscription_targets st ON st.subscription_id = s.id
+                 WHERE st.target_id = sync_targets.id)""")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _targets(self, sub_id: int, now: float) -> List[dict]:
+        rows = self._conn().execute(
+            f"SELECT {', '.join('t.' + c for c in TARGET_COLUMNS)} FROM sync_targets t"
+            " JOIN subscription_targets st ON st.target_id = t.id"
+            " WHERE st.subscription_id = ? ORDER BY t.key, t.variable", (sub_id,),
+        ).fetchall()
+        out = []
+        for r in rows:
+            t = dict(r)
+            t["freshness"] = freshness(t, now)
+            out.append(t)
+        return out
+
+    def _subscription(self, row: sqlite3.Row, now: float, include_targets: bool) -> dict:
+        sub = dict(row)
+        sub["keys"] = json.loads(sub["keys"])
+        sub["variables"] = json.loads(sub["variables"])
+        targets = self._targets(sub["id"], now)
+        sub["freshness"] = _summary(targets)
+        if include_targets:
+            sub["sync_targets"] = targets
+        return sub
+
+    def get(self, sub_id: int, include_targets: bool = True) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM subscriptions WHERE id = ?", (sub_id,)).fetchone()
+        if row is None:
+            return None
+        return self._subscription(row, time.time(), include_targets)
+
+    def by_user(self, username: str) -> List[dict]:
+        now = time.time()
+        rows = self._conn().execute(
+            "SELECT * FROM subscriptions WHERE username = ? ORDER BY id", (username,)
+        ).fetchall()
+        return [self._subscription(r, now, include_targets=False) for r in rows]
+
+    def trigger(self, sub_id: int) -> int:
+        """지금 동기화 (다음 틱에 실행)"""
+        cur = self._conn().execute(
+            "UPDATE sync_targets SET next_run = ? WHERE id IN"
+            " (SELECT target_id FROM subscription_targets WHERE subscription_id = ?)",
+            (time.time(), sub_id),
+        )
+        return cur.rowcount
+
+    # ---- 동기화 대상 임대 ----
+    def claim(self, limit: int = SYNC_BATCH) -> List[dict]:
+        """실행할 때가 된 대상을 이 워커가 임대 (다른 워커는 임대가 끝날 때까지 건너뜀)"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT * FROM sync_targets WHERE next_run <= ?"
+                " AND (lease_until IS NULL OR lease_until < ?) ORDER BY next_run LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE sync_targets SET lease_owner = ?, lease_until = ?, last_attempt = ? WHERE id = ?",
+                [(WORKER_ID, now + SYNC_LEASE, now, r["id"]) for r in rows],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        out = []
+        for r in rows:
+            t = dict(r)
+            t["spec"] = json.loads(t["spec"])
+            out.append(t)
+        return out
+
+    def finish(self, target: dict, watermark: str, rows: int, caught_up: bool):
+        """성공 — 워터마크 전진. 아직 밀려 있으면 곧바로 이어서, 아니면 다음 주기에"""
+        now = time.time()
+        delay = target["interval_s"] if caught_up else SYNC_CATCHUP_DELAY
+        self._conn().execute(
+            "UPDATE sync_targets SET watermark = MAX(watermark, ?), rows_synced = rows_synced + ?,"
+            " last_success = ?, last_error = NULL, failures = 0, next_run = ?,"
+            " lease_owner = NULL, lease_until = NULL WHERE id = ?",
+            (watermark, rows, now, now + delay, target["id"]),
+        )
+
+    def fail(self, target: dict, error: str):
+        now = time.time()
+        failures = target["failures"] + 1
+        delay = min(SYNC_RETRY_BASE * 2 ** (failures - 1), target["interval_s"])
+        self._conn().execute(
+            "UPDATE sync_targets SET last_error = ?, failures = ?, next_run = ?,"
+            " lease_owner = NULL, lease_until = NULL WHERE id = ?",
+            (error[:500], failures, now + delay, target["id"]),
+        )
+
+    def release(self, target: dict, delay: float):
+        """이번에는 건너뜀 (예: KMA 회로 차단 중) — 실패로 세지 않음"""
+        self._conn().execute(
+            "UPDATE sync_targets SET next_run = ?, lease_owner = NULL, lease_until = NULL WHERE id = ?",
+            (time.time() + delay, target["id"]),
+        )
+
+
+def _merge_aws_variables(conn: sqlite3.Connection, target_id: int, variables: List[str],
+                         watermark: str):
+    """
+    관측소 대상에 구독 변수 추가. 새 변수가 생기면 워터마크를 이 구독의 시작점으로 되돌려
+    새 변수도 처음부터 받음 (이미 받은 변수는 저장소의 열 단위 병합으로 보존됨)
+    """
+    spec = json.loads(conn.execute(
+        "SELECT spec FROM sync_targets WHERE id = ?", (target_id,)
+    ).fetchone()[0])
+    have = set(spec.get("variables", []))
+    if set(variables) <= have:
+        return
+    conn.execute(
+        "UPDATE sync_targets SET spec = ?, watermark = MIN(watermark, ?) WHERE id = ?",
+        (json.dumps({"variables": sorted(have | set(variables))}), watermark, target_id),
+    )
+
+
+def _window(source: str, watermark: str) -> Optional[tuple]:
+    """
+    받을 구간 (start, end, 새 워터마크) — YYYYMMDD.
+    AWS · 예보는 오늘 것까지 받되 워터마크는 어제까지만 (오늘 자료는 다음에 다시 받아 병합),
+    ASOS 시간자료는 어제까지만 제공됩니다.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    start = _parse_day(watermark) + timedelta(days=1)
+    end = yesterday if source == "asos" else today
+    end = min(end, start + timedelta(days=SYNC_MAX_DAYS - 1))
+    if start > end:
+        return None
+    return start, end, _day(min(end, yesterday))
+
+
+def _ingest_forecast(data: SpooledZip, config_name: str, variable: str, region: str) -> int:
+    rows = store.ingest_forecast_zip(data.path, config_name, variable, region)
+    if config_name == rollups.NOWCAST_CONFIG:
+        rollups.refresh("forecast", region)
+    else:
+        forecast_views.warm(config_name, variable, region)
+    return rows
+
+
+def _sync_observations(target: dict, start: datetime, end: datetime) -> int:
+    """ASOS / AWS 구간 적재 (블로킹) — 적재 행 수"""
+    s, e = _day(start), _day(end)
+    source, key = target["source"], target["key"]
+    if source == "asos":
+        service_key = os.getenv("SERVICE_KEY", "")
+        if not service_key:
+            raise RuntimeError("SERVICE_KEY가 설정되지 않았습니다.")
+        df = fetch_asos_data(service_key, s, e, key)
+        coverage_keys = [key]
+    else:
+        if not AWS_AUTH_KEY:
+            raise RuntimeError("AWS_AUTH_KEY가 설정되지 않았습니다.")
+        # 관측소의 구독 변수 전체를 한 번에 (이전 형식의 변수별 대상은 그 변수 하나)
+        variables = target["spec"].get("variables") or [target["variable"]]
+        df = fetch_aws_data(AWS_AUTH_KEY, s, e, key, variables)
+        coverage_keys = [f"{key}:{v}" for v in variables]
+    if df.empty:
+        return 0
+    store.write_observations(source, df)
+    days = store.present_days(df)
+    for coverage_key in coverage_keys:
+        store.mark_covered(source, coverage_key, s, e, days=days)
+    for stn in df["station_id"].astype(str).unique():
+        rollups.refresh(source, stn)
+    return len(df)
+
+
+class SyncRunner:
+    """이벤트 루프 안의 동기화 루프 — 틱마다 만기된 대상을 SYNC_BATCH 개까지 하나씩 처리"""
+
+    def __init__(self, subs: SubscriptionStore):
+        self.subs = subs
+        self._task: Optional[asyncio.Task] = None
+        self._kma: Optional[tuple] = None   # (downloader, hdr1, hdr2) — 로그인 재사용
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        # 진행 중인 대상은 임대가 끝나면 (SYNC_LEASE) 다른 워커가 다시 가져감
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                for target in await asyncio.to_thread(self.subs.claim, SYNC_BATCH):
+                    await self.sync_target(target)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"구독 동기화 루프 오류: {e}")
+            await asyncio.sleep(SYNC_TICK)
+
+    async def _kma_session(self) -> tuple:
+        if self._kma is None:
+            if not SYNC_KMA_LOGIN_ID:
+                raise RuntimeError("SYNC_KMA_LOGIN_ID / SYNC_KMA_PASSWORD가 설정되지 않았습니다.")
+            dw = WeatherDownloader()
+            cookie = await asyncio.to_thread(dw.get_cookie, SYNC_KMA_LOGIN_ID, SYNC_KMA_PASSWORD)
+            self._kma = (dw, *dw.make_headers(cookie))
+        return self._kma
+
+    async def _sync_forecast(self, target: dict, start: datetime, end: datetime) -> int:
+        region, variable = target["spec"]["region"], target["spec"]["variable"]
+        dw, hdr1, hdr2 = await self._kma_session()
+        mode = dw.configs[target["config_name"]]["mode"]
+        # range 모드는 [start, end) 이므로 하루 더 (겹치는 날은 저장소에서 병합)
+        intervals = dw.generate_intervals(
+            start, end + timedelta(days=1) if mode == "range" else end, mode
+        )
+        job = scheduler.register(f"sync:{target['id']}", SYNC_CLIENT, weight=SYNC_WEIGHT)
+        job.set_total(len(intervals))
+        rows = 0
+        try:
+            for s, e in intervals:
+                # download 와 같은 차단기 규칙: half-open 이면 시험 요청 하나만 통과
+                probe = await kma_breaker.acquire()
+                recorded = False
+                try:
+                    # 사용자 작업과 같은 KMA 자리를 공정하게 나눠 씀
+                    async with job.slot():
+                        try:
+                            data = await asyncio.to_thread(
+                                dw.fetch_item, target["config_name"], hdr1, hdr2, region, variable, s, e
+                            )
+                        except SessionExpired:
+                            self._kma = None
+                            dw, hdr1, hdr2 = await self._kma_session()
+                            data = await asyncio.to_thread(
+                                dw.fetch_item, target["config_name"], hdr1, hdr2, region, variable, s, e
+                            )
+                        kma_breaker.record_success()
+                        recorded = True
+                        rows += await asyncio.to_thread(
+                            _ingest_forecast, data, target["config_name"], target["variable"], target["key"]
+                        )
+                except (ItemFailed, SessionExpired):
+                    kma_breaker.record_failure()
+                    recorded = True
+                    raise
+                finally:
+                    # 성공/실패를 기록하지 못하고 끝나면 (취소 · 재로그인 오류 등) 시험 요청 자리 반납
+                    if probe and not recorded:
+                        kma_breaker.abandon()
+        finally:
+            scheduler.unregister(f"sync:{target['id']}")
+        return rows
+
+    async def sync_target(self, target: dict):
+        source = target["source"]
+        window = _window(source, target["watermark"])
+        if window is None:
+            SYNC_RUNS.labels(source=source, result="skipped").inc()
+            await asyncio.to_thread(self.subs.finish, target, target["watermark"], 0, True)
+            return
+        start, end, watermark = window
+        if source == "forecast" and kma_breaker.snapshot()["state"] == "open":
+            # KMA 장애 중: 실패로 세지 않고 차단이 풀린 뒤 다시
+            SYNC_RUNS.labels(source=source, result="skipped").inc()
+            await asyncio.to_thread(self.subs.release, target, kma_breaker.retry_after() + SYNC_TICK)
+            return
+        try:
+            if source == "forecast":
+                rows = await self._sync_forecast(target, start, end)
+            else:
+                rows = await asyncio.to_thread(_sync_observations, target, start, end)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"구독 동기화 실패 ({source}/{target['key']}/{target['variable']}): {e}")
+            SYNC_RUNS.labels(source=source, result="error").inc()
+            await asyncio.to_thread(self.subs.fail, target, f"{type(e).__name__}: {e}")
+            return
+        if rows == 0 and source != "forecast":
+            # 빈 응답은 실패와 구분할 수 없으므로 워터마크를 올리지 않음 (store.cached_observations 와 같은 규칙)
+            SYNC_RUNS.labels(source=source, result="empty").inc()
+            await asyncio.to_thread(self.subs.fail, target, "빈 응답 (자료 없음 또는 API 오류)")
+            return
+        SYNC_RUNS.labels(source=source, result="ok").inc()
+        SYNC_ROWS.labels(source=source).inc(rows)
+        # 어제까지 받았으면 다음 주기에, 아직 밀려 있으면 곧 이어서
+        caught_up = watermark >= _day(datetime.now() - timedelta(days=1))
+        await asyncio.to_thread(self.subs.finish, target, watermark, rows, caught_up)
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# 앱 모듈은 평평한 구조(main.py 와 같은 디렉터리)이므로 상위 디렉터리를 import 경로에 추가
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# 저장소 · 작업 기록이 작업 디렉터리에 생기지 않도록 (모듈 import 전에 설정)
+_tmp = tempfile.mkdtemp(prefix="kma-tests-")
+os.environ.setdefault("STORE_DIR", os.path.join(_tmp, "store"))
+os.environ.setdefault("JOBSTORE_PATH", os.path.join(_tmp, "jobs.db"))
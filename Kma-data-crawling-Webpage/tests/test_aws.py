@@ -0,0 +1,45 @@
+import math
+
+import pandas as pd
+
+from aws import parse_fixed_width
+
+SAMPLE = (
+    b"#START7777\n"
+    b"# YYMMDDHHMI STN   TA  TA_HMI\n"
+    b"202401010100  90  -1.5   0012\n"
+    b"202401010100 108 -99.0   0030\n"
+    b"202401010200 108  12.3   0155\n"
+    b"#7777END\n"
+)
+
+
+def test_fixed_width_columns():
+    df = parse_fixed_width(SAMPLE, ["ta", "ta_hmi"])
+    assert list(df.columns) == ["tm", "stn", "ta", "ta_hmi"]
+    assert df["stn"].tolist() == ["90", "108", "108"]
+    assert df["tm"].tolist() == [
+        pd.Timestamp("2024-01-01 01:00"), pd.Timestamp("2024-01-01 01:00"),
+        pd.Timestamp("2024-01-01 02:00"),
+    ]
+    assert df["ta"].iloc[0] == -1.5
+    assert df["ta_hmi"].tolist() == [12.0, 30.0, 155.0]
+
+
+def test_missing_values_become_nan():
+    df = parse_fixed_width(SAMPLE, ["ta", "ta_hmi"])
+    assert math.isnan(df["ta"].iloc[1])
+    assert df["ta"].iloc[2] == 12.3
+
+
+def test_misaligned_rows_fall_back_to_whitespace_split():
+    data = b"202401010100 90 -1.5\n202401010100 108 10.25\n"
+    df = parse_fixed_width(data, ["ta"])
+    assert df["stn"].tolist() == ["90", "108"]
+    assert df["ta"].tolist() == [-1.5, 10.25]
+
+
+def test_comment_only_response_is_empty():
+    df = parse_fixed_width(b"#START7777\n#7777END\n", ["ta"])
+    assert df.empty
+    assert list(df.columns) == ["tm", "stn", "ta"]
@@ -0,0 +1,73 @@
+import asyncio
+import zlib
+
+from compression import CompressionMiddleware
+
+
+def _app(content_type: bytes, chunks, extra_headers=()):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start", "status": 200,
+            "headers": [(b"content-type", content_type), *extra_headers],
+        })
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk,
+                        "more_body": i < len(chunks) - 1})
+    return app
+
+
+def _call(app, accept=b"gzip"):
+    """미들웨어를 직접 호출해 보낸 메시지를 순서대로 수집"""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept)]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    return dict(sent[0]["headers"]), [m["body"] for m in sent[1:]]
+
+
+def test_sse_passes_through_uncompressed():
+    events = [b"data: 1\n\n", b"data: 2\n\n"]
+    headers, bodies = _call(_app(b"text/event-stream", events))
+    assert b"content-encoding" not in headers
+    assert bodies == events
+
+
+def test_no_cache_passes_through():
+    body = [b"x" * 4096]
+    headers, bodies = _call(_app(b"application/json", body, [(b"cache-control", b"no-cache")]))
+    assert b"content-encoding" not in headers
+    assert bodies == body
+
+
+def test_small_response_is_not_compressed():
+    headers, bodies = _call(_app(b"application/json", [b'{"ok": true}']))
+    assert b"content-encoding" not in headers
+    assert bodies == [b'{"ok": true}']
+
+
+def test_streaming_messages_decompress_as_they_arrive():
+    # 작은 줄도 기다리지 않고 압축 → 메시지마다 지금까지 보낸 줄을 모두 풀 수 있어야 함
+    lines = [b'{"progress": %d}\n' % i for i in range(3)]
+    headers, bodies = _call(_app(b"application/x-ndjson", lines))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+
+    d = zlib.decompressobj(31)
+    for i, body in enumerate(bodies):
+        assert d.decompress(body) == lines[i]
+    assert d.eof
+
+
+def test_large_body_compressed_with_weak_etag():
+    body = b"a,b,c\n" * 1000
+    headers, bodies = _call(_app(b"text/csv", [body], [(b"etag", b'"abc"')]))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"etag"] == b'W/"abc"'
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert zlib.decompress(b"".join(bodies), 31) == body
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from fileserve import serve_file
+
+CONTENT = bytes(range(256)) * 40  # 10240 바이트
+
+
+@pytest.fixture
+def app(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    def get_file(request: Request):
+        return serve_file(request, str(path), "data.csv", "text/csv")
+
+    return app
+
+
+def _get(app, **headers):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/file", headers=headers)
+    return asyncio.run(run())
+
+
+def test_full_response_has_validators(app):
+    r = _get(app)
+    assert r.status_code == 200
+    assert r.content == CONTENT
+    assert r.headers["accept-ranges"] == "bytes"
+    assert r.headers["etag"].startswith('"')
+
+
+def test_range(app):
+    r = _get(app, range="bytes=100-199")
+    assert r.status_code == 206
+    assert r.content == CONTENT[100:200]
+    assert r.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+
+def test_suffix_and_open_ranges(app):
+    r = _get(app, range="bytes=-10")
+    assert r.status_code == 206
+    assert r.content == CONTENT[-10:]
+    r = _get(app, range=f"bytes={len(CONTENT) - 5}-")
+    assert r.content == CONTENT[-5:]
+
+
+def test_unsatisfiable_range(app):
+    r = _get(app, range=f"bytes={len(CONTENT)}-")
+    assert r.status_code == 416
+    assert r.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_none_match(app):
+    etag = _get(app).headers["etag"]
+    assert _get(app, **{"if-none-match": etag}).status_code == 304
+    assert _get(app, **{"if-none-match": '"other"'}).status_code == 200
+
+
+def test_if_range_mismatch_sends_full_file(app):
+    etag = _get(app).headers["etag"]
+    r = _get(app, range="bytes=0-9", **{"if-range": etag})
+    assert r.status_code == 206
+    r = _get(app, range="bytes=0-9", **{"if-range": '"stale"'})
+    assert r.status_code == 200
+    assert r.content == CONTENT
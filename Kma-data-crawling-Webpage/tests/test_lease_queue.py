@@ -0,0 +1,79 @@
+import glob
+import importlib.util
+import os
+
+import pytest
+
+from conftest import APP_DIR
+
+
+@pytest.fixture(scope="module")
+def integrate():
+    # 한글 디렉터리(기상예보/동네예보)의 독립 스크립트 → 경로로 불러옴
+    path, = glob.glob(os.path.join(APP_DIR, "*", "*", "integrate.py"))
+    spec = importlib.util.spec_from_file_location("integrate", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _status(queue):
+    return dict(queue.conn.execute("SELECT region_key, status FROM work"))
+
+
+def test_claim_hands_each_unit_to_one_worker(integrate, tmp_path):
+    path = str(tmp_path / "queue.db")
+    a = integrate.LeaseQueue(path, "a")
+    b = integrate.LeaseQueue(path, "b")
+    a.populate([(0, "r1"), (0, "r2")])
+
+    seq_a, _, key_a = a.claim()
+    seq_b, _, key_b = b.claim()
+    assert {key_a, key_b} == {"r1", "r2"}
+    assert a.claim() is None
+
+    a.complete(seq_a)
+    # 다른 워커의 단위는 완료 처리할 수 없음
+    a.complete(seq_b)
+    assert _status(a) == {key_a: "done", key_b: "leased"}
+
+
+def test_expired_lease_is_reclaimed(integrate, tmp_path):
+    path = str(tmp_path / "queue.db")
+    a = integrate.LeaseQueue(path, "a", lease_seconds=-1)
+    b = integrate.LeaseQueue(path, "b")
+    a.populate([(0, "r1")])
+    a.claim()
+    seq, _, key = b.claim()
+    assert key == "r1"
+    b.complete(seq)
+    assert _status(b) == {"r1": "done"}
+
+
+def test_populate_never_resets_finished_units(integrate, tmp_path):
+    path = str(tmp_path / "queue.db")
+    a = integrate.LeaseQueue(path, "a", max_attempts=1)
+    a.populate([(0, "done"), (0, "failed")])
+    seq_done, _, _ = a.claim()
+    a.complete(seq_done)
+    seq_failed, _, _ = a.claim()
+    a.release(seq_failed)
+    assert _status(a) == {"done": "done", "failed": "failed"}
+
+    # 새 워커(로컬 매니페스트가 비어 있음)가 같은 단위를 다시 넣어도 상태 · 시도 횟수 유지
+    fresh = integrate.LeaseQueue(path, "fresh")
+    fresh.populate([(0, "done"), (0, "failed"), (0, "new")])
+    assert _status(fresh) == {"done": "done", "failed": "failed", "new": "todo"}
+    assert fresh.claim()[2] == "new"
+    assert fresh.claim() is None
+
+
+def test_release_requeues_until_max_attempts(integrate, tmp_path):
+    a = integrate.LeaseQueue(str(tmp_path / "queue.db"), "a", max_attempts=2)
+    a.populate([(0, "r1")])
+    seq, _, _ = a.claim()
+    a.release(seq)
+    assert _status(a) == {"r1": "todo"}
+    seq, _, _ = a.claim()
+    a.release(seq)
+    assert _status(a) == {"r1": "failed"}
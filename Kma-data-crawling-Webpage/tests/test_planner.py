@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+import planner
+from weather_downloader import DownloadConfig, FORECAST_CONFIGS, generate_intervals, interval_days
+
+REGIONS = [{"code": f"r{i}", "level3": f"동{i}"} for i in range(3)]
+VARIABLES = [{"code": "TMP", "name": "기온"}, {"code": "REH", "name": "습도"}]
+
+
+def _config(config_name="단기예보", start=datetime(2024, 1, 15), end=datetime(2024, 5, 3)):
+    return DownloadConfig(
+        login_id="", password="", regions=REGIONS, config_name=config_name,
+        variables=VARIABLES, start_date=start, end_date=end,
+    )
+
+
+@pytest.mark.parametrize("config_name", ["단기예보", "초단기실황"])
+def test_counts_match_expanded_items(config_name):
+    config = _config(config_name)
+    items = list(planner.expand(config))
+    result = planner.plan(config, {})
+
+    assert result["items"] == len(items)
+    assert result["requests"] == 1 + len(items) * planner.REQUESTS_PER_ITEM
+    assert result["preview"][0] == {
+        "region": "r0", "level3": "동0", "from": items[0][1], "to": items[0][2], "variable": "TMP",
+    }
+    # 이력이 없으면 기본 바이트/일 × (항목별 구간 일수 합)
+    days = sum(interval_days(s, e) for _, s, e, _ in items)
+    assert result["expected_bytes"] == int(planner.DEFAULT_BYTES_PER_DAY * days)
+
+
+def test_expand_follows_downloader_order():
+    config = _config()
+    intervals = generate_intervals(config.start_date, config.end_date,
+                                   FORECAST_CONFIGS[config.config_name]["mode"])
+    items = list(planner.expand(config))
+    assert items[:len(VARIABLES)] == [(REGIONS[0], *intervals[0], v) for v in VARIABLES]
+    assert items[-1] == (REGIONS[-1], *intervals[-1], VARIABLES[-1])
+
+
+def test_history_overrides_defaults():
+    config = _config()
+    stats = {("단기예보", "TMP"): {"seconds": 2.0, "bytes_per_day": 100.0, "samples": 5}}
+    result = planner.plan(config, stats)
+    tmp = next(v for v in result["variables"] if v["code"] == "TMP")
+    assert tmp["history_samples"] == 5
+    assert tmp["expected_bytes"] == int(100.0 * sum(
+        interval_days(s, e) for _, s, e, v in planner.expand(config) if v["code"] == "TMP"
+    ))
+
+
+def test_guard_flags_large_jobs(monkeypatch):
+    config = _config()
+    n = planner.plan(config, {})["items"]
+    assert not planner.plan(config, {})["guard"]["exceeded"]
+
+    monkeypatch.setattr(planner, "PLAN_MAX_ITEMS", n - 1)
+    guard = planner.plan(config, {})["guard"]
+    assert guard["exceeded"]
+    assert len(guard["reasons"]) == 1
+
+    monkeypatch.setattr(planner, "PLAN_GUARD", "off")
+    assert not planner.plan(config, {})["guard"]["exceeded"]
+
+
+def test_invalid_configs_raise():
+    with pytest.raises(ValueError):
+        planner.plan(_config("없는예보"), {})
+    with pytest.raises(ValueError):
+        planner.plan(_config(start=datetime(2024, 2, 1), end=datetime(2024, 1, 1)), {})
@@ -0,0 +1,98 @@
+import asyncio
+
+from resilience import CircuitBreaker, backoff_delays
+
+
+def _opened(threshold=2):
+    br = CircuitBreaker("test", threshold=threshold, cooldown=0.0, max_cooldown=1.0)
+    for _ in range(threshold):
+        br.record_failure()
+    assert br.state == "open"
+    return br
+
+
+def test_closed_breaker_never_hands_out_a_probe():
+    br = CircuitBreaker("test", threshold=3, cooldown=0.0)
+    assert asyncio.run(br.acquire()) is False
+    br.record_failure()
+    br.record_failure()
+    assert br.state == "closed"
+    br.record_success()
+    assert br.failures == 0
+
+
+def test_half_open_allows_a_single_probe():
+    async def run():
+        br = _opened()
+        assert await br.acquire() is True
+        assert br.state == "half_open"
+        # 시험 요청이 끝나기 전에는 다른 요청이 대기
+        waiter = asyncio.create_task(br.acquire())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        br.record_success()
+        assert br.state == "closed"
+        assert await asyncio.wait_for(waiter, 1) is False
+    asyncio.run(run())
+
+
+def test_probe_failure_reopens_with_longer_cooldown():
+    br = _opened()
+    br.base_cooldown = br.cooldown = 0.1
+    br.opened_at = 0.0
+    assert asyncio.run(br.acquire()) is True
+    br.record_failure()
+    assert br.state == "open"
+    assert br.cooldown == 0.2
+    assert br.retry_after() > 0
+
+
+def test_abandoned_probe_is_handed_to_the_next_caller():
+    async def run():
+        br = _opened()
+        assert await br.acquire() is True
+        br.abandon()
+        assert await asyncio.wait_for(br.acquire(), 1) is True
+    asyncio.run(run())
+
+
+def test_backoff_delays_are_bounded():
+    delays = list(backoff_delays(attempts=4, base=1.0))
+    assert len(delays) == 3
+    assert all(d >= 0 for d in delays)
+
+
+def test_download_releases_probe_on_unexpected_error(tmp_path, monkeypatch):
+    """압축 해제 중 OSError 처럼 성공/실패로 집계되지 않는 예외에도 시험 요청 자리를 반납"""
+    import zipfile
+    from datetime import datetime
+
+    import pytest
+    import weather_downloader as wd
+
+    br = _opened()
+    monkeypatch.setattr(wd, "kma_breaker", br)
+    monkeypatch.chdir(tmp_path)
+
+    def fake_fetch(self, *args):
+        spool = wd.SpooledZip()
+        with zipfile.ZipFile(spool.path, "w"):
+            pass
+        return spool
+
+    def broken_extract(self, *args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(wd.WeatherDownloader, "get_cookie", lambda self, i, p: "c")
+    monkeypatch.setattr(wd.WeatherDownloader, "_fetch_zip", fake_fetch)
+    monkeypatch.setattr(wd.WeatherDownloader, "_extract_zip", broken_extract)
+    cfg = wd.DownloadConfig(
+        login_id="", password="",
+        regions=[{"level1": "a", "level2": "b", "level3": "c", "code": "1"}],
+        config_name="초단기실황", variables=[{"name": "기온", "code": "T1H"}],
+        start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 2),
+    )
+    with pytest.raises(OSError):
+        asyncio.run(wd.WeatherDownloader().download(cfg, lambda *a: None, lambda p: None, "client"))
+    assert br.state == "half_open"
+    assert br._probe_busy is False
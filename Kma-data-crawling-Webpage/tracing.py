@@ -0,0 +1,107 @@
+# tracing.py
+
+import os
+import time
+import random
+import threading
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+# --- 설정값 (환경변수 우선) ---
+# 요청 시 trace 를 켜지 않은 작업도 이 비율만큼은 표본 기록
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+# 작업당 보관 이벤트 수 (링 버퍼 — 넘치면 오래된 것부터 버림)
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", "20000"))
+# 메모리에 유지할 trace 개수
+TRACE_MAX_JOBS = int(os.getenv("TRACE_MAX_JOBS", "50"))
+
+
+class JobTrace:
+    """
+    작업 하나의 span 타임라인.
+    Chrome trace-event 포맷("ph": "X" complete event)으로 내보낼 수 있습니다.
+    """
+    enabled = True
+
+    def __init__(self, job_id: str, max_events: int = TRACE_MAX_EVENTS):
+        self.job_id = job_id
+        self.events = deque(maxlen=max_events)
+        self.recorded = 0
+        self._t0 = time.perf_counter()
+        self._wall0 = time.time()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "kma", **args):
+        """
+        with trace.span("zip_download", item=...) as sp:
+            sp["bytes"] = n
+        예외가 나면 outcome=error 로 기록 후 그대로 전파합니다.
+        """
+        start = time.perf_counter()
+        args.setdefault("outcome", "ok")
+        try:
+            yield args
+        except BaseException as e:
+            args["outcome"] = "error"
+            args["error"] = str(e)[:200]
+            raise
+        finally:
+            end = time.perf_counter()
+            # deque.append 는 스레드 안전 → 별도 락 불필요
+            self.events.append({
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": int((start - self._t0) * 1e6),
+                "dur": int((end - start) * 1e6),
+                "pid": 1,
+                "tid": threading.get_ident(),
+                "args": args,
+            })
+            self.recorded += 1
+
+    def to_chrome(self) -> dict:
+        return {
+            "traceEvents": list(self.events),
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "job_id": self.job_id,
+                "started_at": self._wall0,
+                "recorded": self.recorded,
+                "dropped": self.recorded - len(self.events),
+            },
+        }
+
+
+class _NullTrace:
+    """trace 비활성 작업용 — span 이 아무것도 기록하지 않음"""
+    enabled = False
+
+    @contextmanager
+    def span(self, name: str, cat: str = "kma", **args):
+        yield args
+
+
+NULL_TRACE = _NullTrace()
+
+# 작업 ID → JobTrace (오래된 것부터 제거)
+_traces: "OrderedDict[str, JobTrace]" = OrderedDict()
+_traces_lock = threading.Lock()
+
+
+def start_trace(job_id: str, requested: bool = False):
+    """requested 이거나 표본에 뽑히면 JobTrace, 아니면 NULL_TRACE 반환"""
+    if not requested and random.random() >= TRACE_SAMPLE_RATE:
+        return NULL_TRACE
+    tr = JobTrace(job_id)
+    with _traces_lock:
+        _traces[job_id] = tr
+        while len(_traces) > TRACE_MAX_JOBS:
+            _traces.popitem(last=False)
+    return tr
+
+
+def get_trace(job_id: str) -> Optional[JobTrace]:
+    with _traces_lock:
+        return _traces.get(job_id)
@@ -0,0 +1,193 @@
+# transport.py
+
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+
+# 업스트림 HTTP 공용 계층: 모든 클라이언트(ASOS · AWS · KMA 다운로드 · 관측소 좌표)가
+# 같은 호스트별 연결 풀을 공유하므로 keep-alive 연결이 재사용되어
+# 요청마다 TCP/TLS 연결을 새로 맺지 않습니다.
+
+# 호스트별 연결 풀 크기 (동시 요청 수 이상) — HTTP_POOL_SIZES="https://host:16,..." 로 덮어쓰기
+POOL_SIZES: Dict[str, int] = {
+    "http://apis.data.go.kr": 8,
+    "https://apihub.kma.go.kr": 16,
+    "https://data.kma.go.kr": 8,
+}
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_DEFAULT_POOL_SIZE", "4"))
+
+# (연결, 읽기) 타임아웃 — 호출부에서 timeout 을 주지 않으면 이 값
+DEFAULT_TIMEOUT: Tuple[float, float] = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+)
+# 준비된 자료를 ZIP 으로 받는 data.kma.go.kr 은 응답이 오래 걸림
+HOST_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "https://data.kma.go.kr": (10.0, 120.0),
+}
+
+# 이 계층의 연결에만 쓰는 DNS 조회 결과 캐시 (초, 0 이면 사용 안 함) — 새 연결마다 조회하지 않도록
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "300"))
+
+
+def _parse_pool_sizes(spec: str) -> Dict[str, int]:
+    out = {}
+    for part in spec.split(","):
+        prefix, _, size = part.strip().rpartition(":")
+        if prefix and size.isdigit():
+            out[prefix] = int(size)
+    return out
+
+
+POOL_SIZES.update(_parse_pool_sizes(os.getenv("HTTP_POOL_SIZES", "")))
+
+
+# 1) DNS 캐시 (이 계층의 연결 풀에만 적용 — socket.getaddrinfo 는 건드리지 않음)
+_dns_cache: Dict[tuple, tuple] = {}
+_dns_lock = threading.Lock()
+
+
+def _resolve(host: str, port: int) -> str:
+    """
+    host → 캐시된 주소 하나. 조회에 실패하면 만료된 주소라도 쓰고(stale),
+    그것도 없으면 host 를 그대로 돌려줘 urllib3 가 평소처럼 조회 · 오류 처리하게 둡니다.
+    """
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_lock:
+        hit = _dns_cache.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    try:
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    except OSError:
+        return hit[1] if hit is not None else host
+    addr = infos[0][4][0]
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, addr)
+    return addr
+
+
+def _forget(host: str, port: int):
+    """연결 실패 → 다음 연결은 다시 조회 (바뀐 주소 · 죽은 주소를 TTL 동안 붙잡지 않도록)"""
+    with _dns_lock:
+        _dns_cache.pop((host, port), None)
+
+
+def clear_dns_cache():
+    with _dns_lock:
+        _dns_cache.clear()
+
+
+class _CachedDNSMixin:
+    """새 연결을 맺을 때만 캐시된 주소로 접속 (TLS SNI · 인증서 검증은 원래 host 기준)"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        self._dns_host = _resolve(host, self.port)
+        try:
+            return super()._new_conn()
+        except Exception:
+            _forget(host, self.port)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class _CachedDNSHTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class _CachedDNSHTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class _CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDNSHTTPConnection
+
+
+class _CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDNSHTTPSConnection
+
+
+# 2) 연결 풀 + 기본 타임아웃
+class TimeoutAdapter(HTTPAdapter):
+    """timeout 을 주지 않은 요청에 호스트별 기본 타임아웃 적용 (+ DNS 캐시 연결 풀)"""
+
+    def __init__(self, timeout: Tuple[float, float], pool_size: int):
+        self.timeout = timeout
+        super().__init__(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        if DNS_CACHE_TTL > 0:
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": _CachedDNSHTTPConnectionPool,
+                "https": _CachedDNSHTTPSConnectionPool,
+            }
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=timeout or self.timeout, **kwargs)
+
+
+_adapters: Dict[str, TimeoutAdapter] = {}
+_shared: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+# gzip/deflate + 설치돼 있으면 br(brotli) · zstd(zstandard) — urllib3 가 응답을 풀어줌
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+
+def _get_adapters() -> Dict[str, TimeoutAdapter]:
+    if not _adapters:
+        for prefix, size in POOL_SIZES.items():
+            _adapters[prefix] = TimeoutAdapter(HOST_TIMEOUTS.get(prefix, DEFAULT_TIMEOUT), size)
+        for scheme in ("http://", "https://"):
+            _adapters[scheme] = TimeoutAdapter(DEFAULT_TIMEOUT, DEFAULT_POOL_SIZE)
+    return _adapters
+
+
+def new_session() -> requests.Session:
+    """
+    쿠키(로그인 상태)는 따로, 연결 풀은 공유하는 세션.
+    KMA 로그인처럼 사용자별 쿠키가 필요한 클라이언트용입니다.
+    """
+    s = requests.Session()
+    s.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    with _lock:
+        adapters = _get_adapters()
+    # requests 는 가장 긴 접두어의 어댑터를 고르므로 호스트별 풀이 먼저 적용됨
+    for prefix, adapter in adapters.items():
+        s.mount(prefix, adapter)
+    return s
+
+
+def session() -> requests.Session:
+    """상태(쿠키)가 없는 API 호출용 공유 세션 (ASOS · AWS · stn_inf)"""
+    global _shared
+    with _lock:
+        if _shared is not None:
+            return _shared
+    s = new_session()
+    with _lock:
+        if _shared is None:
+            _shared = s
+        return _shared
+
+
+def close():
+    """프로세스 종료 시 열린 연결 정리"""
+    global _shared
+    with _lock:
+        for adapter in _adapters.values():
+            adapter.close()
+        _adapters.clear()
+        _shared = None
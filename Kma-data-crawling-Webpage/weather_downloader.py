@@ -4,15 +4,155 @@ import requests
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import pandas as pd
+import pyarrow as pa
 import asyncio
+import contextlib
 import time
 from dataclasses import dataclass
-from typing import List, Dict, Callable, Optional
+from typing import List, Dict, Callable, Optional, Awaitable, Iterator
 import logging
 import io
+import tempfile
+import weakref
+
+from metrics import (
+    observe_stage, BYTES_TRANSFERRED, EMPTY_ZIPS, COALESCED_REQUESTS, RETRIES, DEAD_LETTERS
+)
+from resilience import kma_breaker, backoff_delays
+from tracing import NULL_TRACE
+from parsing import parse_forecast_csv
+import storage
+import store
+import transport
+import rollups
+import forecast_views
 
 logger = logging.getLogger(__name__)
 
+ZIP_URL = "https://data.kma.go.kr/data/rmt/downloadZip.do"
+# downloadZip 응답을 메모리 대신 받아 두는 디렉터리 (비우면 시스템 임시 디렉터리)
+ZIP_SPOOL_DIR = os.getenv("ZIP_SPOOL_DIR") or None
+
+
+class ItemFailed(Exception):
+    """항목 하나의 다운로드 실패 (재시도 대상)"""
+
+
+class SessionExpired(ItemFailed):
+    """로그인 세션 만료 — 다시 로그인한 뒤 재시도"""
+
+
+def _logged_out(resp) -> bool:
+    """로그인 페이지로 돌려보내진 응답인지 (세션 만료 시 200 + HTML 로그인 화면)"""
+    if "login" in resp.url.lower():
+        return True
+    if "text/html" in resp.headers.get("Content-Type", ""):
+        head = resp.content[:4096]
+        return b"loginForm" in head or "로그인".encode("utf-8") in head
+    return False
+
+
+def interval_days(start: str, end: str) -> int:
+    """요청 구간 일수 (YYYYMM 월 단위 / YYYYMMDD 일 단위)"""
+    if len(start) == 6:
+        first = datetime.strptime(start, "%Y%m")
+        return ((first + relativedelta(months=1)) - first).days
+    return max((datetime.strptime(end, "%Y%m%d") - datetime.strptime(start, "%Y%m%d")).days, 1)
+
+
+def _validate_zip(path: str):
+    """
+    ZIP 이 열리고 각 파일이 KMA CSV(쉼표 구분 헤더)인지 확인.
+    빈 ZIP 은 해당 기간에 자료가 없다는 정상 응답이므로 실패로 보지 않음 (압축 해제 단계에서 집계)
+    """
+    try:
+        z = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        with open(path, "rb") as f:
+            head = f.read(4096)
+        if b"<html" in head.lower() and (b"login" in head.lower() or "로그인".encode("utf-8") in head):
+            raise SessionExpired("downloadZip: 로그인 페이지 응답")
+        raise ItemFailed("ZIP 형식이 아닌 응답")
+    with z:
+        for info in z.infolist():
+            with z.open(info) as f:
+                head = f.read(4096).decode("euc-kr", errors="replace")
+            lines = [ln for ln in head.splitlines() if ln.strip()]
+            if not lines or "," not in lines[0]:
+                raise ItemFailed(f"CSV 형식 아님: {info.filename}")
+
+
+def _unlink(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class SpooledZip:
+    """
+    디스크에 받아 둔 downloadZip 응답.
+    합류한 작업들은 같은 파일을 각자 열어 읽고, 마지막 참조가 사라지면 파일이 지워집니다.
+    """
+
+    def __init__(self):
+        f = tempfile.NamedTemporaryFile(dir=ZIP_SPOOL_DIR, prefix="kma-", suffix=".zip", delete=False)
+        f.close()
+        self.path = f.name
+        self.size = 0
+        self._finalizer = weakref.finalize(self, _unlink, self.path)
+
+    def open(self) -> zipfile.ZipFile:
+        return zipfile.ZipFile(self.path)
+
+    def discard(self):
+        self._finalizer()
+
+
+class SingleFlight:
+    """
+    동일 키의 진행 중 요청을 하나로 합칩니다 (이벤트 루프 단위).
+    첫 호출자(leader)만 실제로 실행하고, 나머지는 같은 결과를 기다립니다.
+    성공한 결과만 공유합니다. leader 가 실패하면(세션 만료 등 leader 자신의 사정일 수 있음)
+    대기자는 그 예외를 물려받지 않고 각자 다시 시도합니다.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    async def do(self, key: tuple, fn: Callable[[], Awaitable]):
+        """(결과, 공유여부) 반환"""
+        while key in self._inflight:
+            fut = self._inflight[key]
+            try:
+                result = await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                # leader 가 실패 · 취소된 경우 → 다시 시도 (내가 leader 가 될 수 있음)
+                if fut.cancelled():
+                    continue
+                raise
+            COALESCED_REQUESTS.inc()
+            return result, True
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except BaseException:
+            fut.cancel()
+            raise
+        else:
+            if result is None:
+                # leader 작업이 취소되어 중단된 결과 → 대기자는 각자 다시 받음
+                fut.cancel()
+            else:
+                fut.set_result(result)
+            return result, False
+        finally:
+            del self._inflight[key]
+
+
+# 프로세스 전역: 모든 작업이 공유
+inflight = SingleFlight()
+
 @dataclass
 class DownloadConfig:
     login_id: str
@@ -23,41 +163,69 @@ class DownloadConfig:
     start_date: datetime
     end_date: datetime
 
+# 예보 유형별 요청 설정 (인스턴스 · 세션 없이 참조할 수 있도록 모듈 상수)
+FORECAST_CONFIGS = {
+    "단기예보": {
+        "code": "424",
+        "api": "request420",
+        "mode": "range",
+        "reqst_purpose_cd": "F00415",
+        "request_url": "https://data.kma.go.kr/mypage/rmt/callDtaReqstIrods4xxNewAjax.do",
+        "selectType": "1",
+    },
+    "초단기실황": {
+        "code": "400",
+        "api": "request400",
+        "mode": "monthly",
+        "reqst_purpose_cd": "F00401",
+        "request_url": "https://data.kma.go.kr/mypage/rmt/callDtaReqstIrods4xxAjax.do",
+        "selectType": "1",
+    },
+    "초단기예보": {
+        "code": "411",
+        "api": "request410",
+        "mode": "range",
+        "reqst_purpose_cd": "F00415",
+        "request_url": "https://data.kma.go.kr/mypage/rmt/callDtaReqstIrods4xxNewAjax.do",
+        "selectType": "1",
+    }
+}
+
+
+def generate_intervals(start: datetime, end: datetime, mode: str) -> List[tuple]:
+    """날짜 구간 생성 (monthly: 달마다 (YYYYMM, YYYYMM), range: 최대 한 달씩 (YYYYMMDD, YYYYMMDD))"""
+    intervals = []
+    if mode == "monthly":
+        current = start.replace(day=1)
+        while current <= end:
+            intervals.append((current.strftime("%Y%m"), current.strftime("%Y%m")))
+            current += relativedelta(months=1)
+    else:  # range mode
+        current = start
+        while current < end:
+            next_date = current + relativedelta(months=1)
+            if next_date > end:
+                next_date = end
+            intervals.append((current.strftime("%Y%m%d"), next_date.strftime("%Y%m%d")))
+            current = next_date
+    return intervals
+
+
 class WeatherDownloader:
-    def __init__(self):
-        self.session = requests.Session()
-        self.configs = {
-            "단기예보": {
-                "code": "424",
-                "api": "request420",
-                "mode": "range",
-                "reqst_purpose_cd": "F00415",
-                "request_url": "https://data.kma.go.kr/mypage/rmt/callDtaReqstIrods4xxNewAjax.do",
-                "selectType": "1",
-            },
-            "초단기실황": {
-                "code": "400",
-                "api": "request400",
-                "mode": "monthly",
-                "reqst_purpose_cd": "F00401",
-                "request_url": "https://data.kma.go.kr/mypage/rmt/callDtaReqstIrods4xxAjax.do",
-                "selectType": "1",
-            },
-            "초단기예보": {
-                "code": "411",
-                "api": "request410",
-                "mode": "range",
-                "reqst_purpose_cd": "F00415",
-                "request_url": "https://data.kma.go.kr/mypage/rmt/callDtaReqstIrods4xxNewAjax.do",
-                "selectType": "1",
-            }
-        }
+    def __init__(self, trace=NULL_TRACE, job=None, control=None):
+        # 로그인 쿠키는 인스턴스별, 연결 풀은 모든 다운로더가 공유
+        self.session = transport.new_session()
+        self.trace = trace      # tracing.JobTrace (기본: 기록 안 함)
+        self.job = job          # scheduler.Job (없으면 항목 배정 없이 바로 실행)
+        self.control = control  # scheduler.JobControl (취소/일시정지/재개)
+        self.configs = FORECAST_CONFIGS
     
     def get_cookie(self, login_id: str, password: str) -> str:
         logger.info("기상청 로그인 중...")
         url = "https://data.kma.go.kr/login/loginAjax.do"
-        resp = self.session.post(url, data={"loginId": login_id, "passwordNo": password})
-        resp.raise_for_status()
+        with observe_stage("login"):
+            resp = self.session.post(url, data={"loginId": login_id, "passwordNo": password})
+            resp.raise_for_status()
         time.sleep(2)
         return "; ".join(f"{k}={v}" for k,v in self.session.cookies.get_dict().items())
     
@@ -103,21 +271,7 @@ class WeatherDownloader:
     
     def generate_intervals(self, start: datetime, end: datetime, mode: str):
         """날짜 구간 생성"""
-        intervals = []
-        if mode == "monthly":
-            current = start.replace(day=1)
-            while current <= end:
-                intervals.append((current.strftime("%Y%m"), current.strftime("%Y%m")))
-                current += relativedelta(months=1)
-        else:  # range mode
-            current = start
-            while current < end:
-                next_date = current + relativedelta(months=1)
-                if next_date > end:
-                    next_date = end
-                intervals.append((current.strftime("%Y%m%d"), next_date.strftime("%Y%m%d")))
-                current = next_date
-        return intervals
+        return generate_intervals(start, end, mode)
     
     def generate_request_body(self,
                               var_name: str,
@@ -154,16 +308,141 @@ class WeatherDownloader:
             "req_list": f"{start}|{end}|{config['code']}|{var_code}|{region_code}",
         }
     
+    def _fetch_zip(self, cfg: Dict, hdr1: Dict, hdr2: Dict,
+                   req_body: Dict, download_payload: Dict, item: str) -> Optional[SpooledZip]:
+        """
+        준비 POST + downloadZip 한 쌍 (블로킹). 응답은 메모리에 모으지 않고 디스크로 받음.
+        실패는 ItemFailed / SessionExpired 로 올리고, 작업 취소로 끊긴 경우만 None
+        """
+        trace = self.trace
+        try:
+            with trace.span("prepare", item=item) as sp, observe_stage("prepare"):
+                resp = self.session.post(
+                    cfg["request_url"], headers=hdr1, data=req_body
+                )
+                sp["status"] = resp.status_code
+                if _logged_out(resp):
+                    raise SessionExpired("prepare: 로그인 세션 만료")
+                if resp.status_code != 200:
+                    raise ItemFailed(f"prepare HTTP {resp.status_code}")
+
+            with trace.span("zip_download", item=item) as sp, observe_stage("zip_download"):
+                resp = self.session.post(
+                    ZIP_URL, headers=hdr2, data=download_payload, stream=True
+                )
+                sp["status"] = resp.status_code
+                if resp.status_code != 200:
+                    sp["outcome"] = "http_error"
+                    raise ItemFailed(f"downloadZip HTTP {resp.status_code}")
+                spool = SpooledZip()
+                try:
+                    with open(spool.path, "wb") as f:
+                        for chunk in resp.iter_content(65536):
+                            if self.control is not None and self.control.abort.is_set():
+                                # 작업 취소 → 전송 중단 (결과는 버려짐)
+                                resp.close()
+                                sp["outcome"] = "aborted"
+                                spool.discard()
+                                return None
+                            f.write(chunk)
+                            spool.size += len(chunk)
+                    BYTES_TRANSFERRED.labels(source="kma").inc(spool.size)
+                    sp["bytes"] = spool.size
+                    _validate_zip(spool.path)
+                except BaseException:
+                    spool.discard()
+                    raise
+        except requests.RequestException as e:
+            raise ItemFailed(f"{type(e).__name__}: {e}")
+        return spool
+
+    def _extract_zip(self, data: SpooledZip, var_dir: str,
+                     file_callback: Callable[[str], None], item: str) -> int:
+        """받아 둔 ZIP 을 var_dir 에 풀고 파일 수 반환"""
+        os.makedirs(var_dir, exist_ok=True)
+        with self.trace.span("extract", item=item) as sp, \
+                observe_stage("extract"), data.open() as z:
+            infos = z.infolist()
+            if not infos:
+                EMPTY_ZIPS.inc()
+                sp["outcome"] = "empty_zip"
+            written = 0
+            for info in infos:
+                try:
+                    fn = info.filename.encode("cp437").decode("euc-kr")
+                except:
+                    fn = info.filename
+                raw = z.read(info.filename)
+                # STORE_COMPRESSION=zstd 이면 <fn>.zst 로 저장됨
+                tgt = storage.write_bytes(os.path.join(var_dir, fn), raw)
+                written += len(raw)
+                file_callback(tgt)
+            sp["bytes"] = written
+            sp["files"] = len(infos)
+        return len(infos)
+
+    def fetch_item(self, config_name: str, hdr1: Dict, hdr2: Dict,
+                   region: Dict, variable: Dict, start: str, end: str) -> SpooledZip:
+        """
+        항목 하나의 ZIP (블로킹) — 다운로드 작업 밖에서 쓰는 구독 동기화용.
+        실패는 ItemFailed / SessionExpired 로 올림
+        """
+        cfg = self.configs[config_name]
+        body = self.generate_request_body(
+            variable["name"], variable["code"], start, end, region["level3"], region["code"], cfg
+        )
+        item = f"{region['level3']} - {variable['name']} ({start}~{end})"
+        data = self._fetch_zip(
+            cfg, hdr1, hdr2, body,
+            {"downFile": f"{region['level3']}_{variable['name']}_{start}_{end}.csv"}, item
+        )
+        if data is None:
+            raise ItemFailed(f"ZIP 다운로드 중단: {item}")
+        return data
+
+    def _dead_letter(self, callback, item: str, item_key: tuple, reason: str, attempts: int):
+        """재시도를 모두 소진한 항목 — 작업 상태의 실패 목록으로 (재큐잉 가능)"""
+        DEAD_LETTERS.inc()
+        logger.error(f"항목 최종 실패 ({item}): {reason}")
+        if callback:
+            callback({
+                "item": item,
+                "key": list(item_key),
+                "reason": reason,
+                "attempts": attempts,
+                "failed_at": datetime.now().isoformat(timespec="seconds"),
+            })
+
+    def _ingest(self, data: SpooledZip, config_name: str, var_code: str, region_code: str):
+        """저장소 적재 실패는 다운로드 자체를 실패시키지 않음"""
+        try:
+            store.ingest_forecast_zip(data.path, config_name, var_code, region_code)
+            if config_name == rollups.NOWCAST_CONFIG:
+                rollups.refresh("forecast", region_code)
+            elif forecast_views.VIEW_WARM_ON_INGEST:
+                # 예보(실황 제외)는 latest / lead 뷰 인덱스를 미리 만들어 첫 조회가 기다리지 않도록
+                forecast_views.warm(config_name, var_code, region_code)
+        except Exception as e:
+            logger.warning(f"저장소 적재 실패 ({config_name}/{var_code}/{region_code}): {e}")
+
     async def download(
         self,
         config: DownloadConfig,
         progress_callback: Callable[[int,int,str], None],
         file_callback: Callable[[str], None],
-        client_id: str):               # ★ 추가
+        client_id: str,               # ★ 추가
+        dead_letter_callback: Optional[Callable[[Dict], None]] = None,
+        item_callback: Optional[Callable[[str, str, float, int, int], None]] = None):
+        """
+        item_callback(config_name, var_code, seconds, bytes, days): 직접 받은 항목의 소요 시간 · 크기
+        (planner 의 예상 시간 이력용 — 합류한 요청은 제외)
+        """
         
+        trace = self.trace
         try:
             # 1) 로그인 & 헤더 준비
-            cookie = self.get_cookie(config.login_id, config.password)
+            with trace.span("login"):
+                cookie = await asyncio.to_thread(self.get_cookie, config.login_id, config.password)
             hdr1, hdr2 = self.make_headers(cookie)
 
             # 2) 설정 & 날짜구간
@@ -172,6 +451,8 @@ class WeatherDownloader:
 
             total = len(config.regions) * len(intervals) * len(config.variables)
             cur_idx = 0
+            if self.job:
+                self.job.set_total(total)
 
             # 3) 다운로드 디렉토리
             base_dir = os.path.join("downloads", client_id, config.config_name)  # ★ 수정
@@ -187,9 +468,19 @@ class WeatherDownloader:
                     for variable in config.variables:
                         cur_idx += 1
                         name, code = variable["name"], variable["code"]
+                        item = f"{region['level3']} - {name} ({start}~{end})"
+                        item_key = (region["code"], start, end, code)
+
+                        # 취소/일시정지 확인 (일시정지 중에는 스케줄러 자리를 잡지 않음)
+                        if self.control:
+                            await self.control.checkpoint()
+                            if item_key in self.control.completed:
+                                # 재개된 작업: 이미 받은 항목은 건너뜀
+                                progress_callback(cur_idx, total, item)
+                                continue
 
                         # 진행 콜백
-                        progress_callback(cur_idx, total, f"{region['level3']} - {name} ({start}~{end})")
+                        progress_callback(cur_idx, total, item)
 
                         # 5) 요청 바디 생성 (nx, ny 포함)
                         req_body = self.generate_request_body(
@@ -201,41 +492,84 @@ class WeatherDownloader:
                         region["code"],     # region_code
                         cfg                  # config dict
                     )
+                        download_payload = {"downFile": f"{region['level3']}_{name}_{start}_{end}.csv"}
 
-                        # 6) 데이터 요청
-                        self.session.post(cfg["request_url"], headers=hdr1, data=req_body)
+                        # 6) 시도 루프: 재시도는 지터 지수 백오프, 세션 만료면 재로그인,
+                        #    KMA 전체 장애면 회로 차단기가 모든 작업을 함께 멈춤
+                        attempt = 0
+                        delays = backoff_delays()
+                        while True:
+                            attempt += 1
+                            probe = await kma_breaker.acquire()
+                            # 성공/실패 어느 쪽도 기록하지 못하고 빠져나가면 (취소, 디스크 오류 등)
+                            # half-open 시험 요청 자리를 반납해야 다른 작업이 멈추지 않음
+                            recorded = False
+                            try:
+                                # 공정 스케줄러가 이 작업 차례를 줄 때까지 대기 (KMA 동시 요청 수 제한)
+                                async with (self.job.slot() if self.job else contextlib.nullcontext()):
+                                    with trace.span("item", item=item, attempt=attempt) as item_span:
+                                        item_started = time.monotonic()
+                                        # 같은 (설정, 변수, 격자, 구간) 요청이 진행 중이면 그 결과를 함께 받음
+                                        key = (config.config_name, code, region["code"], start, end)
+                                        data, shared = await inflight.do(key, lambda: asyncio.to_thread(
+                                            self._fetch_zip, cfg, hdr1, hdr2, req_body, download_payload, item
+                                        ))
+                                        item_span["coalesced"] = shared
 
-                        # 7) ZIP 다운로드 & 압축 해제 로직 (기존 그대로)
-                        download_payload = {"downFile": f"{region['level3']}_{name}_{start}_{end}.csv"}
-                        resp = self.session.post(
-                            "https://data.kma.go.kr/data/rmt/downloadZip.do",
-                            headers=hdr2, data=download_payload, stream=True
-                        )
-
-                        if resp.status_code == 200:
-                            zip_path = os.path.join(region_dir, f"{region['level3']}_{name}_{start}_{end}.zip")
-                            with open(zip_path, "wb") as f:
-                                for chunk in resp.iter_content(8192):
-                                    f.write(chunk)
-
-                            var_dir = os.path.join(region_dir, name)
-                            os.makedirs(var_dir, exist_ok=True)
-
-                            with zipfile.ZipFile(zip_path) as z:
-                                for info in z.infolist():
-                                    try:
-                                        fn = info.filename.encode("cp437").decode("euc-kr")
-                                    except:
-                                        fn = info.filename
-                                    tgt = os.path.join(var_dir, fn)
-                                    with open(tgt, "wb") as out:
-                                        out.write(z.read(info.filename))
-                                    file_callback(tgt)
-
-                            os.remove(zip_path)
-
-                        # API 과부하 방지를 위한 짧은 대기
-                        await asyncio.sleep(0.5)
+                                        # 7) 압축 해제 (작업별 디렉토리에 각자 기록)
+                                        if data is not None:
+                                            await asyncio.to_thread(
+                                                self._extract_zip, data, os.path.join(region_dir, name),
+                                                file_callback, item
+                                            )
+                                            if store.STORE_INGEST and not shared:
+                                                # 로컬 조회 저장소에도 적재 (합류한 작업은 leader 가 이미 적재)
+                                                await asyncio.to_thread(
+                                                    self._ingest, data, config.config_name, code, region["code"]
+                                                )
+                                            if self.control:
+                                                self.control.completed.add(item_key)
+                                            if item_callback and not shared:
+                                                item_callback(
+                                                    config.config_name, code,
+                                                    time.monotonic() - item_started, data.size,
+                                                    interval_days(start, end),
+                                                )
+
+                                    # API 과부하 방지를 위한 짧은 대기 (배정받은 자리 안에서)
+                                    await asyncio.sleep(0.5)
+                                kma_breaker.record_success()
+                                recorded = True
+                                break
+                            except SessionExpired as e:
+                                # 재로그인도 일반 실패와 같은 백오프 · 차단기 집계를 거침
+                                # (로그인 페이지만 돌려주는 장애에서 재로그인이 무한 반복되지 않도록)
+                                kma_breaker.record_failure()
+                                recorded = True
+                                delay = next(delays, None)
+                                if delay is None:
+                                    self._dead_letter(dead_letter_callback, item, item_key, str(e), attempt)
+                                    break
+                                logger.warning(f"세션 만료 ({item}, {attempt}회) → {delay:.1f}초 후 재로그인")
+                                RETRIES.labels(source="kma").inc()
+                                await asyncio.sleep(delay)
+                                cookie = await asyncio.to_thread(
+                                    self.get_cookie, config.login_id, config.password
+                                )
+                                hdr1, hdr2 = self.make_headers(cookie)
+                            except ItemFailed as e:
+                                kma_breaker.record_failure()
+                                recorded = True
+                                delay = next(delays, None)
+                                if delay is None:
+                                    self._dead_letter(dead_letter_callback, item, item_key, str(e), attempt)
+                                    break
+                                logger.warning(f"항목 실패 ({item}, {attempt}회): {e} → {delay:.1f}초 후 재시도")
+                                RETRIES.labels(source="kma").inc()
+                                await asyncio.sleep(delay)
+                            finally:
+                                if probe and not recorded:
+                                    kma_breaker.abandon()
 
             logger.info("모든 다운로드 완료")
 
@@ -243,53 +577,143 @@ class WeatherDownloader:
             logger.error(f"다운로드 중 오류 발생: {e}")
             raise
         
-    def fetch_shortterm_df(self, config: DownloadConfig) -> pd.DataFrame:
+    def iter_shortterm_frames(self, config: DownloadConfig, as_arrow: bool = False,
+                              normalized: bool = False) -> Iterator:
         """
-        동기식으로 단기예보 데이터를 바로 DataFrame으로 반환합니다.
-        기존 download() 로직을 재활용하되, 파일을 디스크에 쓰지 않고
-        ZIP 스트림을 메모리에서 바로 읽어 pandas로 반환합니다.
+        항목(지역 × 구간 × 변수)이 끝날 때마다 DataFrame (as_arrow=True 면
+        pyarrow.RecordBatch) 을 하나씩 내보냅니다.
+        한 번에 ZIP 하나와 그 결과만 메모리에 있으므로 전체 결과 크기와 무관하게 메모리가 일정합니다.
+        - 기본: KMA CSV 컬럼 그대로 + region, variable, start, end (fetch_shortterm_df 와 같은 형식)
+        - normalized=True: 지역과 무관하게 같은 컬럼의 긴 형식
+          (region, variable, start, end, issue_time, lead, valid_time, value — _normalized_frame 참고)
         """
         cookie = self.get_cookie(config.login_id, config.password)
         hdr1, hdr2 = self.make_headers(cookie)
         cfg = self.configs[config.config_name]
         intervals = self.generate_intervals(config.start_date, config.end_date, cfg["mode"])
 
-        dfs = []
         for region in config.regions:
             for start, end in intervals:
                 for variable in config.variables:
+                    item = f"{region['level3']} - {variable['name']} ({start}~{end})"
                     # 1) 요청 바디 생성
                     body = self.generate_request_body(
                         variable["name"], variable["code"],
                         start, end, region["level3"], region["code"], cfg
                     )
-                    # 2) 첫 번째 POST (데이터 준비)
-                    self.session.post(cfg["request_url"], headers=hdr1, data=body)
-
-                    # 3) ZIP 다운로드
-                    resp = self.session.post(
-                        "https://data.kma.go.kr/data/rmt/downloadZip.do",
-                        headers=hdr2,
-                        data={"downFile": f"{region['level3']}_{variable['name']}_{start}_{end}.csv"}
+                    # 2) 데이터 준비 POST + ZIP 다운로드
+                    data = self._fetch_zip(
+                        cfg, hdr1, hdr2, body,
+                        {"downFile": f"{region['level3']}_{variable['name']}_{start}_{end}.csv"},
+                        item
                     )
-                    resp.raise_for_status()
-
-                    # 4) 메모리에서 ZIP 풀고 DataFrame 생성
-                    zf = zipfile.ZipFile(io.BytesIO(resp.content))
-                    for fname in zf.namelist():
-                        with zf.open(fname) as f:
-                            # euc-kr 로 인코딩된 CSV 읽기
-                            text = io.TextIOWrapper(f, encoding="euc-kr")
-                            df = pd.read_csv(text)
-                            # 메타정보 컬럼 추가
-                            df["region"]   = region["level3"]
-                            df["variable"] = variable["name"]
-                            df["start"]    = start
-                            df["end"]      = end
-                            dfs.append(df)
-        dfs_nonempty = [df for df in dfs if not df.empty]
-        
-        if dfs_nonempty:
-            return pd.concat(dfs_nonempty, ignore_index=True)
+                    if data is None:
+                        raise requests.HTTPError(f"ZIP 다운로드 실패: {item}")
+
+                    # 3) 받아 둔 ZIP 을 파일 하나씩 DataFrame 으로
+                    with data.open() as zf:
+                        names = zf.namelist()
+                        if not names:
+                            EMPTY_ZIPS.inc()
+                        for fname in names:
+                            if normalized:
+                                # 월 구분 행으로 발표시각 복원
+                                batch = parse_forecast_csv(zf.read(fname))
+                                if batch.num_rows == 0:
+                                    continue
+                                df = _normalized_frame(
+                                    batch, region["level3"], variable["name"], start, end
+                                )
+                            else:
+                                with zf.open(fname) as f:
+                                    # euc-kr 로 인코딩된 CSV 읽기
+                                    df = pd.read_csv(io.TextIOWrapper(f, encoding="euc-kr"))
+                                if df.empty:
+                                    continue
+                                # 메타정보 컬럼 추가
+                                df["region"] = region["level3"]
+                                df["variable"] = variable["name"]
+                                df["start"] = start
+                                df["end"] = end
+                            yield pa.RecordBatch.from_pandas(df, preserve_index=False) if as_arrow else df
+                    data.discard()
+
+    def fetch_shortterm_df(self, config: DownloadConfig, normalized: bool = False) -> pd.DataFrame:
+        """
+        동기식으로 단기예보 데이터를 바로 DataFrame으로 반환합니다.
+        열: KMA CSV 컬럼 + region, variable, start, end
+        (normalized=True 면 긴 형식 — iter_shortterm_frames 참고)
+        결과 전체가 필요 없다면 iter_shortterm_frames() 로 청크 단위 처리하세요.
+        """
+        dfs = list(self.iter_shortterm_frames(config, normalized=normalized))
+        if dfs:
+            return pd.concat(dfs, ignore_index=True)
+        else:
+            return pd.DataFrame()
+
+
+def _normalized_frame(batch: pa.RecordBatch, region: str, variable: str,
+                 start: str, end: str) -> pd.DataFrame:
+    """
+    parsing.parse_forecast_csv 결과를 고정 스키마 DataFrame 으로:
+    - region / variable / start / end: category (요청 메타정보)
+    - issue_time / valid_time: datetime64[s] (월 구분 행 기준으로 복원한 실제 시각)
+    - lead: int16 (선행시간, 실황은 0) · value: float32
+    """
+    n = batch.num_rows
+    return pd.DataFrame({
+        "region": pd.Categorical([region] * n),
+        "variable": pd.Categorical([variable] * n),
+        "start": pd.Categorical([start] * n),
+        "end": pd.Categorical([end] * n),
+        "issue_time": batch.column("issue_time").to_numpy().astype("datetime64[s]"),
+        "lead": batch.column("lead").to_numpy(),
+        "valid_time": batch.column("valid_time").to_numpy().astype("datetime64[s]"),
+        "value": batch.column("value").to_numpy(zero_copy_only=False),
+    })
+
+
+def frames_to_csv(frames) -> Iterator[bytes]:
+    """DataFrame 이터레이터 → CSV 바이트 스트림 (헤더는 처음 한 번, 컬럼은 첫 청크 기준)"""
+    columns = None
+    for df in frames:
+        if columns is None:
+            columns = list(df.columns)
+            yield df.to_csv(index=False).encode("utf-8-sig")
         else:
-            return pd.DataFrame()
\ No newline at end of file
+            yield df.reindex(columns=columns).to_csv(index=False, header=False).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """pyarrow IPC writer 출력을 받아 두었다가 drain() 으로 꺼내는 버퍼"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def batches_to_arrow(batches) -> Iterator[bytes]:
+    """RecordBatch 이터레이터 → Arrow IPC 스트림 바이트 (스키마는 첫 배치 기준)"""
+    sink = _ChunkSink()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        elif not batch.schema.equals(writer.schema):
+            batch = pa.Table.from_batches([batch]).cast(writer.schema).to_batches()[0]
+        writer.write_batch(batch)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
@@ -1,6 +1,10 @@
 import os
+import time
+import socket
+import sqlite3
 import zipfile
 import requests
+import multiprocessing
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import pandas as pd
@@ -11,6 +15,9 @@ import pandas as pd
 session = requests.Session()
 BASE_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 REGION_CODE_PATH = os.path.join(BASE_SCRIPT_DIR, "지역코드_sep.csv")
+DEFAULT_MANIFEST_PATH = os.path.join(BASE_SCRIPT_DIR, "data", "manifest.db")
+# KMA 요청 타임아웃 (연결, 읽기) — 응답 없는 연결에 워커가 리스를 쥔 채 멈추지 않도록
+REQUEST_TIMEOUT = (10, 300)
 
 
 # -------------------------------
@@ -276,108 +283,437 @@ CONFIGS = [
 
 
 # -------------------------------
-# 실행
+# 병렬화: 작업 단위 / 샤딩 / 리스 큐
 # -------------------------------
-import time
+# 작업 단위 = (CONFIGS 인덱스, 지역키). 한 단위는 한 워커가 끝까지 처리합니다.
+def build_units(df_regions: pd.DataFrame, config_indices):
+    return [(ci, key) for ci in config_indices for key in df_regions["지역키"]]
+
+
+def parse_shard(text: str):
+    """'i/N' → (i, N)"""
+    i, n = (int(x) for x in text.split("/"))
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"잘못된 샤드 지정: {text} (0 <= i < N)")
+    return i, n
+
+
+class RateLimiter:
+    """워커별 요청 예산: 초당 rate 회를 넘지 않도록 요청 간격을 벌림"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+class LeaseQueue:
+    """
+    공유 SQLite 파일 기반 작업 큐.
+    - claim(): 미처리 단위 또는 리스가 만료된 단위를 하나 가져옴
+    - renew(): 항목 하나 끝날 때마다 리스 연장 (하트비트)
+    - complete(): 완료 표시 (단위 안의 모든 항목이 성공했을 때만)
+    - release(): 실패 항목이 남은 단위를 큐에 되돌림 (max_attempts 회까지, 이후 'failed')
+    워커가 죽으면 lease_seconds 후 다른 워커가 그 단위를 회수합니다.
+    SQLite 잠금에 의존하므로 한 호스트의 워커들만 같은 파일을 공유합니다 (네트워크 파일시스템 불가).
+    """
+
+    def __init__(self, path: str, worker_id: str, lease_seconds: int = 600, max_attempts: int = 3):
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS work (
+            seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+            config_index INTEGER NOT NULL,
+            region_key   TEXT NOT NULL,
+            status       TEXT NOT NULL DEFAULT 'todo',
+            owner        TEXT,
+            lease_until  REAL,
+            attempts     INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (config_index, region_key)
+        )""")
+
+    def populate(self, units):
+        """
+        큐에 없는 단위만 추가. 이미 있는 단위의 상태(done / failed / 시도 횟수)는 그대로 둡니다
+        (매니페스트는 워커마다 로컬이므로, 새 워커 · 재시작이 다른 워커가 끝낸 단위를 되돌리지 않도록).
+        failed 단위를 다시 시도하려면 큐 파일에서 해당 행을 지우거나 새 큐 파일을 쓰세요.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO work (config_index, region_key) VALUES (?, ?)",
+            units,
+        )
+        self.conn.execute("COMMIT")
+
+    def claim(self):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                """
+                SELECT seq, config_index, region_key FROM work
+                 WHERE status = 'todo'
+                    OR (status = 'leased' AND lease_until < ?)
+                 ORDER BY seq LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row:
+                self.conn.execute(
+                    """
+                    UPDATE work SET status = 'leased', owner = ?, lease_until = ?,
+                           attempts = attempts + 1
+                     WHERE seq = ?
+                    """,
+                    (self.worker_id, now + self.lease_seconds, row[0]),
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def renew(self, seq: int):
+        self.conn.execute(
+            "UPDATE work SET lease_until = ? WHERE seq = ? AND owner = ?",
+            (time.time() + self.lease_seconds, seq, self.worker_id),
+        )
+
+    def complete(self, seq: int):
+        self.conn.execute(
+            "UPDATE work SET status = 'done', lease_until = NULL WHERE seq = ? AND owner = ?",
+            (seq, self.worker_id),
+        )
+
+    def release(self, seq: int):
+        """실패 항목이 남은 단위 → 다른 워커(또는 자신)가 다시 가져가도록 todo 로"""
+        self.conn.execute(
+            """
+            UPDATE work SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'todo' END,
+                   owner = NULL, lease_until = NULL
+             WHERE seq = ? AND owner = ?
+            """,
+            (self.max_attempts, seq, self.worker_id),
+        )
+
+
+class Manifest:
+    """
+    완료 매니페스트: (설정, 지역키, 구간, 변수) → 실제로 만들어진 파일.
+    재시작 시 파일 존재 여부(stat)를 일일이 확인하지 않고,
+    SQLite 인덱스 조회와 집합 차이로 남은 항목만 계획합니다.
+    --workers 로 띄운 로컬 워커들이 같은 파일을 쓰므로 WAL 로 열고 항목마다 커밋합니다.
+    (쓰기 트랜잭션을 네트워크 대기 동안 열어 두면 다른 워커가 busy timeout 으로 실패)
+    commit_every 는 네트워크 없이 한꺼번에 쓰는 rebuild_from_disk 전용입니다.
+    """
+
+    def __init__(self, path: str, commit_every: int = 1):
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS done (
+            config      TEXT NOT NULL,
+            region_key  TEXT NOT NULL,
+            start       TEXT NOT NULL,
+            end         TEXT NOT NULL,
+            var         TEXT NOT NULL,
+            region_code TEXT,
+            files       TEXT NOT NULL,
+            PRIMARY KEY (config, region_key, start, end, var)
+        ) WITHOUT ROWID""")
+        self.conn.commit()
+
+    def unit_counts(self, config_names):
+        """{(설정, 지역키): 완료 항목 수} — 전부 끝난 단위를 계획 단계에서 제외"""
+        marks = ",".join("?" * len(config_names))
+        cur = self.conn.execute(
+            f"SELECT config, region_key, COUNT(*) FROM done "
+            f"WHERE config IN ({marks}) GROUP BY config, region_key",
+            list(config_names),
+        )
+        return {(c, k): n for c, k, n in cur}
+
+    def done_items(self, config: str, region_key: str):
+        """단위 하나의 완료 항목 {(start, end, var)} (기본키 범위 조회)"""
+        cur = self.conn.execute(
+            "SELECT start, end, var FROM done WHERE config = ? AND region_key = ?",
+            (config, region_key),
+        )
+        return set(cur)
+
+    def record(self, config, region_key, start, end, var, region_code, files):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO done VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (config, region_key, start, end, var, region_code, "|".join(files)),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def rebuild_from_disk(self, data_dir: str):
+        """
+        기존 data/ 디렉터리를 한 번만 훑어 매니페스트를 채움 (최초 마이그레이션용).
+        경로 규칙: data/<설정>/<L1>/<L2>/<L3>/<변수>/<L3>_<변수>_<start>_<end>.csv
+        """
+        n = 0
+        for root, _, fns in os.walk(data_dir):
+            rel = os.path.relpath(root, data_dir).split(os.sep)
+            if len(rel) != 5:
+                continue
+            cfg_name, lvl1, lvl2, lvl3, var_name = rel
+            for fn in fns:
+                stem = fn[:-4] if fn.endswith(".zst") else fn
+                if not stem.endswith(".csv"):
+                    continue
+                parts = stem[:-4].rsplit("_", 2)
+                if len(parts) != 3:
+                    continue
+                start, end = parts[1], parts[2]
+                self.record(
+                    cfg_name, f"{lvl1}|{lvl2}|{lvl3}", start, end, var_name, None,
+                    [os.path.relpath(os.path.join(root, fn), data_dir)],
+                )
+                n += 1
+        self.flush()
+        return n
 
 
-def main(login_id: str, password: str, order: str = "asc", config_index: int = None):
+# -------------------------------
+# 실행
+# -------------------------------
+def write_member(path: str, data: bytes, compression: str = None) -> str:
+    """추출 파일 저장. compression='zstd' 이면 <path>.zst 로 압축 저장 후 실제 경로 반환"""
+    if compression == "zstd":
+        import zstandard
+        data = zstandard.ZstdCompressor(level=9).compress(data)
+        path += ".zst"
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def download_unit(
+    cfg, intervals, row, login_id, password, hdrs, limiter, manifest,
+    on_item=None, compression=None,
+):
+    """지역 하나 × 설정 하나의 남은 (구간, 변수) 항목 다운로드. 실패한 항목 수를 반환"""
+    lvl1, lvl2, lvl3, code, region_key = (
+        row["Level1"],
+        row["Level2"],
+        row["Level3"],
+        row["ReqList_Last"],
+        row["지역키"],
+    )
+    data_dir = os.path.join(BASE_SCRIPT_DIR, "data")
+    out_dir = os.path.join(data_dir, cfg["name"], lvl1, lvl2, lvl3)
+
+    # 계획: 전체 항목 - 매니페스트의 완료 항목
+    done = manifest.done_items(cfg["name"], region_key)
+    todo = [
+        (start, end, var_name, var_code)
+        for start, end in intervals
+        for var_name, var_code in cfg["vars"]
+        if (start, end, var_name) not in done
+    ]
+    if not todo:
+        return 0
+    os.makedirs(out_dir, exist_ok=True)
+
+    failed = 0
+    for start, end, var_name, var_code in todo:
+        cat_dir = os.path.join(out_dir, var_name)
+
+        req_body = gen_request_body_common(
+            var_name,
+            var_code,
+            start,
+            end,
+            lvl3,
+            code,
+            cfg["api"],
+            cfg["code"],
+            cfg["reqst_purpose_cd"],
+            cfg["selectType"],
+        )
+        zip_name = f"{lvl3}_{var_name}_{start}_{end}.zip"
+        zip_path = os.path.join(out_dir, zip_name)
+        try:
+            limiter.wait()
+            session.post(
+                cfg["request_url"],
+                headers=hdrs[0],
+                data=req_body,
+                timeout=REQUEST_TIMEOUT,
+            )
+            limiter.wait()
+            response = session.post(
+                "https://data.kma.go.kr/data/rmt/downloadZip.do",
+                headers=hdrs[1],
+                data=gen_download_payload(lvl3, var_name, start, end),
+                stream=True,
+                timeout=REQUEST_TIMEOUT,
+            )
+            if response.status_code == 200:
+                with open(zip_path, "wb") as f:
+                    for chunk in response.iter_content(8192):
+                        f.write(chunk)
+        except requests.RequestException as e:
+            print(f"  ! 요청 실패: {type(e).__name__}: {e}")
+            if os.path.exists(zip_path):
+                os.remove(zip_path)
+            failed += 1
+        else:
+            if response.status_code != 200:
+                print(f"  ! 다운로드 실패: {response.status_code}")
+                failed += 1
+            elif not zipfile.is_zipfile(zip_path):
+                # ZIP 이 아닌 응답(로그인 화면 등) → 세션 만료로 보고 재로그인
+                os.remove(zip_path)
+                print(
+                    f"[{cfg['name']}:{lvl3}] {var_name} {start}~{end} ⛔ "
+                )
+                failed += 1
+                cookie = get_cookie(login_id, password)
+                hdrs[:] = make_headers(cookie)
+            else:
+                os.makedirs(cat_dir, exist_ok=True)
+                extracted = []
+                with zipfile.ZipFile(zip_path) as z:
+                    for info in z.infolist():
+                        try:
+                            filename = info.filename.encode("cp437").decode(
+                                "euc-kr"
+                            )
+                        except:
+                            filename = info.filename
+                        tgt_path = write_member(
+                            os.path.join(cat_dir, filename), z.read(info.filename), compression
+                        )
+                        extracted.append(os.path.relpath(tgt_path, data_dir))
+                os.remove(zip_path)
+                # ZIP 안의 실제 파일명을 기록 → 예상 파일명과 달라도 재다운로드하지 않음
+                # 빈 ZIP 은 그 기간에 자료가 없다는 정상 응답 → 파일 없이 완료로 기록
+                manifest.record(
+                    cfg["name"], region_key, start, end, var_name, code, extracted
+                )
+                print(
+                    f"[{cfg['name']}:{lvl3}] {var_name} {start}~{end} "
+                    + ("✅" if extracted else "✅ (자료 없음)")
+                )
+
+        if on_item:
+            on_item()
+    return failed
+
+
+def main(
+    login_id: str,
+    password: str,
+    order: str = "asc",
+    config_index: int = None,
+    shard: tuple = (0, 1),
+    queue_path: str = None,
+    lease_seconds: int = 600,
+    rate: float = 2.0,
+    manifest_path: str = None,
+    compression: str = None,
+):
+    # 워커마다 독립된 KMA 세션 (프로세스 간 커넥션/쿠키 공유 방지)
+    global session
+    session = requests.Session()
+
     cookie = get_cookie(login_id, password)
-    hdr1, hdr2 = make_headers(cookie)
+    hdrs = list(make_headers(cookie))
+    limiter = RateLimiter(rate)
     df_regions = load_region_code(REGION_CODE_PATH)
 
     if order == "desc":
         df_regions = df_regions.iloc[::-1].reset_index(drop=True)
 
-    configs_to_run = [CONFIGS[config_index]] if config_index is not None else CONFIGS
-
-    for cfg in configs_to_run:
-        intervals = gen_intervals(
-            cfg["interval"][0],
-            cfg["interval"][1],
-            mode=("monthly" if cfg["mode"] == "monthly" else "range"),
+    config_indices = (
+        [config_index] if config_index is not None else list(range(len(CONFIGS)))
+    )
+    rows = df_regions.set_index("지역키", drop=False)
+    intervals_by_cfg = {
+        ci: gen_intervals(
+            CONFIGS[ci]["interval"][0],
+            CONFIGS[ci]["interval"][1],
+            mode=("monthly" if CONFIGS[ci]["mode"] == "monthly" else "range"),
         )
-        base_dir = os.path.join(BASE_SCRIPT_DIR, "data", cfg["name"])
-
-        for _, row in df_regions.iterrows():
-            lvl1, lvl2, lvl3, code = (
-                row["Level1"],
-                row["Level2"],
-                row["Level3"],
-                row["ReqList_Last"],
+        for ci in config_indices
+    }
+    units = build_units(df_regions, config_indices)
+
+    # 매니페스트 기준으로 이미 끝난 단위는 계획에서 제외 (GROUP BY 한 번)
+    manifest = Manifest(manifest_path or DEFAULT_MANIFEST_PATH)
+    counts = manifest.unit_counts([CONFIGS[ci]["name"] for ci in config_indices])
+    expected = {
+        ci: len(intervals_by_cfg[ci]) * len(CONFIGS[ci]["vars"]) for ci in config_indices
+    }
+    before = len(units)
+    units = [
+        (ci, key) for ci, key in units
+        if counts.get((CONFIGS[ci]["name"], key), 0) < expected[ci]
+    ]
+    print(f"계획: 전체 단위 {before}개 중 남은 단위 {len(units)}개")
+
+    if queue_path:
+        # 리스 큐 모드: 남은 단위를 공유 파일에서 하나씩 가져감
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        queue = LeaseQueue(queue_path, worker_id, lease_seconds)
+        queue.populate(units)
+        while True:
+            claimed = queue.claim()
+            if claimed is None:
+                break
+            seq, ci, key = claimed
+            print(f"[{worker_id}] 단위 획득: {CONFIGS[ci]['name']} / {key}")
+            failed = download_unit(
+                CONFIGS[ci], intervals_by_cfg[ci], rows.loc[key],
+                login_id, password, hdrs, limiter, manifest,
+                on_item=lambda: queue.renew(seq), compression=compression,
             )
-            out_dir = os.path.join(base_dir, lvl1, lvl2, lvl3)
-            os.makedirs(out_dir, exist_ok=True)
-
-            for start, end in intervals:
-                for var_name, var_code in cfg["vars"]:
-                    # 추출 대상 파일명
-                    expected_csv = f"{lvl3}_{var_name}_{start}_{end}.csv"
-                    cat_dir = os.path.join(out_dir, var_name)
-                    csv_path = os.path.join(cat_dir, expected_csv)
-
-                    # 이미 추출된 CSV 파일이 있으면 건너뜀
-                    if os.path.exists(csv_path):
-                        print(f"[{cfg['name']}:{lvl3}] {var_name} {start}~{end} ▶")
-                        continue
-
-                    req_body = gen_request_body_common(
-                        var_name,
-                        var_code,
-                        start,
-                        end,
-                        lvl3,
-                        code,
-                        cfg["api"],
-                        cfg["code"],
-                        cfg["reqst_purpose_cd"],
-                        cfg["selectType"],
-                    )
-                    session.post(
-                        cfg["request_url"],
-                        headers=hdr1,
-                        data=req_body,
-                    )
-                    response = session.post(
-                        "https://data.kma.go.kr/data/rmt/downloadZip.do",
-                        headers=hdr2,
-                        data=gen_download_payload(lvl3, var_name, start, end),
-                        stream=True,
-                    )
-
-                    if response.status_code == 200:
-                        zip_name = f"{lvl3}_{var_name}_{start}_{end}.zip"
-                        zip_path = os.path.join(out_dir, zip_name)
-                        os.makedirs(os.path.dirname(zip_path), exist_ok=True)
-                        with open(zip_path, "wb") as f:
-                            for chunk in response.iter_content(8192):
-                                f.write(chunk)
-
-                        os.makedirs(cat_dir, exist_ok=True)
-                        extracted = False
-                        with zipfile.ZipFile(zip_path) as z:
-                            for info in z.infolist():
-                                try:
-                                    filename = info.filename.encode("cp437").decode(
-                                        "euc-kr"
-                                    )
-                                except:
-                                    filename = info.filename
-                                tgt_path = os.path.join(cat_dir, filename)
-                                with open(tgt_path, "wb") as out_f:
-                                    out_f.write(z.read(info.filename))
-                                extracted = True
-                        os.remove(zip_path)
-                        if extracted:
-                            print(f"[{cfg['name']}:{lvl3}] {var_name} {start}~{end} ✅")
-                        else:
-                            print(
-                                f"[{cfg['name']}:{lvl3}] {var_name} {start}~{end} ⛔ "
-                            )
-                            cookie = get_cookie(login_id, password)
-                            hdr1, hdr2 = make_headers(cookie)
-                    else:
-                        print(f"  ! 다운로드 실패: {response.status_code}")
+            manifest.flush()
+            if failed:
+                # 실패 항목이 남은 단위는 완료 처리하지 않음 → 리스를 풀어 재시도
+                print(f"[{worker_id}] 실패 {failed}건 → 단위 반환: {CONFIGS[ci]['name']} / {key}")
+                queue.release(seq)
+            else:
+                queue.complete(seq)
+    else:
+        # 정적 샤드 모드: 단위 번호 % N == i 인 것만 처리
+        idx, n = shard
+        for ci, key in units[idx::n]:
+            download_unit(
+                CONFIGS[ci], intervals_by_cfg[ci], rows.loc[key],
+                login_id, password, hdrs, limiter, manifest,
+                compression=compression,
+            )
+            manifest.flush()
+
+
+def _worker_entry(kwargs):
+    main(**kwargs)
 
 
 if __name__ == "__main__":
@@ -399,11 +735,82 @@ if __name__ == "__main__":
         default=None,
         help="실행할 CONFIGS 인덱스 (0부터 시작). 지정하지 않으면 전체 실행",
     )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(0, 1),
+        help="정적 분할 'i/N' (예: 0/4). 머신/프로세스마다 다른 i 지정",
+    )
+    parser.add_argument(
+        "--queue",
+        type=str,
+        default=None,
+        help="공유 SQLite 작업 큐 경로. 지정 시 --shard 대신 리스 기반으로 분배",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=int,
+        default=600,
+        help="작업 단위 리스 유효시간(초). 만료되면 다른 워커가 회수",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=2.0,
+        help="워커별 초당 최대 요청 수 (0 이면 제한 없음)",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help=f"완료 매니페스트 경로 (기본: {DEFAULT_MANIFEST_PATH})",
+    )
+    parser.add_argument(
+        "--rebuild-manifest",
+        action="store_true",
+        help="기존 data/ 디렉터리를 훑어 매니페스트를 채운 뒤 종료 (최초 1회)",
+    )
+    parser.add_argument(
+        "--compress",
+        type=str,
+        choices=["zstd"],
+        default=None,
+        help="추출한 CSV 를 zstd 로 압축 저장 (<파일>.csv.zst)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="이 머신에서 띄울 워커 프로세스 수",
+    )
     args = parser.parse_args()
 
-    main(
-        args.login_id,
-        args.password,
+    if args.rebuild_manifest:
+        path = args.manifest or DEFAULT_MANIFEST_PATH
+        n = Manifest(path, commit_every=500).rebuild_from_disk(os.path.join(BASE_SCRIPT_DIR, "data"))
+        print(f"매니페스트 재구성 완료: {n}건 → {path}")
+        raise SystemExit(0)
+
+    base = dict(
+        login_id=args.login_id,
+        password=args.password,
         order=args.order,
         config_index=args.config_index,
+        queue_path=args.queue,
+        lease_seconds=args.lease_seconds,
+        rate=args.rate,
+        manifest_path=args.manifest,
+        compression=args.compress,
     )
+    if args.workers <= 1:
+        main(shard=args.shard, **base)
+    else:
+        # 로컬 워커 k 개: 큐 모드는 같은 큐를 공유, 샤드 모드는 i/N 을 다시 k 등분
+        # (i + N*j) / (N*k) 들의 합집합 == i/N
+        idx, n = args.shard
+        jobs = [
+            dict(base, shard=(idx + n * k, n * args.workers))
+            for k in range(args.workers)
+        ]
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            pool.map(_worker_entry, jobs)